@@ -0,0 +1,100 @@
+"""
+Resources of a live strategy run, each created on first use.
+
+Importing strategy.py has no side effects: no directories, log files,
+.env loading or API client. main() creates an AppContext and installs it
+with strategy.init_app(), which is when these come into existence:
+
+    app = AppContext()
+    app.start_logging()  # logs/strategy_<run>.log and the console, from a listener thread
+    app.client           # DMABybit from API_KEY/API_SECRET (.env), sharing helpers.bybit's connection pool
+    app.journal.record("decision", action="exit", reason="stop_loss", pnl=-12.5)
+    app.checkpoint       # data_dir/state.json: position state, rewritten on every change (see checkpoint.py)
+    app.order_manager    # follows orders to their final fill: private order stream, polling as fallback
+    app.close()          # drain the journal and the log queue
+
+Nothing heavier than the standard library is imported until a resource is
+first used, so a restart after a crash gets to its first API call sooner.
+"""
+
+import atexit
+import logging
+import os
+from datetime import datetime
+from functools import cached_property
+
+from checkpoint import StateCheckpoint
+from journal import JOURNAL_FLUSH_INTERVAL, JOURNAL_FLUSH_SIZE, TradeJournal, setup_logging
+
+LOGS_DIR = 'logs'
+DATA_DIR = 'trades_data'
+
+
+class AppContext:
+    """Logging, trade journal, position checkpoint, API client and order manager of one run; log and journal
+    file names share the run's start time"""
+
+    def __init__(self, logs_dir=LOGS_DIR, data_dir=DATA_DIR, journal_flush_interval=JOURNAL_FLUSH_INTERVAL,
+                 journal_flush_size=JOURNAL_FLUSH_SIZE, checkpoint_path=None):
+        self.logs_dir = logs_dir
+        self.data_dir = data_dir
+        self.journal_flush_interval = journal_flush_interval
+        self.journal_flush_size = journal_flush_size
+        # Not stamped with the run: a restarted run resumes from it
+        self.checkpoint_path = checkpoint_path or os.path.join(data_dir, 'state.json')
+        self.run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.log_listener = None
+
+    def start_logging(self, level=logging.INFO):
+        """Log to a timestamped file in logs_dir and the console (once; later calls are no-ops)"""
+        if self.log_listener is None:
+            os.makedirs(self.logs_dir, exist_ok=True)
+            self.log_listener = setup_logging(os.path.join(self.logs_dir, f'strategy_{self.run_id}.log'), level)
+            atexit.register(self.close)
+        return self.log_listener
+
+    @cached_property
+    def journal(self):
+        os.makedirs(self.data_dir, exist_ok=True)
+        return TradeJournal(os.path.join(self.data_dir, f'journal_{self.run_id}.jsonl'),
+                            self.journal_flush_interval, self.journal_flush_size)
+
+    @cached_property
+    def checkpoint(self):
+        return StateCheckpoint(self.checkpoint_path)
+
+    @cached_property
+    def client(self):
+        """Option client sharing the helpers client's connection pool, response cache and rate limits"""
+        from dotenv import load_dotenv
+
+        from bybit_apis import DMABybit
+        from helpers import bybit
+
+        load_dotenv()
+        return DMABybit(os.getenv('API_KEY'), os.getenv('API_SECRET'), symbol="BTCUSDT", category="option",
+                        session=bybit.session, cache=bybit.cache, rate_limiter=bybit.rate_limiter)
+
+    @cached_property
+    def order_manager(self):
+        """Tracks the client's orders to their final status, polling get_order_details until start_order_stream()"""
+        from order_manager import OrderManager
+
+        return OrderManager(self.client)
+
+    def start_order_stream(self, url=None):
+        """Take order updates from the private stream, authenticated with the DMA socket signature"""
+        from order_manager import BYBIT_PRIVATE_STREAM, PrivateOrderStream, dma_socket_auth
+
+        return self.order_manager.attach_stream(PrivateOrderStream(lambda: dma_socket_auth(self.client),
+                                                                   url=url or BYBIT_PRIVATE_STREAM))
+
+    def close(self):
+        """Stop order tracking, write out the journal and stop the log listener"""
+        if "order_manager" in self.__dict__:
+            self.order_manager.close()
+        if "journal" in self.__dict__:
+            self.journal.close()
+        if self.log_listener is not None:
+            self.log_listener.stop()
+            self.log_listener = None
@@ -0,0 +1,151 @@
+"""
+Asyncio variant of the Coinswitch DMA Bybit client.
+
+Step1: Install Requirements
+pip3 install httpx
+
+AsyncDMABybit exposes the same methods as DMABybit (get_tickers, place_order,
+get_order_details, get_open_positions, get_balance, ...), each returning an
+awaitable, so independent requests can be fanned out with asyncio.gather:
+
+    async with AsyncDMABybit(API_KEY, API_SECRET, symbol="BTCUSDT", category="option") as client:
+        tickers, positions = await asyncio.gather(
+            client.get_tickers(category="option", base_coin="BTC"),
+            client.get_open_positions(),
+        )
+"""
+
+import asyncio
+import time
+
+from bybit_apis import RETRY_STATUS_CODES, DMABybit
+from decoding import loads
+from response_cache import ACCOUNT_GROUPS
+
+# Conditional import for httpx (async HTTP client with connection pooling)
+try:
+    import httpx
+except ImportError:
+    print("httpx library not found. Please install it with: pip install httpx")
+    httpx = None
+
+
+class AsyncDMABybit(DMABybit):
+    """DMABybit whose request methods are coroutines sharing one pooled httpx.AsyncClient.
+
+    Request building, signing and the response cache are inherited from DMABybit;
+    only the transport differs, so every endpoint method returns a coroutine.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._fetches = {}  # cache key -> in-flight fetch task
+
+    def _create_session(self, pool_size):
+        if not httpx:
+            raise ImportError("httpx library is required for AsyncDMABybit")
+        if isinstance(self.timeout, tuple):
+            connect_timeout, read_timeout = self.timeout
+            timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        else:
+            timeout = httpx.Timeout(self.timeout)
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        # httpx transports only retry failed connection attempts, which is safe for POST too
+        transport = httpx.AsyncHTTPTransport(retries=self.max_retries, limits=limits)
+        return httpx.AsyncClient(transport=transport, timeout=timeout)
+
+    async def close(self):
+        """Close the pooled connections held by the session"""
+        await self.session.aclose()
+
+    def __enter__(self):
+        raise TypeError("AsyncDMABybit closes asynchronously: use 'async with', not 'with'")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def _cached_request(self, group, endpoint, params, decode=loads):
+        """Coroutine for a read-only GET through the response cache; concurrent callers await one task"""
+        key = (group, self.api_key, endpoint, tuple(params.items()), decode)
+        if not self.cache.ttls.get(group):
+            return self._prepare_request(endpoint, params=params, decode=decode)
+        return self._cached(key, endpoint, params, decode)
+
+    async def _cached(self, key, endpoint, params, decode):
+        cached, response = self.cache.lookup(key)
+        if cached:
+            return response
+        task = self._fetches.get(key)
+        if task is None:
+            task = self._fetches[key] = asyncio.ensure_future(self._fetch(key, endpoint, params, decode))
+            task.add_done_callback(lambda _: self._fetches.pop(key, None))
+        # A cancelled caller must not cancel the fetch the others are waiting on
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key, endpoint, params, decode):
+        generation = self.cache.generation
+        response = await self._prepare_request(endpoint, params=params, decode=decode)
+        self.cache.store(key, response, generation)
+        return response
+
+    async def _prepare_request(self, endpoint, method='GET', params=None, body=None, decode=loads):
+        """Prepare and send Coinswitch API request. The response body is decoded with decode (bytes -> response)."""
+        if method not in ('GET', 'POST'):
+            raise ValueError(f"Unsupported HTTP method: {method}")
+
+        path, signed_path = self._canonical_path(method, endpoint, params)
+        full_url = f"{self.coinswitch_url}{path}"
+
+        # GET requests are retried with exponential backoff on throttling/server errors
+        attempts = self.max_retries + 1 if method == 'GET' else 1
+        try:
+            for attempt in range(attempts):
+                # Wait for a token off the event loop only when one is not free now
+                started = time.perf_counter()
+                if self.rate_limiter.acquire(endpoint, timeout=0) is None:
+                    await asyncio.get_running_loop().run_in_executor(None, self.rate_limiter.acquire, endpoint)
+                signing = time.perf_counter()
+                self.metrics.observe("api_rate_limit_wait_seconds", signing - started, endpoint=endpoint)
+                headers = self._signed_headers(method, signed_path)
+                sent = time.perf_counter()
+                self.metrics.observe("api_sign_seconds", sent - signing, endpoint=endpoint)
+                try:
+                    if method == 'GET':
+                        response = await self.session.get(full_url, headers=headers)
+                    else:
+                        try:
+                            response = await self.session.post(full_url, headers=headers, json=body)
+                        finally:
+                            # Orders and margin changes move positions and balance, even when the reply is lost
+                            self.cache.invalidate(*ACCOUNT_GROUPS)
+                finally:
+                    received = time.perf_counter()
+                    self.metrics.observe("api_network_seconds", received - sent, endpoint=endpoint)
+                self.rate_limiter.update(endpoint, response.headers, response.status_code)
+                if response.status_code not in RETRY_STATUS_CODES or attempt == attempts - 1:
+                    break
+                await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+
+            # Check and return response
+            response.raise_for_status()
+            result = decode(response.content)
+            self.metrics.observe("api_decode_seconds", time.perf_counter() - received, endpoint=endpoint)
+            if isinstance(result, dict):
+                self.rate_limiter.update(endpoint, ret_code=result.get("retCode"))
+            self.metrics.inc("api_requests_total", endpoint=endpoint, outcome="ok")
+            return result
+
+        except httpx.HTTPError as e:
+            self.metrics.inc("api_requests_total", endpoint=endpoint, outcome="request_error")
+            response = getattr(e, 'response', None)
+            print(f"Request error: {e}")
+            print(f"Response content: {response.text if response is not None else 'No response'}")
+            return None
+        except ValueError as e:  # body is not valid JSON (or not a tickers response, for a typed decode)
+            self.metrics.inc("api_requests_total", endpoint=endpoint, outcome="decode_error")
+            print(f"Response decode error: {e}")
+            print(f"Response content: {response.text}")
+            return None
@@ -0,0 +1,344 @@
+"""
+Backtest the strategy against recorded market data.
+
+Replays recorded option tickers (stream recordings, .jsonl, and/or REST dumps
+such as api_responses/bybit_option_responses_*.txt) into an OptionChainStore
+and runs strategy.run_strategy() on it unchanged:
+    - orders go to SimulatedBybit, which fills them at the replayed touch
+      (ask for buys, bid for sells, plus optional slippage) and keeps positions
+      for get_open_positions/get_order_details
+    - time is simulated: the scheduler jumps straight to the next recorded
+      message or timer, so nothing ever sleeps and a day replays as fast as
+      the CPU can process its messages
+
+    python backtest.py --data api_responses/bybit_option_ticker_stream_sample.jsonl --expiry 25APR25 --rebalance-interval 1
+
+Market data can also come from a tick store (tickstore.py): RecordEvents
+replays its memory-mapped records without parsing any JSON, which is what
+sweep.py's worker processes use.
+"""
+
+import argparse
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import NamedTuple
+
+import numpy as np
+
+import helpers
+import strategy
+from decoding import ticker_columns
+from instruments import parse_symbol
+from journal import LOG_FORMAT, TradeJournal
+from ledger import PositionLedger, estimate_fee
+from market_data_feed import OptionChainStore
+from recordings import RECORDINGS_DIR, load_events
+from scheduler import Scheduler
+from tickstore import TICK_DTYPE, TICK_FIELDS, TickStore, encode_updates, event_updates
+
+DEFAULT_DATA = os.path.join(RECORDINGS_DIR, "bybit_option_ticker_stream_sample.jsonl")
+# Approximation of Bybit's initial margin for a short option, per contract:
+# mark price + max(15% of underlying - OTM amount, 10% of underlying)
+SHORT_IM_RATE = 0.15
+SHORT_MIN_IM_RATE = 0.10
+REJECT_CODE = 10001
+# Simulated seconds between samples of the PnL curve (for drawdown)
+EQUITY_SAMPLE_INTERVAL = 60
+
+
+def encode_events(events):
+    """Pack replay events into (tickstore.TICK_DTYPE records, symbols), one record per ticker update"""
+    symbol_ids = {}
+    records = encode_updates(event_updates(events), lambda symbol: symbol_ids.setdefault(symbol, len(symbol_ids)))
+    return records, list(symbol_ids)
+
+
+_TS, _SYMBOL, _SNAPSHOT = (TICK_DTYPE.names.index(name) for name in ("ts", "symbol", "snapshot"))
+_FIELD_COLUMNS = [(field, TICK_DTYPE.names.index(field)) for field in TICK_FIELDS]
+
+
+class RecordEvents:
+    """Replay events decoded on demand from TICK_DTYPE records, e.g. a memory-mapped tick store day"""
+
+    def __init__(self, records, symbols):
+        self.records = records
+        self.symbols = symbols
+        self.times = (records["ts"] / 1000).tolist()
+
+    @classmethod
+    def from_store(cls, store, day, **filters):
+        """Events for one day of a TickStore (filters as for TickStore.read)"""
+        return cls(store.read(day, **filters), store.symbols)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, i):
+        row = self.records[i].tolist()
+        ts, symbol = row[_TS], self.symbols[row[_SYMBOL]]
+        data = {"symbol": symbol}
+        for field, column in _FIELD_COLUMNS:
+            value = row[column]
+            if value == value:  # not NaN
+                data[field] = value
+        message_type = "snapshot" if row[_SNAPSHOT] else "delta"
+        return ts / 1000, "message", {"topic": f"tickers.{symbol}", "type": message_type, "ts": ts, "data": data}
+
+
+class ReplayFeed:
+    """Stands in for OptionTickerFeed: applies recorded events to the store as simulated time reaches them"""
+
+    def __init__(self, events, store=None):
+        self.events = events
+        self.times = events.times if isinstance(events, RecordEvents) else [event[0] for event in events]
+        self.store = store or OptionChainStore()
+        self.position = 0
+        # Replayed data is never stale: always "connected"
+        self.connected = threading.Event()
+        self.connected.set()
+
+    def next_time(self):
+        return self.times[self.position] if self.position < len(self.events) else None
+
+    def replay_until(self, t):
+        while self.position < len(self.events) and self.times[self.position] <= t:
+            _, kind, payload = self.events[self.position]
+            if kind == "tickers":
+                self.store.load_tickers(payload)
+            else:
+                self.store.apply_message(payload)
+            self.position += 1
+
+    def stop(self, timeout=None):
+        pass
+
+
+class BacktestScheduler(Scheduler):
+    """Scheduler on simulated time that pulls market data from a ReplayFeed.
+
+    Waiting never sleeps: the clock jumps to the next timer or recorded event,
+    whichever is first. The run stops when the recording is exhausted.
+    """
+
+    def __init__(self, feed, **kwargs):
+        self.feed = feed
+        self.now = feed.next_time() or 0.0
+        super().__init__(clock=lambda: self.now, **kwargs)
+
+    def _wait(self, timeout):
+        events = super()._wait(0)
+        if events:
+            return events
+        next_time = self.feed.next_time()
+        if next_time is None:
+            self.stop()
+            return []
+        if timeout is not None and self.now + timeout < next_time:
+            self.now += timeout
+            return []
+        self.now = max(self.now, next_time)
+        self.feed.replay_until(self.now)
+        return super()._wait(0)
+
+
+class TouchFillModel:
+    """Market orders fill in full at the touch, moved against us by `slippage` (a fraction of the price)"""
+
+    def __init__(self, slippage=0.0):
+        self.slippage = slippage
+
+    def fill_price(self, side, ticker, limit=None):
+        """Fill price for an order against a REST-format ticker, or None if it would not fill"""
+        if side == "Buy":
+            touch = float(ticker.get("ask1Price") or 0)
+            price = touch * (1 + self.slippage)
+            marketable = limit is None or price <= limit
+        else:
+            touch = float(ticker.get("bid1Price") or 0)
+            price = touch * (1 - self.slippage)
+            marketable = limit is None or price >= limit
+        return price if touch > 0 and marketable else None
+
+
+def short_initial_margin(ticker, qty):
+    """Initial margin of a short option position of qty contracts"""
+    instrument = parse_symbol(ticker["symbol"])
+    underlying = float(ticker.get("underlyingPrice") or 0)
+    mark = float(ticker.get("markPrice") or 0)
+    otm = max(instrument.strike - underlying, 0) if instrument.is_call else max(underlying - instrument.strike, 0)
+    return (mark + max(SHORT_IM_RATE * underlying - otm, SHORT_MIN_IM_RATE * underlying)) * qty
+
+
+class SimulatedBybit:
+    """Stands in for DMABybit: fills orders against the replayed chain and keeps the account's positions"""
+
+    def __init__(self, store, clock, fill_model=None, category="option"):
+        self.store = store
+        self.clock = clock
+        self.fill_model = fill_model or TouchFillModel()
+        self.category = category
+        self.book = PositionLedger()
+        self.orders = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _response(self, result, ret_code=0, ret_msg="OK"):
+        return {"retCode": ret_code, "retMsg": ret_msg, "result": result, "time": int(self.clock() * 1000)}
+
+    def place_order(self, body):
+        symbol, side, qty = body["symbol"], body["side"], float(body["qty"])
+        ticker = self.store.ticker(symbol)
+        limit = float(body["price"]) if body.get("price") else None
+        price = self.fill_model.fill_price(side, ticker, limit) if ticker else None
+        if price is None:
+            return self._response({}, REJECT_CODE, f"No fill for {side} {symbol}")
+        fee = estimate_fee(price, float(ticker.get("underlyingPrice") or 0), qty)
+        with self._lock:
+            order_link_id = body.get("orderLinkId") or f"sim-{next(self._ids)}"
+            self.book.record_fill(symbol, side, qty, price, fee, order_link_id)
+            self.orders[order_link_id] = {
+                "orderId": order_link_id, "orderLinkId": order_link_id, "symbol": symbol, "side": side,
+                "orderType": body.get("orderType", "Market"), "orderStatus": "Filled", "qty": str(qty),
+                "cumExecQty": str(qty), "avgPrice": str(price), "cumExecValue": str(price * qty),
+                "cumExecFee": str(fee), "updatedTime": str(int(self.clock() * 1000)),
+            }
+        return self._response({"orderId": order_link_id, "orderLinkId": order_link_id})
+
+    def get_order_details(self, order_link_id, symbol=None):
+        order = self.orders.get(order_link_id)
+        return self._response({"list": [dict(order)] if order else []})
+
+    def get_open_positions(self, symbol=None, cursor=None, limit=None):
+        positions = []
+        for open_symbol in self.book.open_symbols():
+            if symbol and open_symbol != symbol:
+                continue
+            position = self.book.position(open_symbol)
+            ticker = self.store.ticker(open_symbol) or {"symbol": open_symbol}
+            mark = float(ticker.get("markPrice") or position.avg_price)
+            positions.append({
+                "symbol": open_symbol, "side": "Sell" if position.qty < 0 else "Buy",
+                "size": str(abs(position.qty)), "avgPrice": str(position.avg_price), "markPrice": str(mark),
+                "unrealisedPnl": str(position.unrealized_pnl(mark)), "curRealisedPnl": str(position.realized_pnl),
+                "positionIM": str(short_initial_margin(ticker, -position.qty) if position.qty < 0 else 0.0),
+            })
+        return self._response({"list": positions, "nextPageCursor": "", "category": self.category})
+
+    def get_tickers(self, category=None, symbol=None, base_coin=None, exp_date=None, typed=False):
+        tickers = [t for t in ([self.store.ticker(symbol)] if symbol else self.store.tickers(exp_date, base_coin)) if t]
+        return self._response({"category": category or self.category,
+                               "list": ticker_columns(tickers) if typed else tickers})
+
+    def close(self):
+        pass
+
+
+class BacktestResult(NamedTuple):
+    expiry: str
+    start: float  # simulated epoch seconds
+    end: float
+    events: int
+    trades: list  # (time, order_link_id, symbol, side, qty, price, realized_pnl)
+    realized_pnl: float
+    total_pnl: float
+    fees: float
+    max_drawdown: float
+    open_position: dict
+
+
+def max_drawdown(pnl_curve):
+    """Largest fall of a PnL curve from its running peak"""
+    if len(pnl_curve) == 0:
+        return 0.0
+    curve = np.asarray(pnl_curve, dtype=np.float64)
+    return float(np.max(np.maximum.accumulate(curve) - curve))
+
+
+@contextmanager
+def _replaced(module, **values):
+    saved = {name: getattr(module, name) for name in values}
+    for name, value in values.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(module, name, value)
+
+
+def run_backtest(events, expiry, rebalance_interval=strategy.REBALANCE_INTERVAL,
+                 reconcile_interval=strategy.RECONCILE_INTERVAL, fill_model=None, params=None):
+    """Run the strategy over replay events (see load_events) and return a BacktestResult.
+
+    params (a strategy.StrategyParams) defaults to the live thresholds.
+    """
+    feed = ReplayFeed(events)
+    scheduler = BacktestScheduler(feed, fatal_exceptions=(strategy.LegOrderError,))
+    client = SimulatedBybit(feed.store, scheduler.clock, fill_model)
+    ledger = PositionLedger()
+    trades = []
+
+    pnl_curve = []
+
+    def log_trade(order_link_id, symbol, side, qty, price, realized_pnl):
+        trades.append((scheduler.now, order_link_id, symbol, side, qty, price, realized_pnl))
+
+    def sample_pnl():
+        open_symbols = ledger.open_symbols()
+        chain = feed.store.option_chain(expiry) if open_symbols else None
+        pnl_curve.append(ledger.total_pnl(chain))
+
+    with _replaced(helpers, bybit=client), \
+            _replaced(strategy, bybit_client=client, market_feed=feed, ledger=ledger, clock=scheduler.clock,
+                      log_trade=log_trade, journal=TradeJournal(None), order_manager=None, total_realized_pnl=0.0,
+                      intital_margin_prices=0.0, pending_orders=set(),
+                      params=params or strategy.params):
+        start = scheduler.now
+        scheduler.call_every(EQUITY_SAMPLE_INTERVAL, sample_pnl)
+        position = strategy.run_strategy(expiry, rebalance_interval, reconcile_interval=reconcile_interval,
+                                         scheduler=scheduler)
+        total_pnl = ledger.total_pnl(feed.store.option_chain(expiry))
+    pnl_curve.append(total_pnl)
+    return BacktestResult(expiry, start, scheduler.now, feed.position, trades, ledger.realized_pnl(), total_pnl,
+                          sum(fill.fee for fill in ledger.fills), max_drawdown([0.0] + pnl_curve), position or {})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest the strategy on recorded option tickers')
+    parser.add_argument('--data', nargs='+', default=[DEFAULT_DATA], help='Stream recordings (.jsonl) and/or REST dumps')
+    parser.add_argument('--tick-store', type=str, help='Replay one day of this tick store instead of --data')
+    parser.add_argument('--day', type=str, help='Tick store day (YYYYMMDD), default: the first one')
+    parser.add_argument('--expiry', type=str, help='Expiry date in format DDMMMYY (e.g., 25APR25)', default="25APR25")
+    parser.add_argument('--rebalance-interval', type=float, default=strategy.REBALANCE_INTERVAL, help='Seconds between delta checks')
+    parser.add_argument('--reconcile-interval', type=float, default=strategy.RECONCILE_INTERVAL)
+    parser.add_argument('--slippage', type=float, default=0.0, help='Fill price slippage as a fraction of the touch')
+    parser.add_argument('--verbose', action='store_true', help='Show the strategy\'s INFO logging')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format=LOG_FORMAT)
+
+    started = time.perf_counter()
+    if args.tick_store:
+        store = TickStore(args.tick_store)
+        events = RecordEvents.from_store(store, args.day or store.days()[0])
+    else:
+        events = load_events(args.data)
+    result = run_backtest(events, args.expiry, args.rebalance_interval, args.reconcile_interval,
+                          TouchFillModel(args.slippage))
+    elapsed = time.perf_counter() - started
+    for trade in result.trades:
+        print("  ".join(str(field) for field in trade))
+    print(f"Replayed {result.events} events ({result.end - result.start:.1f}s of market time) in {elapsed:.2f}s")
+    print(f"Trades: {len(result.trades)}, realized PnL: {result.realized_pnl:.4f}, total PnL: {result.total_pnl:.4f}, "
+          f"fees: {result.fees:.4f}, max drawdown: {result.max_drawdown:.4f}")
+    print(f"Open position: {result.open_position}")
+    tick_to_order = strategy.metrics.quantiles("strategy_tick_to_order_seconds")
+    print(f"Tick-to-order (strategy compute, simulated exchange): p50 {tick_to_order[0.5] * 1e3:.2f} ms, "
+          f"p99 {tick_to_order[0.99] * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark: backtest throughput in strategy-days per hour.
+
+Builds a synthetic trading day from the recorded stream sample: the
+underlying follows a random walk and every option's prices move by its
+delta, with one round of ticker deltas for the whole chain every `step`
+seconds. The day is then backtested with the default cadences and timed.
+
+Usage: python benchmarks/bench_backtest.py [step_seconds] [days]
+"""
+
+import logging
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest import DEFAULT_DATA, load_events, run_backtest
+from instruments import parse_symbol
+
+DAY = 24 * 60 * 60
+ANNUAL_VOL = 0.5
+
+
+def synthetic_day(snapshots, step, seed=0):
+    """Replay events for one day: the recorded snapshots, then a delta round every step seconds"""
+    rng = random.Random(seed)
+    start = snapshots[0][0]
+    events = list(snapshots)
+    tickers = {message["data"]["symbol"]: dict(message["data"]) for _, _, message in snapshots}
+    underlying = float(next(iter(tickers.values()))["underlyingPrice"])
+    step_vol = ANNUAL_VOL * math.sqrt(step / (365 * DAY))
+    for i in range(1, DAY // step):
+        move = underlying * step_vol * rng.gauss(0, 1)
+        underlying += move
+        ts = int((start + i * step) * 1000)
+        for symbol, ticker in tickers.items():
+            change = float(ticker["delta"]) * move
+            update = {"symbol": symbol, "underlyingPrice": f"{underlying:.2f}"}
+            for field in ("bidPrice", "askPrice", "markPrice"):
+                ticker[field] = f"{max(float(ticker[field]) + change, 0.0):.4f}"
+                update[field] = ticker[field]
+            events.append((ts / 1000, "message", {"topic": f"tickers.{symbol}", "type": "delta", "ts": ts, "data": update}))
+    return events
+
+
+def main():
+    step = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    logging.getLogger().setLevel(logging.WARNING)
+    snapshots = [event for event in load_events([DEFAULT_DATA]) if event[2].get("type") == "snapshot"]
+    expiry = parse_symbol(snapshots[0][2]["data"]["symbol"]).expiry_code
+
+    elapsed = 0.0
+    messages = 0
+    for seed in range(days):
+        events = synthetic_day(snapshots, step, seed)
+        started = time.perf_counter()
+        result = run_backtest(events, expiry)
+        elapsed += time.perf_counter() - started
+        messages += result.events
+        print(f"day {seed}: {result.events} messages, {len(result.trades)} trades, total PnL {result.total_pnl:.4f}")
+
+    print(f"{days} strategy-days, {messages} messages in {elapsed:.2f}s: "
+          f"{messages / elapsed:,.0f} messages/s, {days / elapsed * 3600:,.0f} strategy-days/hour (one process)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark: serve N expiries from one full-chain response instead of N filtered ones.
+
+Compares, per cycle, decoding one exp_date-filtered tickers response per
+expiry into its own OptionChain (what several instances each polling their
+expiry did) with decoding the full chain response once and partitioning it
+into per-expiry views (chain_manager.ChainManager). Bytes are the response
+bodies received per cycle. The full chain carries every listed expiry, so
+trading only a few of them moves more bytes than filtered requests would;
+what it saves is the request per expiry (a round trip and a rate limit
+token each), and the two break even on bytes once most expiries are traded.
+
+Usage: python benchmarks/bench_chain_fanout.py [expiries] [recorded_file]
+"""
+
+import json
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from decoding import decode_tickers_response
+from option_chain import OptionChain
+from recordings import load_recorded_tickers
+
+
+def body_of(tickers, now_ms):
+    return json.dumps({"retCode": 0, "retMsg": "SUCCESS", "time": now_ms,
+                       "result": {"category": "option", "list": tickers}}).encode()
+
+
+def main():
+    tickers, now_ms = load_recorded_tickers(sys.argv[2] if len(sys.argv) > 2 else None)
+    by_expiry = {}
+    for ticker in tickers:
+        by_expiry.setdefault(ticker["symbol"].split("-")[1], []).append(ticker)
+    # The most listed expiries, as the instances would trade them
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    expiries = sorted(by_expiry, key=lambda expiry: -len(by_expiry[expiry]))[:n]
+    filtered = [body_of(by_expiry[expiry], now_ms) for expiry in expiries]
+    full = body_of(tickers, now_ms)
+
+    def per_expiry():
+        return [OptionChain.from_tickers(decode_tickers_response(body)["result"]["list"]) for body in filtered]
+
+    def fan_out():
+        return OptionChain.from_tickers(decode_tickers_response(full)["result"]["list"]).partition()
+
+    rounds = 50
+    print(f"{len(expiries)} expiries ({', '.join(expiries)}) of a {len(tickers)}-ticker chain")
+    for name, fn, received in (("request per expiry", per_expiry, sum(map(len, filtered))),
+                               ("full chain + partition", fan_out, len(full))):
+        elapsed = min(timeit.repeat(fn, number=rounds, repeat=3)) / rounds
+        requests = len(filtered) if fn is per_expiry else 1
+        print(f"{name:24s} {elapsed * 1e3:8.3f} ms  {requests} request(s)  {received / 1024:6.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
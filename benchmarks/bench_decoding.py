@@ -0,0 +1,61 @@
+"""
+Benchmark: decode the recorded option chain response and convert it to numbers.
+
+Times body -> OptionChain (and body -> get_iv_and_greeks' dict) for the
+stdlib path the client used before (json.loads, then float() per field per
+ticker), the fast loads() backend with the same conversion, and the typed
+ticker schema (decoding.decode_tickers_response). Allocations are the
+tracemalloc peak while decoding and converting the full response.
+
+Usage: python benchmarks/bench_decoding.py [recorded_file]
+"""
+
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from decoding import JSON_BACKEND, decode_tickers_response, loads
+from market_data_feed import parse_option_tickers
+from option_chain import OptionChain
+from recordings import load_recorded_tickers
+
+
+def peak_allocated(fn):
+    """Peak bytes allocated by Python while running fn()"""
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    tickers, now_ms = load_recorded_tickers(sys.argv[1] if len(sys.argv) > 1 else None)
+    body = json.dumps({"retCode": 0, "retMsg": "SUCCESS", "time": now_ms,
+                       "result": {"category": "option", "list": tickers}}).encode()
+
+    cases = [
+        ("json.loads + float()", lambda: OptionChain.from_tickers(json.loads(body)["result"]["list"]),
+         lambda: parse_option_tickers(json.loads(body)["result"]["list"])),
+        (f"{JSON_BACKEND}.loads + float()", lambda: OptionChain.from_tickers(loads(body)["result"]["list"]),
+         lambda: parse_option_tickers(loads(body)["result"]["list"])),
+        ("typed ticker schema", lambda: OptionChain.from_tickers(decode_tickers_response(body)["result"]["list"]),
+         lambda: parse_option_tickers(decode_tickers_response(body)["result"]["list"])),
+    ]
+
+    n = 50
+    print(f"{len(tickers)} tickers, {len(body) / 1024:.0f} KiB response body")
+    print(f"{'':28s} {'-> OptionChain':>15s} {'-> options dict':>16s} {'peak KiB':>9s}")
+    for name, to_chain, to_dict in cases:
+        chain_time = min(timeit.repeat(to_chain, number=n, repeat=3)) / n
+        dict_time = min(timeit.repeat(to_dict, number=n, repeat=3)) / n
+        peak = peak_allocated(to_chain)
+        print(f"{name:28s} {chain_time * 1e3:12.3f} ms {dict_time * 1e3:13.3f} ms {peak / 1024:9.0f}")
+
+
+if __name__ == "__main__":
+    main()
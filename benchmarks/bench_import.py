@@ -0,0 +1,74 @@
+"""
+Benchmark: time `import strategy` with python -X importtime, and enforce a budget.
+
+Imports the strategy in a fresh interpreter (run in an empty directory, so
+any file it creates shows up), a few times, and reports the best total
+import time and the slowest top-level packages. Exits non-zero if the
+import takes longer than the budget, loads one of the modules that must
+stay lazy (API client, HTTP, WebSocket, .env), or creates files.
+
+Usage: python benchmarks/bench_import.py [--budget-ms 200] [--runs 5]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_BUDGET_MS = 200
+# Loaded on first use only (see app_context.py)
+LAZY_MODULES = ("bybit_apis", "helpers", "requests", "websockets", "dotenv", "market_data_feed", "tickstore",
+                "order_manager")
+
+
+def import_times(module):
+    """({module: (self_us, cumulative_us)}, files created) for one import of module in a fresh interpreter"""
+    with tempfile.TemporaryDirectory() as cwd:
+        env = dict(os.environ, PYTHONPATH=REPO_DIR)
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=cwd, env=env,
+                                capture_output=True, text=True, check=True)
+        created = os.listdir(cwd)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times, created
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure and enforce the strategy import time budget')
+    parser.add_argument('--budget-ms', type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [import_times("strategy") for _ in range(args.runs)]
+    times, created = min(runs, key=lambda run: run[0]["strategy"][1])
+    total_ms = times["strategy"][1] / 1e3
+    by_package = {}
+    for name, (self_us, _) in times.items():
+        package = name.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+    print(f"import strategy: {total_ms:.1f} ms (best of {args.runs}), {len(times)} modules")
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:10]:
+        print(f"  {package:24s} {self_us / 1e3:7.1f} ms")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"import took {total_ms:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+    eager = [name for name in LAZY_MODULES if name in times]
+    if eager:
+        failures.append(f"imported modules that should load lazily: {', '.join(eager)}")
+    if created:
+        failures.append(f"import created files: {', '.join(created)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark: price the full recorded option chain locally.
+
+Times vectorized greeks and implied vol over every option in the recorded
+tickers response (api_responses/), against a per-option scalar loop, and
+reports how closely the local greeks match the exchange's.
+
+Usage: python benchmarks/bench_pricing.py [recorded_file]
+"""
+
+import math
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from option_chain import OptionChain
+from pricing import chain_greeks, implied_vol, time_to_expiry
+from recordings import load_recorded_tickers
+
+
+def scalar_delta(underlying, strike, t, iv, is_call):
+    """One option at a time with the math module, as a plain Python loop would"""
+    if t <= 0 or iv <= 0:
+        return 0.0
+    d1 = (math.log(underlying / strike) + 0.5 * iv * iv * t) / (iv * math.sqrt(t))
+    n1 = 0.5 * (1 + math.erf(d1 / math.sqrt(2)))
+    return n1 if is_call else n1 - 1
+
+
+def main():
+    tickers, now_ms = load_recorded_tickers(sys.argv[1] if len(sys.argv) > 1 else None)
+    chain = OptionChain.from_tickers(tickers)
+    t = time_to_expiry(chain.expiry, now_ms)
+    rows = list(zip(chain.underlying.tolist(), chain.strike.tolist(), t.tolist(), chain.iv.tolist(),
+                    chain.is_call.tolist()))
+
+    def run_scalar():
+        return [scalar_delta(*row) for row in rows]
+
+    def run_greeks():
+        return chain_greeks(chain, now_ms)
+
+    def run_iv():
+        return implied_vol(chain.mark, chain.underlying, chain.strike, t, chain.is_call)
+
+    n = 200
+    scalar = min(timeit.repeat(run_scalar, number=n, repeat=3)) / n
+    greeks = min(timeit.repeat(run_greeks, number=n, repeat=3)) / n
+    iv_time = min(timeit.repeat(run_iv, number=20, repeat=3)) / 20
+
+    print(f"options in chain:              {len(chain)}")
+    print(f"scalar loop (delta only):      {scalar * 1e3:8.3f} ms")
+    print(f"vectorized price + 4 greeks:   {greeks * 1e3:8.3f} ms")
+    print(f"vectorized implied vol:        {iv_time * 1e3:8.3f} ms")
+
+    result = run_greeks()
+    iv = run_iv()
+    print("\naccuracy vs recorded exchange values (max abs error / median abs value):")
+    for name, ours, theirs in (("delta", result["delta"], chain.delta), ("price", result["price"], chain.mark),
+                               ("vega", result["vega"], chain.vega), ("gamma", result["gamma"], chain.gamma),
+                               ("theta", result["theta"], chain.theta), ("markIv", iv, chain.iv)):
+        print(f"  {name:6s} {np.nanmax(np.abs(ours - theirs)):12.6g} / {np.median(np.abs(theirs)):12.6g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Micro-benchmark: per-request Coinswitch signing overhead.
+
+Compares the original signing path (hex-decode the secret and build a new
+SigningKey for every request, encode the query twice) against the cached
+key / single canonicalization path used by DMABybit.
+
+Usage: python benchmarks/bench_signing.py [iterations]
+"""
+
+import os
+import sys
+import time
+import timeit
+import urllib.parse
+from urllib.parse import urlencode, urlparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nacl.signing import SigningKey
+
+from bybit_apis import DMABybit
+
+API_SECRET = SigningKey.generate().encode().hex()
+ENDPOINT = "/v5/market/tickers"
+PARAMS = {"category": "option", "baseCoin": "BTC", "expDate": "25APR25"}
+
+
+def legacy_signature(api_key, api_secret, method, endpoint, params):
+    """Signing as it was done before the key was cached on the client"""
+    epoch_time = str(int(time.time()))
+    unquote_endpoint = endpoint
+    if method == "GET" and params:
+        endpoint += ('&', '?')[urlparse(endpoint).query == ''] + urlencode(params)
+        unquote_endpoint = urllib.parse.unquote_plus(endpoint)
+    signature_msg = method + unquote_endpoint + epoch_time
+    signing_key = SigningKey(bytes.fromhex(api_secret))
+    signature = signing_key.sign(signature_msg.encode('utf-8')).signature.hex()
+    headers = {'X-AUTH-SIGNATURE': signature, 'X-AUTH-APIKEY': api_key, 'X-AUTH-EPOCH': epoch_time}
+    # requests then urlencoded the params a second time when sending
+    urlencode(params)
+    return {'Content-Type': 'application/json', **headers}
+
+
+def cached_signature(client, method, endpoint, params):
+    _, signed_path = client._canonical_path(method, endpoint, params)
+    return client._signed_headers(method, signed_path)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    client = DMABybit("key", API_SECRET, symbol="BTCUSDT", category="option")
+
+    legacy = min(timeit.repeat(lambda: legacy_signature("key", API_SECRET, "GET", ENDPOINT, PARAMS),
+                               number=iterations, repeat=5))
+    cached = min(timeit.repeat(lambda: cached_signature(client, "GET", ENDPOINT, PARAMS),
+                               number=iterations, repeat=5))
+
+    print(f"iterations: {iterations}")
+    print(f"legacy signing: {legacy / iterations * 1e6:8.2f} us/request")
+    print(f"cached signing: {cached / iterations * 1e6:8.2f} us/request")
+    print(f"speedup:        {legacy / cached:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Benchmark: parameter sweep scaling with worker processes.
+
+Packs synthetic days (see bench_backtest.py) once, then runs the same sweep
+with 1, 2, 4, ... worker processes up to the CPU count and reports the
+speedup over one worker. Workers memory-map the packed days, so adding
+workers should not add parsing work.
+
+Usage: python benchmarks/bench_sweep.py [days] [step_seconds]
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest import DEFAULT_DATA, load_events
+from bench_backtest import synthetic_day
+from sweep import pack_day, param_grid, sweep
+
+
+def main():
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    step = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    logging.getLogger().setLevel(logging.WARNING)
+    snapshots = [event for event in load_events([DEFAULT_DATA]) if event[2].get("type") == "snapshot"]
+    grid = param_grid(target_delta=(0.1, 0.15), exit_margin_fraction=(0.05, 0.1))
+
+    with tempfile.TemporaryDirectory(prefix="bench-sweep-") as cache_dir:
+        packed = [pack_day(f"synthetic{seed}", synthetic_day(snapshots, step, seed),
+                           os.path.join(cache_dir, f"day{seed}.ticks")) for seed in range(days)]
+        counts = [1]
+        while counts[-1] * 2 <= (os.cpu_count() or 1):
+            counts.append(counts[-1] * 2)
+        baseline = None
+        for workers in counts:
+            started = time.perf_counter()
+            results = sweep(packed, grid, workers)
+            elapsed = time.perf_counter() - started
+            baseline = baseline or elapsed
+            print(f"{workers:>3} workers: {len(results)} backtests in {elapsed:.2f}s "
+                  f"({len(results) / elapsed * 3600:,.0f} strategy-days/hour, speedup {baseline / elapsed:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
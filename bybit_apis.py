@@ -21,6 +21,13 @@ from urllib.parse import urlparse, urlencode
 
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from decoding import decode_tickers_response, loads
+from metrics import REGISTRY
+from rate_limiter import RateLimiter
+from response_cache import ACCOUNT_GROUPS, ResponseCache
 
 # Conditional import for pynacl (which provides ed25519 functionality)
 try:
@@ -30,71 +37,179 @@ except ImportError:
     SigningKey = None
 
 
+# Defaults for the pooled HTTP session. Timeouts are (connect, read) in seconds.
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = (3.05, 10)
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.3
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def create_session(pool_size=DEFAULT_POOL_SIZE, max_retries=DEFAULT_MAX_RETRIES,
+                   backoff_factor=DEFAULT_BACKOFF_FACTOR):
+    """Create a keep-alive, connection-pooled session for the Coinswitch DMA API.
+
+    Retries on status codes only apply to idempotent methods (GET); a POST such as
+    order creation is never resent once the request has reached the server.
+    """
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(["GET"]),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
 class DMABybit:
-    def __init__(self, api_key, api_secret, symbol, category="linear"):
+    def __init__(self, api_key, api_secret, symbol, category="linear", session=None,
+                 pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 max_retries=DEFAULT_MAX_RETRIES, backoff_factor=DEFAULT_BACKOFF_FACTOR, cache=None,
+                 rate_limiter=None, metrics=REGISTRY):
+        """
+        Args:
+            session (requests.Session, optional): Shared session; pass another client's
+                `session` to reuse its connection pool. Created if not given.
+            cache (ResponseCache, optional): Cache for tickers, positions and balance; pass
+                another client's `cache` to share responses and invalidation. Created with
+                the default TTLs if not given; ResponseCache({}) disables caching.
+            rate_limiter (RateLimiter, optional): Token buckets every request waits on, orders
+                first; pass another client's `rate_limiter` when both use the same account.
+                Created with the default limits if not given.
+            metrics (MetricsRegistry): Receives per-endpoint sign/network/decode latencies,
+                rate limit waits and request outcomes
+            pool_size (int): Max pooled keep-alive connections to the DMA host
+            timeout (float | tuple): Request timeout, or (connect, read) timeouts in seconds
+            max_retries (int): Retries for connection errors and retryable GET responses
+            backoff_factor (float): Exponential backoff factor between retries
+        """
         self.api_key = api_key
         self.api_secret = api_secret
         self.coinswitch_url = "https://dma.coinswitch.co"
         self.category = category
         self.symbol = symbol
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.session = session or self._create_session(pool_size)
+        self.cache = cache if cache is not None else ResponseCache()
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.metrics = metrics
+        # Per-client signing state: the key is derived lazily, static headers up front
+        self._signing_key = None
+        self._auth_headers = {
+            'Content-Type': 'application/json',
+            'X-AUTH-APIKEY': api_key
+        }
 
-    def _generate_coinswitch_signature(self, method, endpoint, params=None):
-        """Generate signature for Coinswitch API requests using pynacl"""
-        if not SigningKey:
-            raise ImportError("pynacl library is required for Coinswitch signature generation")
-
-        params = params or {}
+    def _create_session(self, pool_size):
+        return create_session(pool_size, self.max_retries, self.backoff_factor)
+
+    def close(self):
+        """Close the pooled connections held by the session"""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def signing_key(self):
+        """ed25519 key derived from api_secret, built once per client"""
+        if self._signing_key is None:
+            if not SigningKey:
+                raise ImportError("pynacl library is required for Coinswitch signature generation")
+            self._signing_key = SigningKey(bytes.fromhex(self.api_secret))
+        return self._signing_key
+
+    @staticmethod
+    def _canonical_path(method, endpoint, params=None):
+        """Return (path to send, path to sign) with GET params encoded exactly once"""
+        if method != "GET" or not params:
+            return endpoint, endpoint
+        path = endpoint + ('&', '?')[urlparse(endpoint).query == ''] + urlencode(params)
+        return path, urllib.parse.unquote_plus(path)
+
+    def _signed_headers(self, method, signed_path):
+        """Sign a canonical path and return the full request headers"""
         epoch_time = str(int(time.time()))
-
-        # Modify endpoint for GET requests with params
-        unquote_endpoint = endpoint
-        if method == "GET" and params:
-            endpoint += ('&', '?')[urlparse(endpoint).query == ''] + urlencode(params)
-            unquote_endpoint = urllib.parse.unquote_plus(endpoint)
-
-        signature_msg = method + unquote_endpoint + epoch_time
-
-        # Generate signature using pynacl
-        secret_key_bytes = bytes.fromhex(self.api_secret)
-        signing_key = SigningKey(secret_key_bytes)
-        signed = signing_key.sign(signature_msg.encode('utf-8'))
-        signature = signed.signature.hex()
-
+        signature_msg = method + signed_path + epoch_time
+        signature = self.signing_key.sign(signature_msg.encode('utf-8')).signature.hex()
         return {
+            **self._auth_headers,
             'X-AUTH-SIGNATURE': signature,
-            'X-AUTH-APIKEY': self.api_key,
             'X-AUTH-EPOCH': epoch_time
         }
 
-    def _prepare_request(self, endpoint, method='GET', params=None, body=None):
-        """Prepare and send Coinswitch API request"""
-        # Prepare full URL
-        full_url = f"{self.coinswitch_url}{endpoint}"
-
-        # Get Coinswitch signature headers
-        signature_headers = self._generate_coinswitch_signature(method, endpoint, params)
-
-        # Prepare headers
-        headers = {
-            'Content-Type': 'application/json',
-            **signature_headers
-        }
+    def _generate_coinswitch_signature(self, method, endpoint, params=None):
+        """Generate signature for Coinswitch API requests using pynacl"""
+        _, signed_path = self._canonical_path(method, endpoint, params)
+        headers = self._signed_headers(method, signed_path)
+        del headers['Content-Type']
+        return headers
+
+    def _cached_request(self, group, endpoint, params, decode=loads):
+        """GET a read-only endpoint through the response cache, under the group's TTL"""
+        key = (group, self.api_key, endpoint, tuple(params.items()), decode)
+        return self.cache.get_or_fetch(key, lambda: self._prepare_request(endpoint, params=params, decode=decode))
+
+    def _prepare_request(self, endpoint, method='GET', params=None, body=None, decode=loads):
+        """Prepare and send Coinswitch API request. The response body is decoded with decode (bytes -> response)."""
+        if method not in ('GET', 'POST'):
+            raise ValueError(f"Unsupported HTTP method: {method}")
+
+        # GET params are encoded once into the path, so the query we sign is the one we send
+        path, signed_path = self._canonical_path(method, endpoint, params)
+        full_url = f"{self.coinswitch_url}{path}"
+        self.metrics.observe("api_rate_limit_wait_seconds", self.rate_limiter.acquire(endpoint), endpoint=endpoint)
+        started = time.perf_counter()
+        headers = self._signed_headers(method, signed_path)
+        sent = time.perf_counter()
+        self.metrics.observe("api_sign_seconds", sent - started, endpoint=endpoint)
 
         try:
-            if method == 'GET':
-                response = requests.get(full_url, headers=headers, params=params)
-            elif method == 'POST':
-                response = requests.post(full_url, headers=headers, json=body)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
+            try:
+                if method == 'GET':
+                    response = self.session.get(full_url, headers=headers, timeout=self.timeout)
+                else:
+                    try:
+                        response = self.session.post(full_url, headers=headers, json=body, timeout=self.timeout)
+                    finally:
+                        # Orders and margin changes move positions and balance, even when the reply is lost
+                        self.cache.invalidate(*ACCOUNT_GROUPS)
+            finally:
+                received = time.perf_counter()
+                self.metrics.observe("api_network_seconds", received - sent, endpoint=endpoint)
 
             # Check and return response
+            self.rate_limiter.update(endpoint, response.headers, response.status_code)
             response.raise_for_status()
-            return response.json()
+            result = decode(response.content)
+            self.metrics.observe("api_decode_seconds", time.perf_counter() - received, endpoint=endpoint)
+            if isinstance(result, dict):
+                self.rate_limiter.update(endpoint, ret_code=result.get("retCode"))
+            self.metrics.inc("api_requests_total", endpoint=endpoint, outcome="ok")
+            return result
 
         except requests.RequestException as e:
+            self.metrics.inc("api_requests_total", endpoint=endpoint, outcome="request_error")
             print(f"Request error: {e}")
-            print(f"Response content: {e.response.text if hasattr(e, 'response') else 'No response'}")
+            print(f"Response content: {e.response.text if e.response is not None else 'No response'}")
+            return None
+        except ValueError as e:  # body is not valid JSON (or not a tickers response, for a typed decode)
+            self.metrics.inc("api_requests_total", endpoint=endpoint, outcome="decode_error")
+            print(f"Response decode error: {e}")
+            print(f"Response content: {response.text}")
             return None
 
     def transfer_funds(self, direction, amount):
@@ -166,18 +281,27 @@ class DMABybit:
         print("place order body", body)
         return self._prepare_request(endpoint, method='POST', body=body)
 
-    def get_order_details(self, order_link_id):
-        """Retrieve specific order details"""
+    def get_order_details(self, order_link_id, symbol=None):
+        """Retrieve specific order details.
+
+        orderLinkId is unique, so the symbol is optional; when given it must be
+        the order's own symbol (e.g. the option's, not the client's default).
+        """
         endpoint = "/v5/order/realtime"
         params = {
-            'symbol': self.symbol,
             'orderLinkId': order_link_id,
             'category': self.category
         }
+        if symbol:
+            params['symbol'] = symbol
         return self._prepare_request(endpoint, params=params)
 
-    def get_open_positions(self, symbol=None):
-        """Get open positions for the symbol"""
+    def get_open_positions(self, symbol=None, cursor=None, limit=None):
+        """Get open positions, for one symbol or (one page of) all of them.
+
+        Pass the previous response's result.nextPageCursor as `cursor` to page
+        through the full list; `limit` is the page size (max 200).
+        """
         endpoint = "/v5/position/list"
         params = {
             # 'baseCoin': self.symbol,
@@ -186,7 +310,11 @@ class DMABybit:
         }
         if symbol:
             params['symbol'] = symbol
-        return self._prepare_request(endpoint, params=params)
+        if limit:
+            params['limit'] = limit
+        if cursor:
+            params['cursor'] = cursor
+        return self._cached_request("positions", endpoint, params)
 
     def add_margin(self, margin_amount=1):
         """Add margin to the position"""
@@ -237,7 +365,7 @@ class DMABybit:
         return self._prepare_request(endpoint, method='GET')
 
 
-    def get_tickers(self, category=None, symbol=None, base_coin=None, exp_date=None):
+    def get_tickers(self, category=None, symbol=None, base_coin=None, exp_date=None, typed=False):
         """
         Get tickers information
         
@@ -246,6 +374,8 @@ class DMABybit:
             symbol (str, optional): Symbol name
             base_coin (str, optional): Base coin. For option only
             exp_date (str, optional): Expiry date. For option only. Format: 25DEC22
+            typed (bool, optional): Option tickers only. Decode result.list straight into
+                numeric TickerColumns (decoding.decode_tickers_response)
             
         Returns:
             dict: API response
@@ -262,7 +392,7 @@ class DMABybit:
         if exp_date:
             params['expDate'] = exp_date
             
-        return self._prepare_request(endpoint, params=params)
+        return self._cached_request("tickers", endpoint, params, decode_tickers_response if typed else loads)
     
     def get_balance(self):
         endpoint = "/v5/account/wallet-balance"
@@ -270,7 +400,7 @@ class DMABybit:
             "category": self.category,
             "accountType": "UNIFIED"
         }
-        return self._prepare_request(endpoint, params=params)
+        return self._cached_request("balance", endpoint, params)
 
 def main():
     load_dotenv()
@@ -0,0 +1,88 @@
+import asyncio
+import json
+import os
+import sys
+import unittest
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from async_bybit_apis import AsyncDMABybit
+
+TEST_SECRET = "33" * 32
+
+
+class TestAsyncDMABybit(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.status_codes = []
+
+        async def handler(request):
+            self.requests.append(request)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            status = self.status_codes.pop(0) if self.status_codes else 200
+            return httpx.Response(status, json={"retCode": 0, "result": {"path": request.url.raw_path.decode()}})
+
+        session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        self.client = AsyncDMABybit("key", TEST_SECRET, symbol="BTCUSDT", category="option",
+                                    session=session, backoff_factor=0)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def test_methods_are_awaitable_and_run_concurrently(self):
+        results = await asyncio.gather(
+            self.client.get_tickers(category="option", base_coin="BTC"),
+            self.client.get_open_positions(),
+            self.client.get_balance(),
+            self.client.get_order_details("abc"),
+        )
+        self.assertEqual([r["retCode"] for r in results], [0, 0, 0, 0])
+        self.assertEqual(self.max_in_flight, 4)
+        self.assertEqual(results[0]["result"]["path"], "/v5/market/tickers?category=option&baseCoin=BTC")
+
+    async def test_sync_with_is_refused(self):
+        with self.assertRaises(TypeError):
+            with self.client:
+                pass
+        async with self.client as client:
+            self.assertIs(client, self.client)
+
+    async def test_place_order_posts_signed_body(self):
+        await self.client.place_order({"symbol": "BTC-25APR25-90000-C-USDT", "side": "Sell", "qty": "0.01"})
+        request = self.requests[0]
+        body = json.loads(request.content)
+        self.assertEqual(request.method, "POST")
+        self.assertEqual(body["category"], "option")
+        self.assertIn("orderLinkId", body)
+        self.assertIn("X-AUTH-SIGNATURE", request.headers)
+
+    async def test_get_retried_on_throttling_but_post_is_not(self):
+        self.status_codes = [429, 200]
+        self.assertEqual((await self.client.get_balance())["retCode"], 0)
+        self.assertEqual(len(self.requests), 2)
+
+        self.status_codes = [503]
+        self.assertIsNone(await self.client.place_order({"symbol": "X", "side": "Buy", "qty": "1"}))
+        self.assertEqual(len(self.requests), 3)
+
+    async def test_concurrent_reads_share_one_request_until_an_order(self):
+        results = await asyncio.gather(*[self.client.get_open_positions() for _ in range(3)])
+        self.assertEqual(len(self.requests), 1)
+        self.assertIs(results[0], results[2])
+        await self.client.get_open_positions()
+        self.assertEqual(len(self.requests), 1)
+        await self.client.place_order({"symbol": "BTC-25APR25-90000-C-USDT", "side": "Sell", "qty": "0.01"})
+        await self.client.get_open_positions()
+        self.assertEqual(len(self.requests), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import json
+import os
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bybit_apis import DMABybit
+
+TEST_SECRET = "11" * 32
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = set()
+
+    def _reply(self):
+        _Handler.connections.add(self.client_address)
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        payload = json.dumps({"retCode": 0, "retMsg": "OK", "result": {"path": self.path}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = _reply
+    do_POST = _reply
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestSessionPool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        _Handler.connections.clear()
+
+    def _client(self, **kwargs):
+        client = DMABybit("key", TEST_SECRET, symbol="BTCUSDT", category="option", **kwargs)
+        client.coinswitch_url = f"http://127.0.0.1:{self.server.server_port}"
+        return client
+
+    def test_requests_reuse_one_connection(self):
+        with self._client() as client:
+            for _ in range(5):
+                self.assertEqual(client.get_tickers(category="option", base_coin="BTC")["retCode"], 0)
+            client.place_order({"symbol": "BTC-25APR25-90000-C-USDT", "side": "Sell", "qty": "0.01"})
+        self.assertEqual(len(_Handler.connections), 1)
+
+    def test_clients_share_session(self):
+        first = self._client()
+        second = self._client(session=first.session)
+        self.assertIs(first.session, second.session)
+        first.get_balance()
+        second.get_open_positions()
+        self.assertEqual(len(_Handler.connections), 1)
+        first.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
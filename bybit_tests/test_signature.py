@@ -0,0 +1,52 @@
+import os
+import sys
+import unittest
+import urllib.parse
+from unittest import mock
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nacl.signing import SigningKey
+
+from bybit_apis import DMABybit
+
+TEST_SECRET = "22" * 32
+
+
+class TestSignature(unittest.TestCase):
+    def setUp(self):
+        self.client = DMABybit("key", TEST_SECRET, symbol="BTCUSDT", category="option")
+        self.verify_key = SigningKey(bytes.fromhex(TEST_SECRET)).verify_key
+
+    def test_signing_key_is_derived_once(self):
+        self.assertIs(self.client.signing_key, self.client.signing_key)
+
+    def test_signature_covers_unquoted_query(self):
+        params = {"category": "option", "baseCoin": "BTC", "expDate": "25APR25"}
+        headers = self.client._generate_coinswitch_signature("GET", "/v5/market/tickers", params)
+        message = "GET/v5/market/tickers?category=option&baseCoin=BTC&expDate=25APR25" + headers["X-AUTH-EPOCH"]
+        self.verify_key.verify(message.encode(), bytes.fromhex(headers["X-AUTH-SIGNATURE"]))
+        self.assertEqual(headers["X-AUTH-APIKEY"], "key")
+
+    def test_sent_query_is_the_signed_query(self):
+        response = mock.Mock()
+        response.content = b'{"retCode": 0}'
+        response.headers = {}
+        with mock.patch.object(self.client.session, "get", return_value=response) as get:
+            self.client.get_order_details("link id/1")
+        url = get.call_args.args[0]
+        headers = get.call_args.kwargs["headers"]
+        path = url[len(self.client.coinswitch_url):]
+        message = "GET" + urllib.parse.unquote_plus(path) + headers["X-AUTH-EPOCH"]
+        self.verify_key.verify(message.encode(), bytes.fromhex(headers["X-AUTH-SIGNATURE"]))
+        self.assertIn("orderLinkId=link+id%2F1", path)
+
+    def test_post_signs_bare_endpoint(self):
+        headers = self.client._generate_coinswitch_signature("POST", "/v5/order/create")
+        message = "POST/v5/order/create" + headers["X-AUTH-EPOCH"]
+        self.verify_key.verify(message.encode(), bytes.fromhex(headers["X-AUTH-SIGNATURE"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
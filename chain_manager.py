@@ -0,0 +1,80 @@
+"""
+One option chain fetch per cycle, shared by every strategy instance.
+
+Instances trading several expiries (and base coins) would otherwise each
+request /v5/market/tickers filtered by exp_date, and decode their own copy,
+every cycle. ChainManager fetches the full chain once per base coin instead
+(or takes one copy of a streaming OptionChainStore), partitions it by base
+coin and expiry with OptionChain.partition(), and hands out the per-expiry
+views, which share the partitioned arrays:
+
+    chains = ChainManager(client=bybit_client, base_coins=["BTC", "ETH"])
+    chains.refresh()  # once per cycle, e.g. first thing on a market update
+    chain = chains.chain("BTC", "25APR25")
+
+chain() refreshes on its own if the last refresh of that base coin is older
+than max_age, so readers outside the cycle (e.g. rebalance timers) never act
+on an old chain.
+"""
+
+import threading
+import time
+
+from instruments import parse_expiry_code
+from option_chain import OptionChain
+
+# Seconds a refreshed chain is served without refetching (matches the tickers response cache TTL)
+CHAIN_MAX_AGE = 1.0
+
+
+class ChainManager:
+    """Latest full option chain per base coin, split into per-expiry views.
+
+    Reads from a streaming OptionChainStore when given one, else from
+    client.get_tickers (one request per base coin per refresh). With live, a
+    store is only read while live() is true (its stream is connected); while
+    not, chains come from the client.
+    """
+
+    def __init__(self, client=None, store=None, base_coins=("BTC",), max_age=CHAIN_MAX_AGE, clock=time.monotonic,
+                 live=None):
+        if client is None and store is None:
+            raise ValueError("ChainManager needs a client or a store")
+        self.client = client
+        self.store = store
+        self.live = live
+        self.base_coins = list(base_coins)
+        self.max_age = max_age
+        self.clock = clock
+        self.fetches = 0
+        self._parts = {}  # (base_coin, expiry date) -> OptionChain view
+        self._refreshed = {}  # base_coin -> clock() of its last refresh
+        self._lock = threading.Lock()
+
+    def _fetch(self, base_coin):
+        """Full chain of one base coin as {(base_coin, expiry): view}"""
+        self.fetches += 1
+        if self.store is not None and (self.live is None or self.live() or self.client is None):
+            return self.store.option_chain(base_coin=base_coin).partition()
+        data = self.client.get_tickers(category="option", base_coin=base_coin, typed=True)
+        if not data or data.get("retCode") != 0:
+            raise Exception(f"Failed to get tickers: {data.get('retMsg') if data else 'no response'}")
+        return OptionChain.from_tickers(data["result"]["list"]).partition()
+
+    def refresh(self, base_coins=None):
+        """Fetch and partition the full chain of each base coin (default: all of them)"""
+        for base_coin in base_coins or self.base_coins:
+            parts = self._fetch(base_coin)
+            with self._lock:
+                self._parts = {key: part for key, part in self._parts.items() if key[0] != base_coin}
+                self._parts.update(parts)
+                self._refreshed[base_coin] = self.clock()
+
+    def chain(self, base_coin, expiry):
+        """View of one expiry's chain (an empty chain if the expiry is not listed), refreshed if stale"""
+        refreshed = self._refreshed.get(base_coin)
+        if refreshed is None or self.clock() - refreshed > self.max_age:
+            self.refresh([base_coin])
+        with self._lock:
+            part = self._parts.get((base_coin, parse_expiry_code(expiry)))
+        return part if part is not None else OptionChain.from_columns([])
@@ -0,0 +1,71 @@
+"""
+Crash-safe checkpoint of the strategy's state.
+
+Each strategy instance's record (open legs, realized PnL, initial margin,
+ledger positions, orders in flight; see strategy.StrategyInstance.record)
+is kept in one small JSON file. A change rewrites the whole file: to a temporary file, fsynced,
+then renamed over the old one. A crash at any point leaves either the
+previous or the new checkpoint on disk, never a torn one. Records that did
+not change since the last write are not written again, so saving after
+every market update costs a JSON encode, not a disk write.
+
+    checkpoint = StateCheckpoint("trades_data/state.json")
+    checkpoint.save("BTC-25APR25", {"position": {...}, "total_realized_pnl": -0.39, ...})
+    records = StateCheckpoint("trades_data/state.json").load()  # after a restart
+"""
+
+import json
+import os
+import time
+
+CHECKPOINT_VERSION = 1
+
+
+class StateCheckpoint:
+    """Latest record of each strategy instance, by name, in one atomically replaced JSON file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.records = {}
+        self.writes = 0
+        self._saved = {}  # name -> JSON of the record as last written
+
+    def load(self):
+        """Records in the file ({} if there is none yet). Later saves update them."""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        if data.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {data.get('version')} in {self.path}")
+        self.records = data["instances"]
+        self._saved = {name: json.dumps(record, sort_keys=True) for name, record in self.records.items()}
+        return dict(self.records)
+
+    def save(self, name, record):
+        """Store one instance's record, writing the file only if the record changed. Returns True if written."""
+        encoded = json.dumps(record, sort_keys=True, default=float)
+        if self._saved.get(name) == encoded:
+            return False
+        self.records[name] = json.loads(encoded)  # a copy: the caller keeps mutating its dicts
+        self._write()
+        self._saved[name] = encoded
+        return True
+
+    def _write(self):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": CHECKPOINT_VERSION, "saved_at": time.time(), "instances": self.records}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        # Sync the directory too, so the rename itself survives a power loss
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self.writes += 1
@@ -0,0 +1,87 @@
+"""
+Fast JSON decoding for API responses.
+
+loads() decodes a response body with orjson or msgspec when one is installed,
+falling back to the standard json module:
+
+    pip3 install orjson msgspec
+
+Option tickers responses can instead be decoded against a typed ticker schema
+that keeps only the fields the strategy reads (option_chain.TICKER_FIELDS)
+and converts Bybit's numeric strings straight into float64 columns:
+
+    response = decode_tickers_response(body)
+    chain = OptionChain.from_tickers(response["result"]["list"])  # a TickerColumns
+
+With msgspec the schema is a Struct decoded in one pass, without building a
+dict per ticker; otherwise the response is decoded with loads() and each
+field column is converted by NumPy in one call.
+"""
+
+import json
+
+import numpy as np
+
+from option_chain import TICKER_FIELDS, TickerColumns
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+if orjson:
+    JSON_BACKEND = "orjson"
+    loads = orjson.loads
+elif msgspec:
+    JSON_BACKEND = "msgspec"
+    loads = msgspec.json.decode
+else:
+    # No print: importing stays quiet. JSON_BACKEND says which decoder is in use (bench_decoding.py reports it)
+    JSON_BACKEND = "json"
+    loads = json.loads
+
+if msgspec:
+    OptionTicker = msgspec.defstruct("OptionTicker", [("symbol", str)]
+                                     + [(key, float, 0.0) for key in TICKER_FIELDS.values()])
+    TickersResult = msgspec.defstruct("TickersResult", [("list", list[OptionTicker], msgspec.field(default_factory=list)),
+                                                        ("category", str, "")])
+    TickersResponse = msgspec.defstruct("TickersResponse", [("retCode", int), ("retMsg", str, ""), ("time", int, 0),
+                                                            ("result", TickersResult, msgspec.field(default_factory=TickersResult))])
+    # strict=False accepts the numeric strings Bybit sends for every ticker field
+    _tickers_decoder = msgspec.json.Decoder(TickersResponse, strict=False)
+
+
+def ticker_columns(tickers):
+    """TickerColumns of a decoded tickers list (dicts with REST field names, as strings or numbers)"""
+    return TickerColumns([t["symbol"] for t in tickers],
+                         {name: np.array([t.get(key) or 0 for t in tickers], dtype=np.float64)
+                          for name, key in TICKER_FIELDS.items()})
+
+
+def _struct_columns(tickers):
+    return TickerColumns([t.symbol for t in tickers],
+                         {name: np.array([getattr(t, key) for t in tickers], dtype=np.float64)
+                          for name, key in TICKER_FIELDS.items()})
+
+
+def decode_tickers_response(body):
+    """Decode a /v5/market/tickers option response, with result.list as TickerColumns"""
+    if msgspec:
+        try:
+            response = _tickers_decoder.decode(body)
+        except msgspec.ValidationError:
+            pass  # e.g. an empty string for a price: take the untyped path
+        else:
+            result = response.result
+            return {"retCode": response.retCode, "retMsg": response.retMsg, "time": response.time,
+                    "result": {"category": result.category, "list": _struct_columns(result.list)}}
+    response = loads(body)
+    result = response.get("result")
+    if isinstance(result, dict) and "list" in result:
+        result["list"] = ticker_columns(result["list"])
+    return response
@@ -1,4 +1,5 @@
 from bybit_apis import DMABybit
+from order_manager import OrderManager
 from dotenv import load_dotenv
 import os
 
@@ -6,40 +7,66 @@ load_dotenv()
 API_KEY = os.getenv('API_KEY')
 API_SECRET = os.getenv('API_SECRET')
 bybit = DMABybit(API_KEY, API_SECRET, symbol="BTCUSDT", category="option")
+# Follows bybit's orders to their final fills, for callers that do not pass the run's own manager.
+# Shared, so its poller thread is started once rather than per call.
+bybit_orders = OrderManager(bybit)
+
+# Largest page /v5/position/list returns, so a snapshot is usually one request
+POSITION_PAGE_LIMIT = 200
+
+def get_pnl_of_sqaured_position(order_link_id_sell, order_link_id_buy, order_manager=None):
+    """PnL of a sell and the buy that closed it, from both orders' final fills.
+
+    Waits until both orders are in a terminal status, so cumExecValue and
+    cumExecFee are final; pass the run's OrderManager (strategy.order_manager)
+    to use its order stream, else bybit_orders polls them.
+    """
+    manager = order_manager or bybit_orders
+    sell, buy = manager.track(order_link_id_sell), manager.track(order_link_id_buy)
+    sell_order, buy_order = sell.result(), buy.result()
+    manager.take(order_link_id_sell)
+    manager.take(order_link_id_buy)
 
-def get_pnl_of_sqaured_position(order_link_id_sell, order_link_id_buy):
-    
-    sell_order_response = bybit.get_order_details(order_link_id_sell)
-    buy_order_response = bybit.get_order_details(order_link_id_buy)
-    
-    # Extract order details from the response
-    sell_order = sell_order_response.get('result', {}).get('list', [{}])[0]
-    buy_order = buy_order_response.get('result', {}).get('list', [{}])[0]
-    
     # Calculate PnL based on execution values and fees
-    sell_value = float(sell_order.get('cumExecValue', 0))
-    sell_fee = float(sell_order.get('cumExecFee', 0))
-    buy_value = float(buy_order.get('cumExecValue', 0))
-    buy_fee = float(buy_order.get('cumExecFee', 0))
-    
-    pnl = sell_value - buy_value - sell_fee - buy_fee
+    pnl = sell_order.value - buy_order.value - sell_order.fee - buy_order.fee
     return pnl
 
-def get_pnl_of_open_position(symbol):
+def get_position_snapshot():
+    """Fetch every open position in one pass (following cursor pages), keyed by symbol.
+
+    Returns None if any page fails, so callers never act on a partial snapshot.
+    """
+    snapshot = {}
+    cursor = None
+    while True:
+        response = bybit.get_open_positions(cursor=cursor, limit=POSITION_PAGE_LIMIT)
+        if not response or response.get('retCode') != 0 or 'result' not in response:
+            return None
+        for position in response['result'].get('list', []):
+            snapshot[position['symbol']] = position
+        cursor = response['result'].get('nextPageCursor')
+        if not cursor:
+            return snapshot
+
+def _get_position(symbol, snapshot=None):
+    """Look a symbol up in the snapshot, or fetch just that symbol when no snapshot is given"""
+    if snapshot is not None:
+        return snapshot.get(symbol)
     open_positions = bybit.get_open_positions(symbol=symbol)
     # Check if the API response is valid
-    if open_positions.get('retCode') != 0 or 'result' not in open_positions:
-        return 0  # Return 0 if there's an error or no result
-    
+    if not open_positions or open_positions.get('retCode') != 0 or 'result' not in open_positions:
+        return None
     position_list = open_positions.get('result', {}).get('list', [])
+    return position_list[0] if position_list else None
+
+def get_pnl_of_open_position(symbol, snapshot=None):
+    # Get the position for the specified symbol
+    position = _get_position(symbol, snapshot)
     
-    # If no positions found
-    if not position_list:
+    # If no positions found (or there was an error)
+    if not position:
         return 0
     
-    # Get the position for the specified symbol
-    position = position_list[0]
-    
     # Extract unrealized PnL (current PnL)
     unrealised_pnl = float(position.get('unrealisedPnl', 0))
     
@@ -51,27 +78,33 @@ def get_pnl_of_open_position(symbol):
     
     return total_pnl
 
-def get_initial_margin(symbol):
-   position_response = bybit.get_open_positions(symbol=symbol)
-   position = position_response.get('result', {}).get('list', [{}])[0]
+def get_initial_margin(symbol, snapshot=None):
+   position = _get_position(symbol, snapshot) or {}
    return float(position.get('positionIM', 0))
 
-def get_initial_margin_of_position_state(position_state):
+def get_initial_margin_of_position_state(position_state, snapshot=None):
+    """Sum the initial margin of every leg, from one position snapshot (None if it could not be fetched)"""
+    if snapshot is None:
+        snapshot = get_position_snapshot()
+        if snapshot is None:
+            return None
     total_initial_margin = 0
     for position_type, position_info in position_state.items():
         if position_info.get("symbol"):
-            symbol = position_info["symbol"]
-            initial_margin = get_initial_margin(symbol)
-            total_initial_margin += initial_margin
+            total_initial_margin += get_initial_margin(position_info["symbol"], snapshot)
     return total_initial_margin
-def get_pnl_of_position_state(position_state):
+
+def get_pnl_of_position_state(position_state, snapshot=None):
+    """Sum the PnL of every leg, from one position snapshot (None if it could not be fetched)"""
+    if snapshot is None:
+        snapshot = get_position_snapshot()
+        if snapshot is None:
+            return None
     total_pnl = 0
     
     # Iterate through all positions in the position state
     for position_type, position_info in position_state.items():
         if position_info.get("symbol"):
-            symbol = position_info["symbol"]
-            position_pnl = get_pnl_of_open_position(symbol)
-            total_pnl += position_pnl
+            total_pnl += get_pnl_of_open_position(position_info["symbol"], snapshot)
     
-    return total_pnl
\ No newline at end of file
+    return total_pnl
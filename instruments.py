@@ -0,0 +1,65 @@
+"""
+Parsed option instrument names.
+
+Bybit option symbols come in two forms:
+    BTC-23APR25-93000-C-USDT   USDT-settled
+    BTC-27JUN25-120000-P       no settle suffix: USDC-settled
+
+parse_symbol() splits a symbol once and caches the resulting Instrument, so
+the same symbol always maps to the same (interned) record.
+"""
+
+import sys
+from datetime import date
+from functools import lru_cache
+from typing import NamedTuple
+
+# Symbols without a settle suffix are Bybit's USDC options
+UNSUFFIXED_SETTLE_COIN = "USDC"
+SYMBOL_CACHE_SIZE = 8192
+
+MONTHS = {"JAN": 1, "FEB": 2, "MAR": 3, "APR": 4, "MAY": 5, "JUN": 6,
+          "JUL": 7, "AUG": 8, "SEP": 9, "OCT": 10, "NOV": 11, "DEC": 12}
+
+
+class Instrument(NamedTuple):
+    symbol: str
+    underlying: str
+    expiry: date
+    strike: float
+    option_type: str  # "C" or "P"
+    settle_coin: str
+
+    @property
+    def is_call(self):
+        return self.option_type == "C"
+
+    @property
+    def expiry_code(self):
+        """Expiry in symbol form, e.g. 25APR25"""
+        return self.symbol.split("-")[1]
+
+
+@lru_cache(maxsize=64)
+def parse_expiry_code(code):
+    """Parse an expiry code such as 25APR25 or 2MAY25 into a date"""
+    code = code.upper()
+    try:
+        return date(2000 + int(code[-2:]), MONTHS[code[-5:-2]], int(code[:-5]))
+    except (KeyError, ValueError):
+        raise ValueError(f"Invalid expiry code: {code}") from None
+
+
+@lru_cache(maxsize=SYMBOL_CACHE_SIZE)
+def parse_symbol(symbol):
+    """Parse BASE-DDMMMYY-STRIKE-C|P[-SETTLE] into an Instrument. Raises ValueError if not an option."""
+    parts = symbol.split("-")
+    if len(parts) not in (4, 5) or parts[3] not in ("C", "P"):
+        raise ValueError(f"Not an option symbol: {symbol}")
+    try:
+        strike = float(parts[2])
+    except ValueError:
+        raise ValueError(f"Invalid strike in option symbol: {symbol}") from None
+    settle_coin = parts[4] if len(parts) == 5 else UNSUFFIXED_SETTLE_COIN
+    return Instrument(sys.intern(symbol), sys.intern(parts[0]), parse_expiry_code(parts[1]),
+                      strike, parts[3], sys.intern(settle_coin))
@@ -0,0 +1,126 @@
+"""
+Non-blocking trade journal.
+
+Trading code records trade and decision events with record(), which only
+timestamps the event and puts it on a queue. A background thread writes the
+events to a JSON lines file in batches, flushing (and fsyncing) once
+flush_size events are waiting or every flush_interval seconds, whichever
+comes first. close() (also run at interpreter exit) writes out everything
+still queued before returning.
+
+    journal = TradeJournal("trades_data/journal.jsonl")
+    journal.record("trade", order_link_id=order_id, symbol=symbol, side="Sell", qty=0.01, price=205.0, realized_pnl=0.0)
+    journal.record("decision", action="exit", reason="take_profit", pnl=12.5, threshold=10.0)
+
+Each line is one JSON object: {"ts": epoch seconds, "event": kind, ...fields}.
+
+setup_logging() does the same for the logging module: records are handed
+to a QueueHandler and formatted and written to file/console by a listener
+thread, so a log call on the trading thread never waits on I/O.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+JOURNAL_FLUSH_INTERVAL = 1.0
+JOURNAL_FLUSH_SIZE = 100
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_CLOSE = object()
+
+
+class TradeJournal:
+    """Queue-backed JSON lines writer. With path=None, events are dropped (e.g. in backtests)."""
+
+    def __init__(self, path, flush_interval=JOURNAL_FLUSH_INTERVAL, flush_size=JOURNAL_FLUSH_SIZE, clock=time.time):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.clock = clock
+        self.written = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="trade-journal", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def record(self, kind, **fields):
+        """Queue one event; never blocks on I/O"""
+        if self.path is None:
+            return
+        if self._thread is None:
+            self._start()
+        self._queue.put({"ts": self.clock(), "event": kind, **fields})
+
+    def flush(self, timeout=None):
+        """Block until every event recorded so far is written and synced. Returns False on timeout."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=None):
+        """Write out everything queued and stop the writer thread"""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(_CLOSE)
+            thread.join(timeout)
+
+    def _run(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a") as f:
+            batch = []
+            deadline = None
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+                if isinstance(item, dict):
+                    batch.append(json.dumps(item, default=str))
+                    deadline = deadline or time.monotonic() + self.flush_interval
+                    if len(batch) < self.flush_size:
+                        continue
+                if batch:
+                    f.write("\n".join(batch) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                    self.written += len(batch)
+                    batch = []
+                deadline = None
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif item is _CLOSE:
+                    return
+
+
+def setup_logging(log_path, level=logging.INFO):
+    """Log to log_path and the console from a background listener. Returns the started QueueListener; stop() it
+    before exiting to write out queued records."""
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.FileHandler(log_path), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))  # the listener's handlers add the rest
+    logging.basicConfig(level=level, handlers=[queue_handler])
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
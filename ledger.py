@@ -0,0 +1,180 @@
+"""
+Local position ledger.
+
+Records fills (price, qty, fee) as the strategy places orders and computes
+realized and unrealized PnL from the live prices in the option chain, so a
+PnL check is a few array lookups instead of one /v5/position/list call per
+leg. The exchange stays the source of truth: reconcile() takes a position
+snapshot (helpers.get_position_snapshot) every few minutes, adopts the
+exchange's size and average price where they differ, and keeps each
+position's initial margin.
+
+    ledger = PositionLedger()
+    ledger.record_fill("BTC-25APR25-95000-C-USDT", "Sell", 0.01, 1250.0, fee=estimate_fee(1250.0, 84000, 0.01))
+    total_pnl = ledger.total_pnl(option_chain)
+"""
+
+import logging
+import threading
+import time
+from typing import NamedTuple
+
+# Bybit option taker fee: 0.03% of the underlying per contract, capped at 7% of the option price
+TAKER_FEE_RATE = 0.0003
+FEE_CAP_RATE = 0.07
+# Quantities below this are treated as flat
+QTY_EPSILON = 1e-9
+
+
+def estimate_fee(price, underlying, qty):
+    """Taker fee for a fill of qty contracts at price"""
+    return min(TAKER_FEE_RATE * underlying, FEE_CAP_RATE * price) * qty
+
+
+class Fill(NamedTuple):
+    symbol: str
+    side: str  # "Buy" or "Sell"
+    qty: float
+    price: float
+    fee: float
+    order_id: str
+    time: float
+    realized_pnl: float
+
+
+class Position:
+    """Net position in one symbol: qty > 0 long, < 0 short"""
+
+    __slots__ = ("symbol", "qty", "avg_price", "realized_pnl", "fees", "last_price", "initial_margin")
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.qty = 0.0
+        self.avg_price = 0.0
+        self.realized_pnl = 0.0  # net of fees
+        self.fees = 0.0
+        self.last_price = None
+        self.initial_margin = 0.0
+
+    def apply(self, signed_qty, price, fee):
+        """Add a fill to the position. Returns the PnL it realized, net of its fee."""
+        realized = -fee
+        if self.qty and (self.qty > 0) != (signed_qty > 0):
+            closed = min(abs(signed_qty), abs(self.qty))
+            realized += closed * (price - self.avg_price) * (1 if self.qty > 0 else -1)
+        new_qty = self.qty + signed_qty
+        if abs(new_qty) < QTY_EPSILON:
+            new_qty, self.avg_price = 0.0, 0.0
+        elif not self.qty or (self.qty > 0) != (new_qty > 0):
+            self.avg_price = price  # opened, or flipped sides
+        elif abs(new_qty) > abs(self.qty):
+            self.avg_price = (self.avg_price * abs(self.qty) + price * abs(signed_qty)) / abs(new_qty)
+        self.qty = new_qty
+        self.realized_pnl += realized
+        self.fees += fee
+        return realized
+
+    def unrealized_pnl(self, price):
+        return self.qty * (price - self.avg_price)
+
+
+class PositionLedger:
+    """Positions and fills of the strategy, kept in process"""
+
+    def __init__(self):
+        self._positions = {}
+        self.fills = []
+        self.last_reconcile = None
+        self._lock = threading.Lock()
+
+    def record_fill(self, symbol, side, qty, price, fee=0.0, order_id=None):
+        """Book a fill and return the PnL it realized (net of its fee)"""
+        signed_qty = qty if side == "Buy" else -qty
+        with self._lock:
+            position = self._positions.get(symbol)
+            if position is None:
+                position = self._positions[symbol] = Position(symbol)
+            realized = position.apply(signed_qty, price, fee)
+            self.fills.append(Fill(symbol, side, qty, price, fee, order_id, time.time(), realized))
+        return realized
+
+    def position(self, symbol):
+        return self._positions.get(symbol)
+
+    def open_symbols(self):
+        return [s for s, p in self._positions.items() if p.qty]
+
+    def open_positions(self):
+        """{symbol: (qty, avg_price)} of the open positions, e.g. to checkpoint them"""
+        with self._lock:
+            return {s: (p.qty, p.avg_price) for s, p in self._positions.items() if p.qty}
+
+    def restore(self, positions):
+        """Set positions from open_positions() output (e.g. after a restart); reconcile() them before trading"""
+        with self._lock:
+            for symbol, (qty, avg_price) in positions.items():
+                position = self._positions.get(symbol)
+                if position is None:
+                    position = self._positions[symbol] = Position(symbol)
+                position.qty, position.avg_price = qty, avg_price
+
+    def realized_pnl(self, symbols=None):
+        """Realized PnL net of fees, for the given symbols or everything traded"""
+        symbols = self._positions if symbols is None else symbols
+        return sum(self._positions[s].realized_pnl for s in symbols if s in self._positions)
+
+    def unrealized_pnl(self, option_chain, symbols=None):
+        """Unrealized PnL of open positions at the chain's mark prices.
+
+        A symbol missing from the chain (or with no mark) is valued at its last
+        known price, or at its average price if it was never marked.
+        """
+        symbols = self.open_symbols() if symbols is None else symbols
+        total = 0.0
+        for symbol in symbols:
+            position = self._positions.get(symbol)
+            if position is None or not position.qty:
+                continue
+            row = option_chain.row_of.get(symbol) if option_chain is not None else None
+            if row is not None and option_chain.mark[row] > 0:
+                position.last_price = float(option_chain.mark[row])
+            price = position.last_price if position.last_price is not None else position.avg_price
+            total += position.unrealized_pnl(price)
+        return total
+
+    def total_pnl(self, option_chain, symbols=None):
+        return self.realized_pnl(symbols) + self.unrealized_pnl(option_chain, symbols)
+
+    def initial_margin(self, symbols=None):
+        """Initial margin of the given open positions, as of the last reconcile"""
+        symbols = self.open_symbols() if symbols is None else symbols
+        return sum(self._positions[s].initial_margin for s in symbols if s in self._positions)
+
+    def reconcile(self, snapshot, symbols=None, price_tolerance=0.01):
+        """Align positions with an exchange snapshot ({symbol: /v5/position/list record}).
+
+        Only the given symbols (default: every symbol the ledger has traded) are
+        checked, so unrelated positions on the account are left out. Size and
+        average price are taken from the exchange where they differ (average
+        price by more than price_tolerance, relative); realized PnL is kept.
+        Returns the symbols that had to be corrected.
+        """
+        corrected = []
+        with self._lock:
+            for symbol in list(self._positions if symbols is None else symbols):
+                record = snapshot.get(symbol) or {}
+                size = float(record.get("size") or 0)
+                qty = -size if record.get("side") == "Sell" else size
+                avg_price = float(record.get("avgPrice") or 0)
+                position = self._positions.get(symbol)
+                if position is None:
+                    position = self._positions[symbol] = Position(symbol)
+                position.initial_margin = float(record.get("positionIM") or 0)
+                if abs(position.qty - qty) > QTY_EPSILON or \
+                        (qty and abs(position.avg_price - avg_price) > price_tolerance * avg_price):
+                    logging.warning(f"Ledger out of sync for {symbol}: local {position.qty}@{position.avg_price:.4f}, "
+                                    f"exchange {qty}@{avg_price:.4f}")
+                    position.qty, position.avg_price = qty, (avg_price if qty else 0.0)
+                    corrected.append(symbol)
+            self.last_reconcile = time.time()
+        return corrected
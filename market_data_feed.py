@@ -0,0 +1,372 @@
+"""
+Streaming option ticker feed.
+
+Step1: Install Requirements
+pip3 install websockets
+
+Keeps an in-memory option chain current from Bybit's public option ticker
+stream, so the strategy reads market data locally instead of polling
+/v5/market/tickers for the whole chain every loop. The chain is seeded with
+one REST snapshot and then updated from stream snapshot/delta messages.
+
+    feed = OptionTickerFeed.from_rest(bybit_client, base_coin="BTC", expiry="25APR25").start()
+    options_data = feed.store.options_data()
+
+For tests and offline runs, ReplayServer serves recorded stream messages
+(one JSON message per line) as a local stand-in for the exchange:
+
+    python market_data_feed.py --replay api_responses/bybit_option_ticker_stream_sample.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import threading
+import time
+
+from instruments import parse_expiry_code, parse_symbol
+from option_chain import OptionChain, TickerColumns
+
+# Conditional import for websockets (asyncio WebSocket client/server)
+try:
+    import websockets
+except ImportError:
+    print("websockets library not found. Please install it with: pip install websockets")
+    websockets = None
+
+BYBIT_OPTION_PUBLIC_STREAM = "wss://stream.bybit.com/v5/public/option"
+# Topics per subscribe request, and Bybit's recommended heartbeat interval (seconds)
+SUBSCRIBE_BATCH_SIZE = 10
+PING_INTERVAL = 20
+RECONNECT_BACKOFF_MIN = 1
+RECONNECT_BACKOFF_MAX = 30
+
+# Option ticker stream field names -> /v5/market/tickers field names
+STREAM_TO_REST_FIELDS = {
+    "bidPrice": "bid1Price",
+    "bidSize": "bid1Size",
+    "bidIv": "bid1Iv",
+    "askPrice": "ask1Price",
+    "askSize": "ask1Size",
+    "askIv": "ask1Iv",
+    "markPriceIv": "markIv",
+}
+
+
+def parse_option_tickers(option_list):
+    """Convert raw option tickers (dicts, or TickerColumns) to {symbol: {"iv", "delta", "underlying", "bid", "ask"}}"""
+    if isinstance(option_list, TickerColumns):
+        columns = [option_list.fields[name].tolist() for name in ("iv", "delta", "underlying", "bid", "ask")]
+        return {symbol: {"iv": iv, "delta": delta, "underlying": underlying, "bid": bid, "ask": ask}
+                for symbol, iv, delta, underlying, bid, ask in zip(option_list.symbols, *columns)}
+    options_data = {}
+    for opt in option_list:
+        options_data[opt["symbol"]] = {
+            "iv": float(opt.get("markIv", 0)),         # implied volatility (as a decimal, e.g. 0.75 for 75%)
+            "delta": float(opt.get("delta", 0)),
+            "underlying": float(opt.get("underlyingPrice", 0)),
+            "bid": float(opt.get("bid1Price", 0)),
+            "ask": float(opt.get("ask1Price", 0))
+        }
+    return options_data
+
+
+class OptionChainStore:
+    """Thread-safe in-memory option chain, holding the latest ticker fields per symbol.
+
+    Tickers are stored with REST field names, so REST snapshots and stream
+    messages can be merged into the same records. A columnar OptionChain is
+    kept alongside and updated in place (index included) as messages arrive;
+    it is only rebuilt when new symbols appear.
+    """
+
+    def __init__(self):
+        self._tickers = {}
+        self._chain = None
+        self._underlying = {}  # (base coin, expiry date) -> underlyingPrice of the latest ticker that carried one
+        self._condition = threading.Condition()
+        self._listeners = []
+        self.version = 0
+        self.last_update = None
+
+    def add_listener(self, listener):
+        """Call listener() after every update, e.g. to wake an event loop. It runs under the store lock."""
+        self._listeners.append(listener)
+
+    def load_tickers(self, option_list):
+        """Replace the records of the given symbols with a REST tickers list"""
+        with self._condition:
+            for ticker in option_list:
+                self._tickers[ticker["symbol"]] = dict(ticker)
+                self._note_underlying(ticker)
+            self._chain = None
+            self._mark_updated()
+
+    def apply_message(self, message):
+        """Apply one stream message. Returns True if it updated the chain."""
+        if not message.get("topic", "").startswith("tickers."):
+            return False  # subscribe acks, pongs, etc.
+        data = message.get("data")
+        updates = data if isinstance(data, list) else [data]
+        with self._condition:
+            for update in updates:
+                fields = {STREAM_TO_REST_FIELDS.get(k, k): v for k, v in update.items()}
+                symbol = fields["symbol"]
+                if message.get("type") == "snapshot" or symbol not in self._tickers:
+                    self._tickers[symbol] = fields
+                else:
+                    self._tickers[symbol].update(fields)
+                self._note_underlying(fields)
+                if self._chain is not None and not self._chain.update_from_ticker(fields):
+                    self._chain = None  # new symbol, rebuild on next read
+            self._mark_updated()
+        return True
+
+    def _note_underlying(self, ticker):
+        price = ticker.get("underlyingPrice")
+        if price:
+            instrument = parse_symbol(ticker["symbol"])
+            self._underlying[(instrument.underlying, instrument.expiry)] = float(price)
+
+    def _mark_updated(self):
+        self.version += 1
+        self.last_update = time.time()
+        self._condition.notify_all()
+        for listener in self._listeners:
+            listener()
+
+    def symbols(self):
+        with self._condition:
+            return list(self._tickers)
+
+    def ticker(self, symbol):
+        """Copy of one symbol's ticker record, or None"""
+        with self._condition:
+            ticker = self._tickers.get(symbol)
+            return dict(ticker) if ticker is not None else None
+
+    def tickers(self, expiry=None, base_coin=None):
+        """Copy of the raw ticker records, optionally for one expiry (e.g. 25APR25) and/or base coin"""
+        expiry = parse_expiry_code(expiry) if expiry else None
+        with self._condition:
+            return [dict(t) for s, t in self._tickers.items()
+                    if (expiry is None or parse_symbol(s).expiry == expiry)
+                    and (base_coin is None or parse_symbol(s).underlying == base_coin)]
+
+    def option_chain(self, expiry=None, base_coin=None):
+        """Copy of the live OptionChain, optionally restricted to one expiry (e.g. 25APR25) and/or base coin"""
+        with self._condition:
+            if self._chain is None:
+                self._chain = OptionChain.from_tickers(list(self._tickers.values()))
+                self._chain.index  # build the index once, then keep it updated
+            chain = self._chain.copy()
+        if expiry is None and base_coin is None:
+            return chain
+        mask = chain.mask(expiry=expiry, settle=None, base_coin=base_coin)
+        return chain if mask.all() else chain.subset(mask)
+
+    def underlying_price(self, expiry, base_coin="BTC"):
+        """Latest underlyingPrice seen for one expiry (e.g. 25APR25) of a base coin, or None"""
+        with self._condition:
+            return self._underlying.get((base_coin, parse_expiry_code(expiry)))
+
+    def options_data(self, expiry=None, base_coin=None):
+        """Chain in the get_iv_and_greeks format"""
+        return parse_option_tickers(self.tickers(expiry, base_coin))
+
+    def wait_for_update(self, after_version, timeout=None):
+        """Block until the chain is newer than after_version. Returns the current version."""
+        with self._condition:
+            self._condition.wait_for(lambda: self.version > after_version, timeout)
+            return self.version
+
+
+class OptionTickerFeed:
+    """Subscribes to option tickers and keeps an OptionChainStore up to date.
+
+    Runs its own asyncio loop on a daemon thread, reconnecting with exponential
+    backoff and resubscribing after a dropped connection.
+    """
+
+    def __init__(self, symbols, url=BYBIT_OPTION_PUBLIC_STREAM, store=None, record_path=None,
+                 ping_interval=PING_INTERVAL, recorder=None):
+        if not websockets:
+            raise ImportError("websockets library is required for OptionTickerFeed")
+        self.symbols = list(symbols)
+        self.url = url
+        self.store = store or OptionChainStore()
+        self.record_path = record_path
+        self.recorder = recorder  # e.g. tickstore.TickRecorder
+        self.ping_interval = ping_interval
+        self.connected = threading.Event()
+        self._loop = None
+        self._task = None
+        self._thread = None
+        self._stopping = False
+
+    @classmethod
+    def from_rest(cls, client, base_coin="BTC", expiry=None, **kwargs):
+        """Seed a store with one REST chain snapshot and subscribe to its symbols"""
+        data = client.get_tickers(category="option", base_coin=base_coin, exp_date=expiry)
+        if not data or data.get("retCode") != 0:
+            raise Exception(f"Failed to get tickers: {data.get('retMsg') if data else 'no response'}")
+        store = kwargs.pop("store", None) or OptionChainStore()
+        store.load_tickers(data["result"]["list"])
+        if kwargs.get("recorder"):
+            kwargs["recorder"].record_tickers(data["result"]["list"], data.get("time") or int(time.time() * 1000))
+        return cls(store.symbols(), store=store, **kwargs)
+
+    async def _heartbeat(self, ws):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            await ws.send(json.dumps({"op": "ping"}))
+
+    async def _subscribe(self, ws):
+        topics = [f"tickers.{symbol}" for symbol in self.symbols]
+        for i in range(0, len(topics), SUBSCRIBE_BATCH_SIZE):
+            await ws.send(json.dumps({"op": "subscribe", "args": topics[i:i + SUBSCRIBE_BATCH_SIZE]}))
+
+    async def _consume(self, ws, record_file):
+        async for raw in ws:
+            if record_file:
+                record_file.write(raw if isinstance(raw, str) else raw.decode())
+                record_file.write("\n")
+            try:
+                message = json.loads(raw)
+                self.store.apply_message(message)
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                # One malformed frame must not stop the feed: the strategy would trade on a frozen chain
+                logging.warning(f"Skipping malformed ticker stream message ({e!r}): {str(raw)[:200]}")
+                continue
+            if self.recorder:
+                self.recorder.record_message(message)
+
+    async def run(self):
+        """Connect, subscribe and apply messages until stop() is called"""
+        backoff = RECONNECT_BACKOFF_MIN
+        record_file = open(self.record_path, "a") if self.record_path else None
+        try:
+            while not self._stopping:
+                try:
+                    async with websockets.connect(self.url) as ws:
+                        await self._subscribe(ws)
+                        self.connected.set()
+                        backoff = RECONNECT_BACKOFF_MIN
+                        heartbeat = asyncio.create_task(self._heartbeat(ws))
+                        try:
+                            await self._consume(ws, record_file)
+                        finally:
+                            heartbeat.cancel()
+                except (OSError, websockets.WebSocketException) as e:
+                    logging.warning(f"Ticker stream disconnected: {e}, reconnecting in {backoff}s")
+                except Exception:  # anything else would end the feed thread silently
+                    logging.exception(f"Ticker stream failed, reconnecting in {backoff}s")
+                self.connected.clear()
+                if not self._stopping:
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX)
+        finally:
+            if record_file:
+                record_file.close()
+            if self.recorder:
+                self.recorder.flush()
+
+    def start(self):
+        """Run the feed on a background thread. Returns self."""
+        self._loop = asyncio.new_event_loop()
+
+        def run_loop():
+            asyncio.set_event_loop(self._loop)
+            self._task = self._loop.create_task(self.run())
+            try:
+                self._loop.run_until_complete(self._task)
+            except asyncio.CancelledError:
+                pass
+            finally:
+                self._loop.close()
+
+        self._thread = threading.Thread(target=run_loop, name="option-ticker-feed", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stopping = True
+        if self._loop and self._loop.is_running():
+            self._loop.call_soon_threadsafe(lambda: self._task and self._task.cancel())
+        if self._thread:
+            self._thread.join(timeout)
+
+
+class ReplayServer:
+    """Local stand-in for the exchange stream that replays recorded messages.
+
+    Every connecting client receives the recorded messages in order, `delay`
+    seconds apart, after its first subscribe request.
+    """
+
+    def __init__(self, messages, host="127.0.0.1", port=0, delay=0.0):
+        if not websockets:
+            raise ImportError("websockets library is required for ReplayServer")
+        self.messages = messages
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.subscriptions = []
+        self._server = None
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        with open(path) as f:
+            return cls([line.strip() for line in f if line.strip()], **kwargs)
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    async def _handler(self, ws):
+        replaying = False
+        async for raw in ws:
+            request = json.loads(raw)
+            if request.get("op") == "ping":
+                await ws.send(json.dumps({"op": "pong", "success": True}))
+            elif request.get("op") == "subscribe":
+                self.subscriptions.extend(request.get("args", []))
+                await ws.send(json.dumps({"op": "subscribe", "success": True}))
+                if not replaying:
+                    replaying = True
+                    asyncio.ensure_future(self._replay(ws))
+
+    async def _replay(self, ws):
+        for message in self.messages:
+            await ws.send(message)
+            if self.delay:
+                await asyncio.sleep(self.delay)
+
+    async def start(self):
+        self._server = await websockets.serve(self._handler, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve recorded option ticker messages over a local WebSocket')
+    parser.add_argument('--replay', required=True, help='File with one recorded stream message per line')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=0.1, help='Seconds between replayed messages')
+    args = parser.parse_args()
+
+    async def serve():
+        server = await ReplayServer.from_file(args.replay, port=args.port, delay=args.delay).start()
+        print(f"Replaying {args.replay} on {server.url}")
+        await asyncio.Future()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+In-process metrics: latency histograms, counters and gauges, with pluggable export sinks.
+
+Histograms have fixed log-spaced buckets (100us to ~60s, 25% apart), so
+observing is a bisect and two adds, and p50/p99 are read back by
+interpolating within a bucket, as Prometheus' histogram_quantile does.
+Series are identified by a name and labels:
+
+    REGISTRY.observe("api_network_seconds", 0.042, endpoint="/v5/market/tickers")
+    REGISTRY.inc("api_requests_total", endpoint="/v5/market/tickers", outcome="ok")
+    with REGISTRY.time("strategy_step_seconds", step="chain_fetch"):
+        chain = get_option_chain(expiry)
+    REGISTRY.quantiles("strategy_tick_to_order_seconds")  # {0.5: ..., 0.99: ...}
+
+Sinks receive the registry on export(); PrometheusFileSink rewrites a file in
+the Prometheus text format (for node_exporter's textfile collector, or to
+read by hand):
+
+    REGISTRY.add_sink(PrometheusFileSink("metrics.prom"))
+    REGISTRY.export()
+"""
+
+import bisect
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the histogram buckets; the last bucket is +Inf
+DEFAULT_BUCKETS = tuple(float(f"{0.0001 * 1.25 ** i:.3g}") for i in range(60))
+DEFAULT_QUANTILES = (0.5, 0.99)
+
+
+class Histogram:
+    """Counts of observations per bucket, plus their sum"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q):
+        """Estimated q-quantile (0..1), interpolated linearly within its bucket; NaN if empty"""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if total == 0:
+            return math.nan
+        rank = q * total
+        seen = 0
+        for i, n in enumerate(counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return lower  # above the last bound: the best we know
+                return lower + (self.buckets[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class MetricsRegistry:
+    """Histograms, counters and gauges keyed by (name, labels), and the sinks they are exported to"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.histograms = {}  # (name, labels) -> Histogram, labels as a sorted tuple of (key, value)
+        self.counters = {}
+        self.gauges = {}  # (name, labels) -> fn() returning the current value
+        self.sinks = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def _get(self, series, key, factory):
+        metric = series.get(key)
+        if metric is None:
+            with self._lock:
+                metric = series.setdefault(key, factory())
+        return metric
+
+    def histogram(self, name, **labels):
+        return self._get(self.histograms, self._key(name, labels), lambda: Histogram(self.buckets))
+
+    def counter(self, name, **labels):
+        return self._get(self.counters, self._key(name, labels), Counter)
+
+    def observe(self, name, value, **labels):
+        self.histogram(name, **labels).observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        self.counter(name, **labels).inc(amount)
+
+    def gauge(self, name, fn, **labels):
+        """Report fn() as the gauge's value at export time (replacing an earlier fn for the same series)"""
+        with self._lock:
+            self.gauges[self._key(name, labels)] = fn
+
+    @contextmanager
+    def time(self, name, **labels):
+        """Observe the seconds spent in the with block, also when it raises"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def quantiles(self, name, quantiles=DEFAULT_QUANTILES, **labels):
+        """{q: estimated quantile} of one histogram series"""
+        histogram = self.histograms.get(self._key(name, labels))
+        return {q: histogram.quantile(q) if histogram else math.nan for q in quantiles}
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def export(self):
+        """Hand the registry to every sink"""
+        for sink in self.sinks:
+            sink.export(self)
+
+    def clear(self):
+        """Drop every series, gauges included (their callbacks would otherwise keep what they read alive)"""
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.gauges.clear()
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", r"\\").replace('"', r'\"').replace("\n", r"\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def prometheus_text(registry):
+    """Every series of registry in the Prometheus text exposition format"""
+    lines = []
+    by_name = {}
+    for (name, labels), metric in sorted(registry.histograms.items()):
+        by_name.setdefault((name, "histogram"), []).append((labels, metric))
+    for (name, labels), metric in sorted(registry.counters.items()):
+        by_name.setdefault((name, "counter"), []).append((labels, metric))
+    for (name, labels), fn in sorted(registry.gauges.items(), key=lambda item: item[0]):
+        by_name.setdefault((name, "gauge"), []).append((labels, fn))
+    for (name, kind), series in by_name.items():
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, metric in series:
+            if kind == "histogram":
+                with metric._lock:
+                    counts, count, total = list(metric.counts), metric.count, metric.sum
+                cumulative = 0
+                for bound, n in zip(metric.buckets + (math.inf,), counts):
+                    cumulative += n
+                    lines.append(f"{name}_bucket{_labels(labels, [('le', _number(bound))])} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+                lines.append(f"{name}_count{_labels(labels)} {count}")
+            elif kind == "counter":
+                lines.append(f"{name}{_labels(labels)} {_number(metric.value)}")
+            else:
+                lines.append(f"{name}{_labels(labels)} {_number(metric())}")
+    return "\n".join(lines) + "\n"
+
+
+class PrometheusFileSink:
+    """Rewrites path with the registry in Prometheus text format (atomically, via a temporary file)"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def export(self, registry):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(prometheus_text(registry))
+        os.replace(tmp_path, self.path)
+
+
+# Registry the API clients and the strategy report to unless given another
+REGISTRY = MetricsRegistry()
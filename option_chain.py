@@ -0,0 +1,334 @@
+"""
+Columnar option chain.
+
+Holds one row per option with the parsed symbol metadata (expiry, strike,
+call/put, settle coin, base coin) and market fields as contiguous NumPy arrays, so leg
+selection is a handful of vectorized array operations rather than a Python
+loop over every ticker.
+
+OptionChain is also a read-only Mapping of symbol -> row dict, so code that
+does `chain.get(symbol, {}).get("bid")` keeps working.
+
+Leg lookups ("nearest delta to X", "next strike above K", ATM) go through a
+ChainIndex that keeps each expiry's calls and puts sorted by strike and by
+delta, so they are binary searches and survive in-place ticker updates.
+"""
+
+from collections.abc import Mapping
+from typing import NamedTuple
+
+import numpy as np
+
+from instruments import parse_expiry_code, parse_symbol
+
+# The strategy trades USDT-settled options unless told otherwise
+DEFAULT_SETTLE_COIN = "USDT"
+
+# Row field -> REST ticker field
+TICKER_FIELDS = {
+    "iv": "markIv",
+    "delta": "delta",
+    "underlying": "underlyingPrice",
+    "bid": "bid1Price",
+    "ask": "ask1Price",
+    "mark": "markPrice",
+    "gamma": "gamma",
+    "vega": "vega",
+    "theta": "theta",
+}
+
+
+class TickerColumns(NamedTuple):
+    """A tickers list decoded straight into columns (see decoding.py): symbols and {row field: float64 array}"""
+    symbols: list
+    fields: dict
+
+    def __len__(self):
+        return len(self.symbols)
+
+
+def parse_expiry(expiry):
+    """Parse an expiry code such as 25APR25 or 2MAY25 into a numpy datetime64[D]"""
+    return np.datetime64(parse_expiry_code(expiry), "D")
+
+
+class _Bucket:
+    """Rows of one (expiry, is_call, settle) group, ordered by strike and by delta.
+
+    Orderings are by (value, row), so among equal values the first row in
+    chain order wins, as with np.argmin over the whole chain.
+    """
+
+    def __init__(self, rows, strike, delta):
+        order = np.lexsort((rows, strike[rows]))
+        self.strike_rows = rows[order]
+        self.strike_keys = strike[self.strike_rows]
+        order = np.lexsort((rows, delta[rows]))
+        self.delta_rows = rows[order]
+        self.delta_keys = delta[self.delta_rows].copy()
+
+    def copy(self):
+        bucket = _Bucket.__new__(_Bucket)
+        bucket.strike_rows, bucket.strike_keys = self.strike_rows, self.strike_keys  # strikes never change
+        bucket.delta_rows, bucket.delta_keys = self.delta_rows.copy(), self.delta_keys.copy()
+        return bucket
+
+    def move_delta(self, row, old_delta, new_delta):
+        """Re-position one row after its delta changed, shifting only the rows it passes"""
+        keys, rows = self.delta_keys, self.delta_rows
+        p = int(np.searchsorted(keys, old_delta, "left"))
+        while rows[p] != row:
+            p += 1
+        lo = int(np.searchsorted(keys, new_delta, "left"))
+        hi = int(np.searchsorted(keys, new_delta, "right"))
+        q = lo + int(np.searchsorted(rows[lo:hi], row))
+        if p < q:
+            q -= 1  # position once row p has been taken out
+            keys[p:q] = keys[p + 1:q + 1]
+            rows[p:q] = rows[p + 1:q + 1]
+        elif p > q:
+            keys[q + 1:p + 1] = keys[q:p]
+            rows[q + 1:p + 1] = rows[q:p]
+        keys[q] = new_delta
+        rows[q] = row
+
+
+def _closest(keys, rows, target, lo, hi):
+    """(distance, row) of the value closest to target within keys[lo:hi], or None"""
+    if lo >= hi:
+        return None
+    i = lo + int(np.searchsorted(keys[lo:hi], target, "left"))
+    candidates = []
+    if i < hi:
+        candidates.append((abs(keys[i] - target), rows[i]))
+    if i > lo:
+        below = lo + int(np.searchsorted(keys[lo:hi], keys[i - 1], "left"))
+        candidates.append((abs(keys[below] - target), rows[below]))
+    return min(candidates)
+
+
+class ChainIndex:
+    """Per-expiry strike and delta orderings of an OptionChain's calls and puts"""
+
+    def __init__(self, chain, buckets=None):
+        self.chain = chain
+        if buckets is None:
+            buckets = {}
+            keys = list(zip(chain.expiry.tolist(), chain.is_call.tolist(), chain.settle.tolist()))
+            groups = {}
+            for row, key in enumerate(keys):
+                groups.setdefault(key, []).append(row)
+            for key, rows in groups.items():
+                buckets[key] = _Bucket(np.array(rows, dtype=np.int64), chain.strike, chain.delta)
+        self.buckets = buckets
+
+    def copy(self, chain):
+        return ChainIndex(chain, {key: bucket.copy() for key, bucket in self.buckets.items()})
+
+    def _buckets(self, is_call, expiry, settle):
+        expiry = parse_expiry(expiry).item() if expiry is not None else None
+        for (b_expiry, b_is_call, b_settle), bucket in self.buckets.items():
+            if b_is_call == is_call and (expiry is None or b_expiry == expiry) \
+                    and (settle is None or b_settle == settle):
+                yield bucket
+
+    def _best(self, found):
+        found = [f for f in found if f is not None]
+        return self.chain.symbols[min(found)[1]] if found else None
+
+    def nearest_delta(self, target_delta, is_call, expiry=None, settle=DEFAULT_SETTLE_COIN):
+        found = []
+        for bucket in self._buckets(is_call, expiry, settle):
+            keys = bucket.delta_keys
+            # Calls must have delta > 0, puts delta < 0
+            if is_call:
+                lo, hi = int(np.searchsorted(keys, 0.0, "right")), len(keys)
+            else:
+                lo, hi = 0, int(np.searchsorted(keys, 0.0, "left"))
+            found.append(_closest(keys, bucket.delta_rows, target_delta, lo, hi))
+        return self._best(found)
+
+    def nearest_strike(self, price, is_call, expiry=None, settle=DEFAULT_SETTLE_COIN):
+        found = [_closest(b.strike_keys, b.strike_rows, price, 0, len(b.strike_keys))
+                 for b in self._buckets(is_call, expiry, settle)]
+        return self._best(found)
+
+    def next_strike(self, strike, is_call, above=True, expiry=None, settle=DEFAULT_SETTLE_COIN):
+        found = []
+        for bucket in self._buckets(is_call, expiry, settle):
+            keys, rows = bucket.strike_keys, bucket.strike_rows
+            if above:
+                i = int(np.searchsorted(keys, strike, "right"))
+                if i < len(keys):
+                    found.append((keys[i] - strike, rows[i]))
+            else:
+                i = int(np.searchsorted(keys, strike, "left"))
+                if i > 0:
+                    first = int(np.searchsorted(keys, keys[i - 1], "left"))
+                    found.append((strike - keys[first], rows[first]))
+        return self._best(found)
+
+    def update_delta(self, row, old_delta, new_delta):
+        key = (self.chain.expiry[row].item(), bool(self.chain.is_call[row]), str(self.chain.settle[row]))
+        self.buckets[key].move_delta(row, old_delta, new_delta)
+
+
+class OptionChain(Mapping):
+    """Option chain stored as parallel arrays, one row per symbol"""
+
+    def __init__(self, symbols, expiry, strike, is_call, settle, base_coin=None, **fields):
+        self.symbols = np.asarray(symbols, dtype=object)
+        self.expiry = np.asarray(expiry, dtype="datetime64[D]")
+        self.strike = np.asarray(strike, dtype=np.float64)
+        self.is_call = np.asarray(is_call, dtype=bool)
+        self.settle = np.asarray(settle, dtype="U8")
+        if base_coin is None:
+            base_coin = [parse_symbol(symbol).underlying for symbol in self.symbols]
+        self.base_coin = np.asarray(base_coin, dtype="U8")
+        for name in TICKER_FIELDS:
+            setattr(self, name, np.asarray(fields.get(name, np.zeros(len(self.symbols))), dtype=np.float64))
+        self.row_of = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._index = None
+
+    @classmethod
+    def from_tickers(cls, option_list):
+        """Build a chain from a /v5/market/tickers option list (dicts, or TickerColumns)"""
+        if isinstance(option_list, TickerColumns):
+            # Columns may belong to a cached response, and chains are updated in place
+            return cls.from_columns(option_list.symbols, **{name: column.copy()
+                                                            for name, column in option_list.fields.items()})
+        fields = {
+            name: np.array([float(opt.get(key) or 0) for opt in option_list], dtype=np.float64)
+            for name, key in TICKER_FIELDS.items()
+        }
+        return cls.from_columns([opt["symbol"] for opt in option_list], **fields)
+
+    @classmethod
+    def from_columns(cls, symbols, **fields):
+        """Build a chain from symbols and already numeric field columns"""
+        n = len(symbols)
+        expiry = np.empty(n, dtype="datetime64[D]")
+        strike = np.empty(n)
+        is_call = np.empty(n, dtype=bool)
+        settle = np.empty(n, dtype="U8")
+        base_coin = np.empty(n, dtype="U8")
+        for i, symbol in enumerate(symbols):
+            instrument = parse_symbol(symbol)
+            expiry[i], strike[i] = instrument.expiry, instrument.strike
+            is_call[i], settle[i], base_coin[i] = instrument.is_call, instrument.settle_coin, instrument.underlying
+        return cls(symbols, expiry, strike, is_call, settle, base_coin, **fields)
+
+    @property
+    def index(self):
+        """Strike/delta index, built on first use"""
+        if self._index is None:
+            self._index = ChainIndex(self)
+        return self._index
+
+    def copy(self):
+        """Independent copy of the chain (and its index) for readers on other threads"""
+        chain = OptionChain.__new__(OptionChain)
+        chain.symbols, chain.expiry, chain.strike = self.symbols, self.expiry, self.strike
+        chain.is_call, chain.settle, chain.row_of = self.is_call, self.settle, self.row_of
+        chain.base_coin = self.base_coin
+        for name in TICKER_FIELDS:
+            setattr(chain, name, getattr(self, name).copy())
+        chain._index = self._index.copy(chain) if self._index is not None else None
+        return chain
+
+    def subset(self, mask):
+        """New chain with the rows selected by a boolean mask"""
+        return OptionChain(self.symbols[mask], self.expiry[mask], self.strike[mask], self.is_call[mask],
+                           self.settle[mask], self.base_coin[mask], **{name: getattr(self, name)[mask] for name in TICKER_FIELDS})
+
+    def _slice(self, start, stop):
+        """Chain of rows start:stop, sharing this chain's arrays"""
+        chain = OptionChain.__new__(OptionChain)
+        for name in ("symbols", "expiry", "strike", "is_call", "settle", "base_coin", *TICKER_FIELDS):
+            setattr(chain, name, getattr(self, name)[start:stop])
+        chain.row_of = {symbol: i for i, symbol in enumerate(chain.symbols)}
+        chain._index = None
+        return chain
+
+    def partition(self):
+        """{(base_coin, expiry date): chain of those rows}.
+
+        Rows are grouped by base coin and expiry with one reorder (skipped if
+        already grouped); every part is then a slice of the grouped arrays, so
+        fanning a full chain out to per-expiry readers copies nothing more.
+        """
+        if not len(self):
+            return {}
+        order = np.lexsort((self.expiry, self.base_coin))
+        grouped = self
+        if (order != np.arange(len(order))).any():
+            grouped = OptionChain(self.symbols[order], self.expiry[order], self.strike[order], self.is_call[order],
+                                  self.settle[order], self.base_coin[order],
+                                  **{name: getattr(self, name)[order] for name in TICKER_FIELDS})
+        boundaries = (grouped.base_coin[1:] != grouped.base_coin[:-1]) | (grouped.expiry[1:] != grouped.expiry[:-1])
+        starts = [0, *(np.flatnonzero(boundaries) + 1).tolist()]
+        return {(str(grouped.base_coin[start]), grouped.expiry[start].item()): grouped._slice(start, stop)
+                for start, stop in zip(starts, starts[1:] + [len(grouped)])}
+
+    def update(self, symbol, values):
+        """Write new field values ({"delta": ..., "bid": ...}) for one symbol in place"""
+        i = self.row_of[symbol]
+        for name, value in values.items():
+            column = getattr(self, name)
+            old = column[i]
+            column[i] = value
+            if name == "delta" and self._index is not None and old != value:
+                self._index.update_delta(i, old, value)
+
+    def update_from_ticker(self, ticker):
+        """Apply a (partial) ticker with REST field names. Returns False for unknown symbols."""
+        if ticker["symbol"] not in self.row_of:
+            return False
+        self.update(ticker["symbol"], {name: float(ticker[key] or 0)
+                                       for name, key in TICKER_FIELDS.items() if key in ticker})
+        return True
+
+    # Mapping interface: chain[symbol] -> row dict
+
+    def __getitem__(self, symbol):
+        i = self.row_of[symbol]
+        return {name: float(getattr(self, name)[i]) for name in TICKER_FIELDS} | {"strike": float(self.strike[i])}
+
+    def __contains__(self, symbol):
+        return symbol in self.row_of
+
+    def __iter__(self):
+        return iter(self.symbols)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def to_dict(self):
+        return {symbol: self[symbol] for symbol in self.symbols}
+
+    # Vectorized selectors
+
+    def mask(self, is_call=None, expiry=None, settle=DEFAULT_SETTLE_COIN, base_coin=None):
+        """Boolean row mask for an option type, expiry code, settle coin and base coin (None = any)"""
+        mask = np.ones(len(self.symbols), dtype=bool)
+        if base_coin is not None:
+            mask &= self.base_coin == base_coin
+        if is_call is not None:
+            mask &= self.is_call == is_call
+        if expiry is not None:
+            mask &= self.expiry == parse_expiry(expiry)
+        if settle is not None:
+            mask &= self.settle == settle
+        return mask
+
+    def nearest_delta(self, target_delta, is_call, expiry=None, settle=DEFAULT_SETTLE_COIN):
+        """Symbol whose delta is closest to target_delta (calls with delta > 0, puts with delta < 0)"""
+        return self.index.nearest_delta(target_delta, is_call, expiry, settle)
+
+    def nearest_strike(self, price, is_call, expiry=None, settle=DEFAULT_SETTLE_COIN):
+        """Symbol whose strike is closest to price, e.g. the ATM strike for the underlying"""
+        return self.index.nearest_strike(price, is_call, expiry, settle)
+
+    def next_strike(self, strike, is_call, above=True, expiry=None, settle=DEFAULT_SETTLE_COIN):
+        """Symbol with the closest strike strictly above (or below) `strike`"""
+        return self.index.next_strike(strike, is_call, above, expiry, settle)
@@ -0,0 +1,316 @@
+"""
+Order lifecycle tracking.
+
+/v5/order/create answers as soon as an order is accepted, before it fills:
+the response carries the orderLinkId, not the fill. OrderManager follows
+each order to a terminal status and resolves a concurrent.futures.Future
+with the final fill (filled qty, average price, value and fee):
+
+    manager = OrderManager(client)
+    fill = manager.track(order_link_id, symbol)  # before placing, so no update can be missed
+    client.place_order({..., "orderLinkId": order_link_id})
+    order = fill.result()                # OrderResult; from a coroutine: await asyncio.wrap_future(fill)
+
+Updates come from Bybit's private order stream when one is attached
+(PrivateOrderStream): the lowest latency, and no REST calls. An order the
+stream has not finished within stream_grace seconds, or every order when
+there is no stream, is polled with get_order_details from a background
+thread at growing intervals (poll_base, doubling up to poll_max). An order
+still not terminal after timeout seconds fails its future with OrderTimeout.
+
+    manager.attach_stream(PrivateOrderStream(lambda: dma_socket_auth(client)))
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import NamedTuple
+
+from metrics import REGISTRY
+from scheduler import Backoff
+
+# Conditional import for websockets (asyncio WebSocket client), needed for the private stream only
+try:
+    import websockets
+except ImportError:
+    print("websockets library not found. Please install it with: pip install websockets")
+    websockets = None
+
+BYBIT_PRIVATE_STREAM = "wss://stream.bybit.com/v5/private"
+PING_INTERVAL = 20
+RECONNECT_BACKOFF_MIN = 1
+RECONNECT_BACKOFF_MAX = 30
+
+# Statuses after which an order no longer changes
+TERMINAL_STATUSES = frozenset({"Filled", "Cancelled", "Rejected", "PartiallyFilledCanceled", "Deactivated"})
+# Seconds: first poll and poll interval cap, wait for the stream before polling, give up on an order
+ORDER_POLL_BASE = 0.05
+ORDER_POLL_MAX = 1.0
+ORDER_STREAM_GRACE = 0.5
+ORDER_TIMEOUT = 10.0
+
+
+class OrderResult(NamedTuple):
+    order_link_id: str
+    symbol: str
+    side: str
+    status: str
+    qty: float
+    filled_qty: float
+    avg_price: float
+    value: float  # cumExecValue
+    fee: float
+
+    @classmethod
+    def from_record(cls, record):
+        """From an order record, as listed by /v5/order/realtime and sent on the private order stream"""
+        return cls(record.get("orderLinkId"), record.get("symbol"), record.get("side"), record.get("orderStatus"),
+                   float(record.get("qty") or 0), float(record.get("cumExecQty") or 0),
+                   float(record.get("avgPrice") or 0), float(record.get("cumExecValue") or 0),
+                   float(record.get("cumExecFee") or 0))
+
+
+class OrderTimeout(Exception):
+    """An order was not seen in a terminal status within the manager's timeout"""
+
+
+class _TrackedOrder:
+    __slots__ = ("symbol", "future", "backoff", "started", "next_poll", "deadline", "status")
+
+    def __init__(self, symbol, backoff, started, next_poll, deadline):
+        self.symbol = symbol
+        self.future = Future()
+        self.backoff = backoff
+        self.started = started
+        self.next_poll = next_poll
+        self.deadline = deadline
+        self.status = None
+
+
+class OrderManager:
+    """Resolves a Future per tracked orderLinkId once the order reaches a terminal status"""
+
+    def __init__(self, client, poll_base=ORDER_POLL_BASE, poll_max=ORDER_POLL_MAX, stream_grace=ORDER_STREAM_GRACE,
+                 timeout=ORDER_TIMEOUT, clock=time.monotonic, metrics=REGISTRY):
+        self.client = client
+        self.poll_base = poll_base
+        self.poll_max = poll_max
+        self.stream_grace = stream_grace
+        self.timeout = timeout
+        self.clock = clock
+        self.metrics = metrics
+        self.stream = None
+        self.polls = 0
+        self._orders = {}   # orderLinkId -> _TrackedOrder, until it is terminal
+        self._results = {}  # orderLinkId -> OrderResult, until taken
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+    def attach_stream(self, stream):
+        """Take order updates from a PrivateOrderStream, starting it if needed. Returns the stream."""
+        stream.on_update = self.on_order_update
+        self.stream = stream
+        if stream._thread is None:
+            stream.start()
+        return stream
+
+    def track(self, order_link_id, symbol=None):
+        """Future for the order's OrderResult. Call before placing the order so no stream update is missed.
+
+        symbol, the order's own, is passed on to get_order_details when polling.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("OrderManager is closed")
+            order = self._orders.get(order_link_id)
+            if order is None:
+                now = self.clock()
+                streaming = self.stream is not None and self.stream.connected.is_set()
+                order = self._orders[order_link_id] = _TrackedOrder(
+                    symbol, Backoff(self.poll_base, 2.0, self.poll_max), now,
+                    now + (self.stream_grace if streaming else self.poll_base), now + self.timeout)
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="order-poller", daemon=True)
+                    self._thread.start()
+                self._cond.notify()
+        return order.future
+
+    def forget(self, order_link_id):
+        """Stop tracking an order that was never placed (e.g. rejected), cancelling its future"""
+        with self._cond:
+            order = self._orders.pop(order_link_id, None)
+        if order is not None:
+            order.future.cancel()
+
+    def take(self, order_link_id):
+        """The OrderResult of a finished order, once (None if unknown or not finished)"""
+        with self._cond:
+            return self._results.pop(order_link_id, None)
+
+    def on_order_update(self, record):
+        """Apply one order record from the private stream"""
+        self._update(record, "stream")
+
+    def _update(self, record, source):
+        link_id = record.get("orderLinkId")
+        with self._cond:
+            order = self._orders.get(link_id)
+            if order is None:
+                return False
+            order.status = record.get("orderStatus")
+            if order.status not in TERMINAL_STATUSES:
+                return False
+            del self._orders[link_id]
+            result = self._results[link_id] = OrderResult.from_record(record)
+        self.metrics.observe("order_completion_seconds", self.clock() - order.started, source=source)
+        order.future.set_result(result)
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    now = self.clock()
+                    due = [(link_id, order) for link_id, order in self._orders.items() if order.next_poll <= now]
+                    if due:
+                        break
+                    wake = min((order.next_poll for order in self._orders.values()), default=None)
+                    self._cond.wait(None if wake is None else wake - now)
+            for link_id, order in due:
+                self._poll(link_id, order)
+
+    def _poll(self, link_id, order):
+        self.polls += 1
+        try:
+            response = self.client.get_order_details(link_id, symbol=order.symbol)
+        except Exception as e:  # keep polling the other orders
+            logging.warning(f"Order status request for {link_id} failed: {e}")
+            response = None
+        records = response["result"].get("list") if response and response.get("retCode") == 0 else None
+        if records and self._update(records[0], "poll"):
+            return
+        now = self.clock()
+        with self._cond:
+            if self._orders.get(link_id) is not order:
+                return  # finished from the stream meanwhile
+            if now < order.deadline:
+                order.next_poll = now + order.backoff.next_delay()
+                return
+            del self._orders[link_id]
+        order.future.set_exception(OrderTimeout(f"Order {link_id} still {order.status or 'unknown'} "
+                                                f"after {self.timeout}s"))
+
+    def close(self, timeout=None):
+        """Stop polling and the stream; futures of orders still open are cancelled"""
+        with self._cond:
+            self._closed = True
+            orders, self._orders = self._orders, {}
+            self._cond.notify()
+        for order in orders.values():
+            order.future.cancel()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self.stream is not None:
+            self.stream.stop()
+
+
+def dma_socket_auth(client):
+    """Auth op args ([api_key, expires, signature]) for the private stream, from the DMA socket signature endpoint"""
+    response = client.generate_socket_signature()
+    if not response or response.get("retCode", 0) != 0 or not response.get("result"):
+        raise Exception(f"Failed to get socket signature: {response.get('retMsg') if response else 'no response'}")
+    result = response["result"]
+    return result if isinstance(result, list) else [result["apiKey"], result["expires"], result["signature"]]
+
+
+class PrivateOrderStream:
+    """Authenticates to the private stream, subscribes to order updates and passes each order record to on_update.
+
+    auth() returns the auth op args and is called on every connect, since
+    signatures expire. Runs its own asyncio loop on a daemon thread,
+    reconnecting with exponential backoff, like market_data_feed.OptionTickerFeed.
+    """
+
+    def __init__(self, auth, on_update=None, url=BYBIT_PRIVATE_STREAM, topics=("order",), ping_interval=PING_INTERVAL):
+        if not websockets:
+            raise ImportError("websockets library is required for PrivateOrderStream")
+        self.auth = auth
+        self.on_update = on_update
+        self.url = url
+        self.topics = list(topics)
+        self.ping_interval = ping_interval
+        self.connected = threading.Event()
+        self._loop = None
+        self._task = None
+        self._thread = None
+        self._stopping = False
+
+    async def _heartbeat(self, ws):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            await ws.send(json.dumps({"op": "ping"}))
+
+    async def _consume(self, ws):
+        async for raw in ws:
+            message = json.loads(raw)
+            op = message.get("op")
+            if op is not None:
+                if not message.get("success", True):
+                    raise ConnectionError(f"Private stream {op} failed: {message.get('ret_msg')}")
+                if op == "subscribe":
+                    self.connected.set()
+            elif message.get("topic") == "order" and self.on_update is not None:
+                for record in message.get("data", []):
+                    self.on_update(record)
+
+    async def run(self):
+        """Connect, authenticate, subscribe and pass on order updates until stop() is called"""
+        backoff = RECONNECT_BACKOFF_MIN
+        while not self._stopping:
+            try:
+                async with websockets.connect(self.url) as ws:
+                    await ws.send(json.dumps({"op": "auth", "args": self.auth()}))
+                    await ws.send(json.dumps({"op": "subscribe", "args": self.topics}))
+                    backoff = RECONNECT_BACKOFF_MIN
+                    heartbeat = asyncio.create_task(self._heartbeat(ws))
+                    try:
+                        await self._consume(ws)
+                    finally:
+                        heartbeat.cancel()
+            except Exception as e:  # network errors, a refused auth, or no signature to authenticate with
+                logging.warning(f"Private order stream disconnected: {e}, reconnecting in {backoff}s")
+            self.connected.clear()
+            if not self._stopping:
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX)
+
+    def start(self):
+        """Run the stream on a background thread. Returns self."""
+        self._loop = asyncio.new_event_loop()
+
+        def run_loop():
+            asyncio.set_event_loop(self._loop)
+            self._task = self._loop.create_task(self.run())
+            try:
+                self._loop.run_until_complete(self._task)
+            except asyncio.CancelledError:
+                pass
+            finally:
+                self._loop.close()
+
+        self._thread = threading.Thread(target=run_loop, name="private-order-stream", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stopping = True
+        if self._loop and self._loop.is_running():
+            self._loop.call_soon_threadsafe(lambda: self._task and self._task.cancel())
+        if self._thread:
+            self._thread.join(timeout)
@@ -0,0 +1,145 @@
+"""
+Local Black-Scholes pricing, greeks and implied volatility.
+
+Everything is vectorized over NumPy arrays, so a whole option chain is
+priced in one call. Conventions follow Bybit's option tickers:
+    - underlying is the expiry's underlyingPrice (a forward), rates are zero
+    - options expire at 08:00 UTC on the expiry date, time is in 365-day years
+    - vega is per 1 vol point (0.01), theta per calendar day, gamma per 1 USD
+"""
+
+import math
+
+import numpy as np
+
+EXPIRY_HOUR_UTC = 8
+YEAR_MS = 365 * 24 * 60 * 60 * 1000
+# Bounds for the implied volatility search
+MIN_IV = 1e-4
+MAX_IV = 10.0
+
+_SQRT_2PI = math.sqrt(2 * math.pi)
+
+
+def _erfc(x):
+    """Complementary error function (Numerical Recipes erfcc, relative error < 1.2e-7)"""
+    z = np.abs(x)
+    t = 1.0 / (1.0 + 0.5 * z)
+    r = t * np.exp(-z * z - 1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (0.09678418 + t * (
+        -0.18628806 + t * (0.27886807 + t * (-1.13520398 + t * (1.48851587 + t * (
+            -0.82215223 + t * 0.17087277)))))))))
+    return np.where(x >= 0, r, 2.0 - r)
+
+
+def norm_cdf(x):
+    return 0.5 * _erfc(-np.asarray(x, dtype=np.float64) / math.sqrt(2))
+
+
+def norm_pdf(x):
+    return np.exp(-0.5 * np.square(x)) / _SQRT_2PI
+
+
+def time_to_expiry(expiry, now_ms):
+    """Years from now_ms (epoch milliseconds) to 08:00 UTC on each expiry (datetime64[D])"""
+    expiry_ms = (np.asarray(expiry, dtype="datetime64[D]").astype("datetime64[ms]").astype(np.int64)
+                 + EXPIRY_HOUR_UTC * 60 * 60 * 1000)
+    return np.maximum(expiry_ms - now_ms, 0) / YEAR_MS
+
+
+def _d1_d2(underlying, strike, t, iv):
+    sqrt_t = np.sqrt(t)
+    vol_sqrt_t = iv * sqrt_t
+    d1 = (np.log(underlying / strike) + 0.5 * iv * iv * t) / vol_sqrt_t
+    return d1, d1 - vol_sqrt_t, sqrt_t
+
+
+def bs_price(underlying, strike, t, iv, is_call):
+    """Option price for each row"""
+    underlying, strike, t, iv = np.broadcast_arrays(*(np.asarray(a, dtype=np.float64) for a in (underlying, strike, t, iv)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d1, d2, _ = _d1_d2(underlying, strike, t, iv)
+        call = underlying * norm_cdf(d1) - strike * norm_cdf(d2)
+    price = np.where(is_call, call, call - underlying + strike)  # put-call parity at zero rates
+    # Expired or zero-vol options are worth their intrinsic value
+    intrinsic = np.where(is_call, np.maximum(underlying - strike, 0), np.maximum(strike - underlying, 0))
+    return np.where((t > 0) & (iv > 0), price, intrinsic)
+
+
+def black_scholes(underlying, strike, t, iv, is_call):
+    """Price and greeks for each row, as a dict of arrays: price, delta, gamma, vega, theta"""
+    underlying, strike, t, iv = np.broadcast_arrays(*(np.asarray(a, dtype=np.float64) for a in (underlying, strike, t, iv)))
+    live = (t > 0) & (iv > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d1, d2, sqrt_t = _d1_d2(underlying, strike, t, iv)
+        n1 = norm_cdf(d1)
+        pdf = norm_pdf(d1)
+        call = underlying * n1 - strike * norm_cdf(d2)
+        gamma = pdf / (underlying * iv * sqrt_t)
+        vega = underlying * pdf * sqrt_t / 100
+        theta = -underlying * pdf * iv / (2 * sqrt_t) / 365
+    intrinsic = np.where(is_call, np.maximum(underlying - strike, 0), np.maximum(strike - underlying, 0))
+    expired_delta = np.where(is_call, (underlying > strike) * 1.0, (underlying < strike) * -1.0)
+    return {
+        "price": np.where(live, np.where(is_call, call, call - underlying + strike), intrinsic),
+        "delta": np.where(live, np.where(is_call, n1, n1 - 1), expired_delta),
+        "gamma": np.where(live, gamma, 0.0),
+        "vega": np.where(live, vega, 0.0),
+        "theta": np.where(live, theta, 0.0),
+    }
+
+
+def implied_vol(price, underlying, strike, t, is_call, tol=1e-8, max_iter=100):
+    """Implied volatility for each row by safeguarded Newton iteration.
+
+    Newton steps on vega are kept inside a shrinking [low, high] bracket and fall
+    back to bisection when they leave it. Rows whose price is outside the
+    no-arbitrage bounds (or already expired) come back as NaN.
+    """
+    price, underlying, strike, t = np.broadcast_arrays(*(np.asarray(a, dtype=np.float64) for a in (price, underlying, strike, t)))
+    is_call = np.broadcast_to(is_call, price.shape)
+    intrinsic = np.where(is_call, np.maximum(underlying - strike, 0), np.maximum(strike - underlying, 0))
+    upper = np.where(is_call, underlying, strike)
+    solvable = (t > 0) & (price > intrinsic) & (price < upper)
+
+    low = np.full(price.shape, MIN_IV)
+    high = np.full(price.shape, MAX_IV)
+    # Brenner-Subrahmanyam ATM approximation as the starting point
+    with np.errstate(divide="ignore", invalid="ignore"):
+        iv = np.clip(np.sqrt(2 * np.pi / t) * price / underlying, 0.05, 2.0)
+    iv = np.where(solvable, iv, 0.5)
+    t_safe = np.where(solvable, t, 1.0)
+
+    active = solvable.copy()
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        greeks = black_scholes(underlying[active], strike[active], t_safe[active], iv[active], is_call[active])
+        diff = greeks["price"] - price[active]
+        vega = greeks["vega"] * 100
+        sub_iv, sub_low, sub_high = iv[active], low[active], high[active]
+        sub_high = np.where(diff > 0, sub_iv, sub_high)
+        sub_low = np.where(diff <= 0, sub_iv, sub_low)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = sub_iv - diff / vega
+        in_bracket = (newton > sub_low) & (newton < sub_high) & np.isfinite(newton)
+        new_iv = np.where(in_bracket, newton, 0.5 * (sub_low + sub_high))
+        done = (np.abs(diff) <= tol * np.maximum(price[active], 1.0)) | (sub_high - sub_low < tol)
+
+        rows = np.flatnonzero(active)
+        iv[rows] = np.where(done, sub_iv, new_iv)
+        low[rows], high[rows] = sub_low, sub_high
+        active[rows[done]] = False
+    return np.where(solvable, iv, np.nan)
+
+
+def chain_greeks(chain, now_ms, underlying=None, iv=None, rows=None):
+    """Price and greeks for the rows of an OptionChain (all rows by default).
+
+    underlying defaults to each row's last underlyingPrice and iv to its markIv;
+    pass a new underlying price to revalue the chain on an underlying tick.
+    """
+    rows = slice(None) if rows is None else rows
+    underlying = chain.underlying[rows] if underlying is None else underlying
+    iv = chain.iv[rows] if iv is None else iv
+    t = time_to_expiry(chain.expiry[rows], now_ms)
+    return black_scholes(underlying, chain.strike[rows], t, iv, chain.is_call[rows])
@@ -0,0 +1,199 @@
+"""
+Client-side rate limiting for API calls.
+
+Every request takes a token from its endpoint class's bucket and from a
+bucket shared by all classes. Callers that have to wait are queued by class
+priority: when tokens free up, order creation/cancel is served before market
+data, and market data before account and reporting calls, so a burst of
+polling never delays an exit order.
+
+    limiter = RateLimiter()
+    client = DMABybit(API_KEY, API_SECRET, symbol="BTCUSDT", category="option", rate_limiter=limiter)
+    limiter.stats()  # {"trade": {"requests": ..., "queue_depth": ..., "max_wait": ...}, ...}
+
+Responses feed back into the buckets: Bybit's X-Bapi-Limit-Status
+(requests left in the window) caps a class's tokens, and an exhausted limit
+or a throttled response (HTTP 429, retCode 10006) pauses the class until
+X-Bapi-Limit-Reset-Timestamp.
+"""
+
+import bisect
+import itertools
+import threading
+import time
+from typing import NamedTuple
+
+
+class EndpointLimit(NamedTuple):
+    priority: int  # lower is served first
+    rate: float  # tokens per second
+    burst: int  # bucket capacity
+
+
+# Endpoint path prefix -> class; anything else is "account"
+ENDPOINT_CLASSES = (
+    ("/v5/order/create", "trade"),
+    ("/v5/order/cancel", "trade"),
+    ("/v5/order/amend", "trade"),
+    ("/v5/market/", "market"),
+)
+# Per-UID order limits for options are 10/s; other private endpoints allow more, but the DMA proxy sits in between
+DEFAULT_LIMITS = {
+    "trade": EndpointLimit(0, 10, 10),
+    "market": EndpointLimit(1, 20, 20),
+    "account": EndpointLimit(2, 10, 10),
+}
+# All classes together (Bybit's IP limit is 600 requests per 5s)
+DEFAULT_TOTAL_LIMIT = EndpointLimit(0, 50, 50)
+# Pause for a throttled response without a reset timestamp
+THROTTLE_PAUSE = 1.0
+THROTTLED_RET_CODES = (10006, 10018)
+
+
+def endpoint_class(endpoint):
+    for prefix, name in ENDPOINT_CLASSES:
+        if endpoint.startswith(prefix):
+            return name
+    return "account"
+
+
+class TokenBucket:
+    """Tokens refilled at rate per second up to burst; can be paused until a time"""
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+        self.paused_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self):
+        """Seconds until a token is available (0 if one is now)"""
+        now = self.clock()
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def cap(self, remaining):
+        self._refill(self.clock())
+        self.tokens = min(self.tokens, remaining)
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+
+class _Stats:
+    __slots__ = ("requests", "queue_depth", "max_queue_depth", "waited", "total_wait", "max_wait", "throttled")
+
+    def __init__(self):
+        self.requests = self.queue_depth = self.max_queue_depth = self.waited = self.throttled = 0
+        self.total_wait = self.max_wait = 0.0
+
+
+class RateLimiter:
+    """Token buckets per endpoint class plus a shared one, with a priority queue of waiting callers"""
+
+    def __init__(self, limits=None, total_limit=DEFAULT_TOTAL_LIMIT, clock=time.monotonic):
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.clock = clock
+        self._buckets = {name: TokenBucket(limit.rate, limit.burst, clock) for name, limit in self.limits.items()}
+        self._total = TokenBucket(total_limit.rate, total_limit.burst, clock)
+        self._stats = {name: _Stats() for name in self.limits}
+        self._condition = threading.Condition()
+        self._queue = []  # sorted [(priority, seq, name)] of waiting callers
+        self._granted = set()
+        self._seq = itertools.count()
+
+    def _grant(self):
+        """Hand out tokens to queued callers in priority order. Returns seconds until the next could be served."""
+        wait = None
+        for entry in list(self._queue):
+            total_delay = self._total.delay()
+            if total_delay > 0:
+                # Nobody may take a shared token ahead of this caller
+                return total_delay if wait is None else min(wait, total_delay)
+            bucket = self._buckets[entry[2]]
+            delay = bucket.delay()
+            if delay > 0:
+                wait = delay if wait is None else min(wait, delay)
+                continue
+            bucket.take()
+            self._total.take()
+            self._queue.remove(entry)
+            self._granted.add(entry)
+        return wait
+
+    def acquire(self, endpoint, timeout=None):
+        """Block until endpoint's class may send a request. Returns the seconds waited, or None on timeout."""
+        name = endpoint_class(endpoint)
+        stats = self._stats[name]
+        entry = (self.limits[name].priority, next(self._seq), name)
+        started = self.clock()
+        with self._condition:
+            bisect.insort(self._queue, entry)
+            wait = self._grant()
+            queued = entry not in self._granted
+            if queued:
+                stats.queue_depth += 1
+                stats.max_queue_depth = max(stats.max_queue_depth, stats.queue_depth)
+                try:
+                    while entry not in self._granted:
+                        if timeout is not None:
+                            remaining = started + timeout - self.clock()
+                            if remaining <= 0:
+                                self._queue.remove(entry)
+                                return None
+                            wait = min(wait, remaining)
+                        self._condition.wait(wait)
+                        wait = self._grant()
+                finally:
+                    stats.queue_depth -= 1
+            self._granted.discard(entry)
+            if self._granted:
+                self._condition.notify_all()  # callers granted by this pass
+            stats.requests += 1
+            waited = self.clock() - started if queued else 0.0
+            if queued:
+                stats.waited += 1
+                stats.total_wait += waited
+                stats.max_wait = max(stats.max_wait, waited)
+            return waited
+
+    def update(self, endpoint, headers=None, status_code=None, ret_code=None):
+        """Adjust endpoint's class from a response's rate-limit headers and throttling status"""
+        name = endpoint_class(endpoint)
+        headers = headers or {}
+        remaining = headers.get("X-Bapi-Limit-Status")
+        reset_ms = headers.get("X-Bapi-Limit-Reset-Timestamp")
+        until_reset = max(0.0, int(reset_ms) / 1000 - time.time()) if reset_ms else None
+        throttled = status_code == 429 or ret_code in THROTTLED_RET_CODES
+        with self._condition:
+            bucket = self._buckets[name]
+            if remaining is not None:
+                bucket.cap(int(remaining))
+                if int(remaining) <= 0:
+                    bucket.pause(until_reset if until_reset is not None else THROTTLE_PAUSE)
+            if throttled:
+                self._stats[name].throttled += 1
+                bucket.pause(until_reset if until_reset is not None else THROTTLE_PAUSE)
+
+    def queue_depth(self, name=None):
+        """Callers waiting now, for one endpoint class or all"""
+        with self._condition:
+            return sum(1 for entry in self._queue if name is None or entry[2] == name)
+
+    def stats(self):
+        """{class: {requests, queue_depth, max_queue_depth, waited, total_wait, max_wait, mean_wait, throttled}}"""
+        with self._condition:
+            return {name: {field: getattr(s, field) for field in _Stats.__slots__}
+                    | {"mean_wait": s.total_wait / s.requests if s.requests else 0.0}
+                    for name, s in self._stats.items()}
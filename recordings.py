@@ -0,0 +1,67 @@
+"""
+Loaders for recorded API responses.
+
+The files in api_responses/ are console dumps of the API test scripts:
+section headers followed by pretty-printed JSON after "Response: ", and
+ticker stream recordings with one JSON message per line (.jsonl).
+"""
+
+import glob
+import json
+import os
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "api_responses")
+
+
+def recorded_files(pattern="bybit_option_responses_*.txt"):
+    return sorted(glob.glob(os.path.join(RECORDINGS_DIR, pattern)))
+
+
+def load_recorded_responses(path):
+    """Every JSON response in a recorded dump, in file order"""
+    with open(path) as f:
+        text = f.read()
+    decoder = json.JSONDecoder()
+    responses = []
+    marker = "Response: "
+    start = text.find(marker)
+    while start != -1:
+        response, end = decoder.raw_decode(text, start + len(marker))
+        responses.append(response)
+        start = text.find(marker, end)
+    return responses
+
+
+def load_recorded_tickers(path=None):
+    """(tickers, time_ms) of the first non-empty option tickers response in a dump"""
+    path = path or recorded_files()[0]
+    for response in load_recorded_responses(path):
+        tickers = response.get("result", {}).get("list")
+        if response.get("retCode") == 0 and tickers and "markIv" in tickers[0]:
+            return tickers, response["time"]
+    raise ValueError(f"No option tickers response in {path}")
+
+
+def load_events(paths):
+    """Recorded market data as replay events [(time_s, kind, payload)], in time order.
+
+    .jsonl files are stream recordings (one message per line, with "ts");
+    anything else is read as a REST dump and contributes its option tickers
+    responses as full snapshots.
+    """
+    events = []
+    for path in paths:
+        if path.endswith(".jsonl"):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        message = json.loads(line)
+                        if "ts" in message:
+                            events.append((message["ts"] / 1000, "message", message))
+        else:
+            for response in load_recorded_responses(path):
+                tickers = response.get("result", {}).get("list")
+                if response.get("retCode") == 0 and tickers and "markIv" in tickers[0]:
+                    events.append((response["time"] / 1000, "tickers", tickers))
+    events.sort(key=lambda event: event[0])
+    return events
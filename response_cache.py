@@ -0,0 +1,115 @@
+"""
+Short-TTL cache for read-only API responses, with request coalescing.
+
+DMABybit routes its read-only endpoints (tickers, positions, balance)
+through a ResponseCache: a successful response is reused for its endpoint
+group's TTL, and concurrent callers asking for the same request share one
+in-flight fetch instead of each sending it.
+
+    cache = ResponseCache({"tickers": 1.0, "positions": 2.0, "balance": 5.0})
+    client = DMABybit(API_KEY, API_SECRET, symbol="BTCUSDT", category="option", cache=cache)
+    other = DMABybit(API_KEY, API_SECRET, symbol="BTCUSDT", category="option", session=client.session, cache=client.cache)
+
+Clients that share a cache also share invalidation: any POST (an order, a
+margin change) drops the cached positions and balance, and a fetch that was
+in flight while they were invalidated is returned to its callers but not
+cached. Cached responses are shared between callers and must not be mutated.
+"""
+
+import threading
+import time
+
+# Seconds a successful response stays fresh, per endpoint group. Groups without a TTL are not cached.
+DEFAULT_CACHE_TTLS = {"tickers": 1.0, "positions": 2.0, "balance": 5.0}
+# Groups whose responses change when the account trades
+ACCOUNT_GROUPS = ("positions", "balance")
+
+
+class _Fetch:
+    """One in-flight request and the callers waiting on it"""
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResponseCache:
+    """Thread-safe TTL cache of successful responses, keyed by (group, request)"""
+
+    def __init__(self, ttls=None, clock=time.monotonic):
+        self.ttls = dict(DEFAULT_CACHE_TTLS if ttls is None else ttls)
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> (expires_at, response)
+        self._fetches = {}  # key -> _Fetch
+        self._generation = 0
+
+    @property
+    def generation(self):
+        """Bumped by every invalidation; a fetch started under an older generation is not stored"""
+        return self._generation
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > self.clock():
+            self.hits += 1
+            return True, entry[1]
+        self.misses += 1
+        return False, None
+
+    def lookup(self, key):
+        """(True, response) if key has a fresh response, else (False, None)"""
+        with self._lock:
+            return self._lookup(key)
+
+    def store(self, key, response, generation):
+        """Cache a response fetched under generation, if it succeeded and nothing was invalidated since"""
+        ttl = self.ttls.get(key[0])
+        if not ttl or not isinstance(response, dict) or response.get("retCode") != 0:
+            return
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (self.clock() + ttl, response)
+
+    def get_or_fetch(self, key, fetch):
+        """Cached response for key, or fetch() it once for every concurrent caller of the same key"""
+        if not self.ttls.get(key[0]):
+            return fetch()
+        with self._lock:
+            cached, response = self._lookup(key)
+            if cached:
+                return response
+            pending = self._fetches.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._fetches[key] = _Fetch(self._generation)
+        if not owner:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+        try:
+            pending.value = fetch()
+            self.store(key, pending.value, pending.generation)
+        except BaseException as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._fetches[key]
+            pending.done.set()
+        return pending.value
+
+    def invalidate(self, *groups):
+        """Drop the cached responses of groups (default: all), and keep in-flight fetches from being stored"""
+        with self._lock:
+            self._generation += 1
+            if not groups:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] in groups]:
+                    del self._entries[key]
@@ -0,0 +1,162 @@
+"""
+Event loop for the strategy.
+
+One thread runs all strategy callbacks. Market-data producers (the ticker
+stream or a REST poll timer) post update events from any thread; handlers
+registered with on_market_update() run for every batch of updates, so
+stop-loss/take-profit checks see each new market state. Periodic work such
+as delta checks runs on timers, and a timer that raises is retried with
+exponential backoff instead of waiting for its next interval.
+
+    scheduler = Scheduler(fatal_exceptions=(LegOrderError,))
+    scheduler.on_market_update(check_exits)
+    scheduler.call_every(15 * 60, rebalance)
+    scheduler.run()
+"""
+
+import heapq
+import itertools
+import logging
+import queue
+import time
+
+_WAKE = object()
+
+
+class Backoff:
+    """Exponential backoff delays: base, base*factor, ... capped at maximum"""
+
+    def __init__(self, base=1.0, factor=2.0, maximum=60.0):
+        self.base = base
+        self.factor = factor
+        self.maximum = maximum
+        self.attempt = 0
+
+    def next_delay(self):
+        delay = min(self.base * self.factor ** self.attempt, self.maximum)
+        self.attempt += 1
+        return delay
+
+    def reset(self):
+        self.attempt = 0
+
+
+class Timer:
+    """Handle for a scheduled callback; cancel() stops it from running again"""
+
+    def __init__(self, fn, interval=None, backoff=None):
+        self.fn = fn
+        self.interval = interval
+        self.backoff = backoff or Backoff()
+        self.when = None
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Scheduler:
+    """Single-threaded timers plus coalesced market-update events.
+
+    Exceptions of the types in fatal_exceptions propagate out of run(); any
+    other exception is logged, and a failing timer is retried after a backoff.
+    """
+
+    def __init__(self, clock=time.monotonic, fatal_exceptions=()):
+        self.clock = clock
+        self.fatal_exceptions = tuple(fatal_exceptions)
+        self._timers = []
+        self._seq = itertools.count()
+        self._events = queue.Queue()
+        self._handlers = []
+        self._running = False
+
+    def _schedule(self, timer, delay):
+        timer.when = self.clock() + delay
+        heapq.heappush(self._timers, (timer.when, next(self._seq), timer))
+
+    def call_later(self, delay, fn):
+        """Run fn() once after delay seconds"""
+        timer = Timer(fn)
+        self._schedule(timer, delay)
+        return timer
+
+    def call_every(self, interval, fn, first_delay=None):
+        """Run fn() every interval seconds, first after first_delay (default: interval)"""
+        timer = Timer(fn, interval)
+        self._schedule(timer, interval if first_delay is None else first_delay)
+        return timer
+
+    def on_market_update(self, handler):
+        """Call handler(event) with the latest event of each batch of posted updates"""
+        self._handlers.append(handler)
+
+    def post(self, event=None):
+        """Signal a market update. Safe to call from any thread."""
+        self._events.put(event)
+
+    def stop(self):
+        self._running = False
+        self._events.put(_WAKE)
+
+    @property
+    def running(self):
+        return self._running
+
+    def _invoke(self, fn, *args):
+        try:
+            fn(*args)
+            return True
+        except self.fatal_exceptions:
+            raise
+        except Exception:
+            logging.exception(f"Scheduled callback {getattr(fn, '__name__', fn)} failed")
+            return False
+
+    def _wait(self, timeout):
+        """Block up to timeout seconds for posted events; returns all that are pending"""
+        try:
+            events = [self._events.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _run_due_timers(self):
+        now = self.clock()
+        while self._running and self._timers and self._timers[0][0] <= now:
+            _, _, timer = heapq.heappop(self._timers)
+            if timer.cancelled:
+                continue
+            if self._invoke(timer.fn):
+                timer.backoff.reset()
+                if timer.interval is not None and not timer.cancelled:
+                    # Keep the cadence anchored to the schedule, but never fire in a burst to catch up
+                    self._schedule(timer, max(timer.when + timer.interval - self.clock(), 0))
+            elif not timer.cancelled:
+                delay = timer.backoff.next_delay()
+                if timer.interval is not None:
+                    delay = min(delay, timer.interval)
+                logging.warning(f"Retrying {getattr(timer.fn, '__name__', timer.fn)} in {delay:.1f}s")
+                self._schedule(timer, delay)
+
+    def run(self):
+        """Dispatch events and timers until stop() is called or nothing is left to do"""
+        self._running = True
+        try:
+            while self._running:
+                if not self._timers and not self._handlers:
+                    break
+                timeout = max(self._timers[0][0] - self.clock(), 0) if self._timers else None
+                events = [e for e in self._wait(timeout) if e is not _WAKE]
+                if events and self._running:
+                    for handler in list(self._handlers):
+                        self._invoke(handler, events[-1])
+                        if not self._running:
+                            break
+                self._run_due_timers()
+        finally:
+            self._running = False
@@ -1,120 +1,208 @@
 import time
-import requests
-import csv
+import uuid
 import argparse
-# from datetime import datetime, UTC
-from datetime import datetime, timezone
-from bybit_apis import DMABybit
-import os
-from dotenv import load_dotenv
+from typing import NamedTuple
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 
-from helpers import get_initial_margin_of_position_state, get_pnl_of_position_state, get_pnl_of_sqaured_position
+import numpy as np
+
+# The API client, stream feed and tick store (and requests, websockets, dotenv) are imported on first use,
+# so importing the strategy stays cheap and free of side effects; see app_context.py
+from app_context import DATA_DIR, AppContext
+from instruments import parse_symbol
+from option_chain import OptionChain
+from pricing import chain_greeks
+from scheduler import Backoff, Scheduler
+from ledger import PositionLedger, estimate_fee
+from chain_manager import ChainManager
+from journal import JOURNAL_FLUSH_INTERVAL, JOURNAL_FLUSH_SIZE, TradeJournal
+from metrics import REGISTRY as metrics, PrometheusFileSink
 
 # Initialize global variables
 total_realized_pnl = 0.0
 intital_margin_prices = 0.0
 
-# Create logs directory if it doesn't exist
-logs_dir = 'logs'
-if not os.path.exists(logs_dir):
-    os.makedirs(logs_dir)
-
-# Create data directory if it doesn't exist
-data_dir = 'trades_data'
-if not os.path.exists(data_dir):
-    os.makedirs(data_dir)
-
-# Configure logging with timestamped filename in logs directory
-log_filename = os.path.join(logs_dir, f'strategy_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log')
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_filename),
-        logging.StreamHandler()  # This will also print to console
-    ]
-)
-
-# Initialize Bybit API client
-load_dotenv()
-API_KEY = os.getenv('API_KEY')
-API_SECRET = os.getenv('API_SECRET')
-bybit_client = DMABybit(API_KEY, API_SECRET, symbol="BTCUSDT", category="option")
-
-# Logging: Initialize CSV file with headers if not exists
-LOG_FILE = os.path.join(data_dir, f'trades_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv')
-with open(LOG_FILE, mode='w', newline='') as f:
-   writer = csv.writer(f)
-   writer.writerow(["Timestamp", "Order_Link_Id", "Symbol", "Side", "Quantity", "Price", "Realized_PnL"])
+class StrategyParams(NamedTuple):
+   """Strategy thresholds. The live run uses the defaults; backtests and sweeps replace strategy.params."""
+   target_delta: float = 0.1          # |delta| of the short call and put
+   iv_spike_ratio: float = 1.3        # ATM IV over its baseline that counts as a spike
+   wait_for_iv_spike: bool = False    # False: enter on the first market update
+   exit_margin_fraction: float = 0.1  # take profit / stop loss at +/- this fraction of initial margin
+   rebalance_band: float = 0.1        # rebalance once |net delta| exceeds this
+
+params = StrategyParams()
+# Underlying whose options are traded
+base_coin = "BTC"
+
+# Fills of every order the strategy places; PnL is computed from it locally
+ledger = PositionLedger()
+# Symbols of orders sent whose fills are not booked yet. Checkpointed before the orders go out, so a restart
+# reconciles them with the exchange even if the process died before booking the fills.
+pending_orders = set()
+# Wall clock for greeks, replaced by the simulated clock when backtesting
+clock = time.time
+
+# Default cadences (seconds): delta checks, chain polling when not streaming, ledger vs exchange checks
+REBALANCE_INTERVAL = 15 * 60
+POLL_INTERVAL = 5
+RECONCILE_INTERVAL = 5 * 60
+# Least time between two rebalances triggered by underlying moves (between timer checks)
+REBALANCE_COOLDOWN = 60
+METRICS_INTERVAL = 15  # seconds between metrics exports, when a sink is configured
+
+# Streaming option chain; when started, get_iv_and_greeks reads from it instead of polling REST
+market_feed = None
+# Full chains fetched once per cycle and split by expiry, while several instances run (see run_instances)
+chain_manager = None
+
+# perf_counter time of the oldest market update not handled yet, and of the one being handled (for tick-to-order)
+pending_tick_time = None
+tick_time = None
+
+# Worker pool used to submit the legs of a structure at the same time (up to 4 legs for an iron butterfly)
+leg_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="leg-order")
+
+# The live run's AppContext, installed by init_app(): its Bybit API client, trade/decision journal
+# (JSON lines, written in batches by a background thread) and order manager. Until then there is no client,
+# the journal drops records and orders count as filled once accepted; tests and backtests assign their own.
+app = None
+bybit_client = None
+journal = TradeJournal(None)
+# Follows each order to its final fill (order_manager.OrderManager), so fills are booked at their real prices
+order_manager = None
+# While a StrategyInstance callback runs, saves that instance's checkpoint: called on every order intent and fill
+checkpoint_state = None
+
+def init_app(context=None):
+   """Install a run's AppContext (default: a new one); its client, journal and order manager become
+   bybit_client, journal and order_manager"""
+   global app, bybit_client, journal, order_manager
+   app = context or AppContext()
+   bybit_client, journal, order_manager = app.client, app.journal, app.order_manager
+   return app
  
 def log_trade(order_link_id, symbol, side, qty, price, realized_pnl):
-   """Log the trade details and P&L to the CSV file."""
-   timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
-   with open(LOG_FILE, mode='a', newline='') as f:
-       writer = csv.writer(f)
-       writer.writerow([timestamp, order_link_id, symbol, side, qty, price, f"{realized_pnl:.4f}"])
+   """Record the trade details and P&L in the journal."""
+   journal.record("trade", order_link_id=order_link_id, symbol=symbol, side=side, qty=qty, price=price,
+                  realized_pnl=realized_pnl)
    logging.info(f"Trade logged: {order_link_id} {symbol} {side} {qty} @ {price} (PnL: {realized_pnl:.4f})")
  
 # Helper: Fetch current option market data (tickers) for Symbol
+def book_fill(order_id, symbol, side, qty, quote):
+   """Record an order's fill in the ledger: the exchange's fill when the order manager tracked it, else at
+   the quoted price. Returns (price, realized_pnl)."""
+   global total_realized_pnl
+   order = order_manager.take(order_id) if order_manager is not None else None
+   if order is not None:
+       price, qty, fee = order.avg_price, order.filled_qty, order.fee
+   else:
+       if side == "Sell":
+           price = quote.get("bid") or quote.get("ask") or 0.0
+       else:
+           price = quote.get("ask") or quote.get("bid") or 0.0
+       fee = estimate_fee(price, quote.get("underlying") or 0.0, qty)
+   realized_pnl = ledger.record_fill(symbol, side, qty, price, fee, order_id)
+   total_realized_pnl += realized_pnl
+   pending_orders.discard(symbol)
+   if checkpoint_state is not None:
+       checkpoint_state()
+   return price, realized_pnl
+
+def reconcile_positions(snapshot):
+   """Align the ledger with an exchange position snapshot: the symbols it has traded and those of pending
+   orders, whose fills it may never have booked (pending_orders is then cleared). Returns the corrected symbols."""
+   corrected = ledger.reconcile(snapshot, symbols=sorted(pending_orders)) if pending_orders else []
+   pending_orders.clear()
+   # The pending symbols are in the ledger now, and already in step
+   return corrected + ledger.reconcile(snapshot)
+
+def reconcile_ledger():
+   """Check the ledger against one exchange position snapshot. Returns the symbols that were corrected."""
+   from helpers import get_position_snapshot
+   snapshot = get_position_snapshot()
+   if snapshot is None:
+       raise Exception("Failed to fetch position snapshot for reconciliation")
+   corrected = reconcile_positions(snapshot)
+   if corrected:
+       logging.warning(f"Ledger corrected from exchange positions: {corrected}")
+   return corrected
+
+def stream_live():
+   """Whether the ticker stream is running and connected. While it reconnects its store keeps the last
+   values it saw, so readers go to REST instead of acting on a frozen chain."""
+   return market_feed is not None and market_feed.connected.is_set()
+
 def get_iv_and_greeks(expiry=None):
    """Fetch all Symbol option tickers and return parsed data (IV, delta, etc.)"""
-   data = bybit_client.get_tickers(category="option", base_coin="BTC", exp_date=expiry)
+   from market_data_feed import parse_option_tickers
+   if stream_live():
+       return market_feed.store.options_data(expiry, base_coin)
+   data = bybit_client.get_tickers(category="option", base_coin=base_coin, exp_date=expiry, typed=True)
    if data.get("retCode") != 0:
        raise Exception(f"Failed to get tickers: {data.get('retMsg')}")
-   # Parse the returned list of option tickers
-   option_list = data["result"]["list"]
    # Convert list of tickers to a dict for easier search: key by symbol
-   options_data = {}
-   for opt in option_list:
-       symbol = opt["symbol"]
-       # Extract needed fields
-       iv = float(opt.get("markIv", 0))         # implied volatility (as a decimal, e.g. 0.75 for 75%)
-       delta = float(opt.get("delta", 0))
-       underlying = float(opt.get("underlyingPrice", 0))
-       options_data[symbol] = {
-           "iv": iv,
-           "delta": delta,
-           "underlying": underlying,
-           "bid": float(opt.get("bid1Price", 0)),
-           "ask": float(opt.get("ask1Price", 0))
-       }
-   return options_data
+   return parse_option_tickers(data["result"]["list"])
+
+def get_option_chain(expiry=None):
+   """Fetch the option chain (from the stream while it is connected, else REST) as a columnar OptionChain"""
+   with metrics.time("strategy_step_seconds", step="chain_fetch"):
+       if chain_manager is not None:
+           return chain_manager.chain(base_coin, expiry)
+       if stream_live():
+           return market_feed.store.option_chain(expiry, base_coin)
+       data = bybit_client.get_tickers(category="option", base_coin=base_coin, exp_date=expiry, typed=True)
+       if data.get("retCode") != 0:
+           raise Exception(f"Failed to get tickers: {data.get('retMsg')}")
+       return OptionChain.from_tickers(data["result"]["list"])
+
+def start_market_feed(expiry=None, url=None, tick_dir=None, chains=None):
+   """Seed the option chain from REST once and keep it current from the ticker stream.
+
+   chains lists (base_coin, expiry) pairs to stream on the one connection, for
+   several strategy instances (default: base_coin's expiry). With tick_dir,
+   every ticker update is also recorded to a tick store there.
+   """
+   from market_data_feed import OptionChainStore, OptionTickerFeed
+   from tickstore import TickRecorder, TickStore
+   global market_feed
+   kwargs = {"url": url} if url else {}
+   if tick_dir:
+       kwargs["recorder"] = TickRecorder(TickStore(tick_dir))
+   # Each REST snapshot is loaded into the same store; the last feed built subscribes to all of their symbols
+   store = OptionChainStore()
+   for chain_base_coin, chain_expiry in chains or [(base_coin, expiry)]:
+       feed = OptionTickerFeed.from_rest(bybit_client, base_coin=chain_base_coin, expiry=chain_expiry, store=store, **kwargs)
+   market_feed = feed.start()
+   logging.info(f"Streaming {len(market_feed.symbols)} option tickers from {market_feed.url}")
+   return market_feed
+
+def stop_market_feed():
+   """Stop the ticker stream, if one was started; its tick recorder writes out the ticks it still buffers"""
+   global market_feed
+   if market_feed is not None:
+       market_feed.stop()
+       market_feed = None
  
 # Helper: Identify a call and put with delta ~ +0.1 and -0.1 respectively
-def find_delta_neutral_legs(options_data):
-   """Find one call and one put whose deltas are approximately +0.1 and -0.1."""
-   target_delta = 0.1
-   best_call = None
-   best_put = None
-   delta_diff_call = float("inf")
-   delta_diff_put = float("inf")
-   for symbol, info in options_data.items():
-       d = info["delta"]
-       # Ensure we pick only SYMBOLUSDT options (Bybit might list SYMBOLUSD etc; focusing on USDT-settled if needed)
-       # For simplicity, assume all here are Symbol options for the chosen expiry.
-       # Identify calls vs puts by symbol structure (e.g., "-C" or "-P")
-       if symbol.endswith("-C-USDT"):  # call option
-           # We want a call with delta ~ +0.1 (d should be positive)
-           if d > 0:
-               diff = abs(d - target_delta)
-               if diff < delta_diff_call:
-                   delta_diff_call = diff
-                   best_call = (symbol, info)
-       elif symbol.endswith("-P-USDT"):  # put option
-           # We want a put with delta ~ -0.1 (d should be negative)
-           if d < 0:
-               diff = abs(d + target_delta)  # use + because d is negative, want d ≈ -0.1
-               if diff < delta_diff_put:
-                   delta_diff_put = diff
-                   best_put = (symbol, info)
+def find_delta_neutral_legs(option_chain):
+   """Find one call and one put whose deltas are approximately +target_delta and -target_delta."""
+   target_delta = params.target_delta
+   # Only USDT-settled calls with delta > 0 and puts with delta < 0 are considered
+   with metrics.time("strategy_step_seconds", step="leg_selection"):
+       call_sym = option_chain.nearest_delta(target_delta, is_call=True)
+       put_sym = option_chain.nearest_delta(-target_delta, is_call=False)
+   best_call = (call_sym, option_chain[call_sym]) if call_sym else None
+   best_put = (put_sym, option_chain[put_sym]) if put_sym else None
    return best_call, best_put
  
 # Helper: Place an order (using requests for illustration; normally use authenticated request)
 def place_order(side, symbol, qty, order_type="Market", price=None):
    logging.info(f"Placing order: {symbol} {side} {qty} {order_type} {price}")
 #    return 1
-   """Place an order on Bybit for the given option. side: 'Buy' or 'Sell'. Returns order ID or raises on error."""
+   """Place an order on Bybit for the given option. side: 'Buy' or 'Sell'. Returns a LegFill (order ID and the
+   quantity filled, which may be less than qty) or raises on error."""
    body = {
        "symbol": symbol,
        "side": side,
@@ -125,94 +213,251 @@ def place_order(side, symbol, qty, order_type="Market", price=None):
    }
    if price is not None:
        body["price"] = str(price)  # Convert price to string as required by Bybit
+   if order_manager is not None:
+       # Tracked before it is sent, so a fill reported at once on the order stream is not missed
+       body["orderLinkId"] = str(uuid.uuid4())
+       fill = order_manager.track(body["orderLinkId"], symbol)
    
-   result = bybit_client.place_order(body)
-   if result.get("retCode") != 0:
-       raise Exception(f"Order placement failed: {result.get('retMsg')}")
+   started = time.perf_counter()
+   if tick_time is not None:
+       metrics.observe("strategy_tick_to_order_seconds", started - tick_time)
+   try:
+       result = bybit_client.place_order(body)
+   finally:
+       metrics.observe("strategy_step_seconds", time.perf_counter() - started, step="order_round_trip")
+   outcome = "ok" if result and result.get("retCode") == 0 else "rejected"
+   metrics.inc("strategy_orders_total", side=side, outcome=outcome)
+   if outcome != "ok":
+       if order_manager is not None:
+           order_manager.forget(body["orderLinkId"])
+       raise Exception(f"Order placement failed: {result.get('retMsg') if result else 'no response'}")
    order_id = result["result"]["orderLinkId"]
-   return order_id
+   if order_manager is not None:
+       # Accepted is not filled: wait for the final status (an IOC market order may expire unfilled)
+       from order_manager import OrderTimeout
+       with metrics.time("strategy_step_seconds", step="order_fill"):
+           try:
+               order = fill.result()
+           except OrderTimeout:
+               # Accepted, but its final status never came: it may well have filled, so ask the exchange.
+               # If not (yet), the leg fails and its symbol stays in pending_orders for the next reconcile.
+               filled_qty = filled_on_exchange(symbol, side, qty)
+               if not filled_qty:
+                   raise
+               logging.warning(f"Order {order_id} status timed out, but the {symbol} position shows "
+                               f"{filled_qty} of {qty} filled")
+               return LegFill(order_id, filled_qty)
+       if not order.filled_qty:
+           order_manager.take(order_id)
+           raise Exception(f"Order {order_id} not filled: {order.status}")
+       if order.filled_qty < qty:
+           logging.warning(f"Order {order_id} partially filled: {order.filled_qty} of {qty} {symbol}")
+       return LegFill(order_id, order.filled_qty)
+   return LegFill(order_id, qty)
+
+def filled_on_exchange(symbol, side, qty):
+   """How much of the order the exchange position in symbol shows filled (0.0 if none), from how far it moved
+   the order's way since the ledger last booked it, up to qty. For an accepted order whose final status is
+   unknown; its fill is booked by the caller, at the quote."""
+   from helpers import get_position_snapshot
+   snapshot = get_position_snapshot()
+   if snapshot is None:
+       raise Exception(f"Failed to fetch position snapshot to check order in {symbol}")
+   record = snapshot.get(symbol) or {}
+   size = float(record.get("size") or 0)
+   exchange_qty = -size if record.get("side") == "Sell" else size
+   booked = ledger.position(symbol)
+   moved = exchange_qty - (booked.qty if booked is not None else 0.0)
+   moved = moved if side == "Buy" else -moved
+   return round(min(max(moved, 0.0), qty), 8)
+
+class LegFill(NamedTuple):
+   """A placed order: its orderLinkId and the quantity that filled (all of it, without an order manager)"""
+   order_id: str
+   qty: float
+
+class LegOrderError(Exception):
+   """Raised when some legs of a multi-leg order failed.
+
+   `filled` maps leg -> LegFill for the legs that were placed, `failed` maps
+   leg -> exception for the ones that were not, so the caller can unwind or retry.
+   Strategy steps set `position_state` to the short legs left open by the failure.
+   """
+   def __init__(self, message, filled, failed, position_state=None):
+       super().__init__(message)
+       self.filled = filled
+       self.failed = failed
+       self.position_state = position_state
+
+def place_legs(orders):
+   """Submit all legs concurrently. orders: {leg: {"side", "symbol", "qty"}}. Returns {leg: LegFill}."""
+   # Checkpoint the intent first: if the process dies before the fills are booked, a restart still checks them
+   pending_orders.update(order["symbol"] for order in orders.values())
+   if checkpoint_state is not None:
+       checkpoint_state()
+   futures = {leg: leg_executor.submit(place_order, **order) for leg, order in orders.items()}
+   filled = {}
+   failed = {}
+   for leg, future in futures.items():
+       try:
+           filled[leg] = future.result()
+       except Exception as e:
+           failed[leg] = e
+   if failed:
+       logging.error(f"Leg orders failed: {failed}; placed: {filled}")
+       raise LegOrderError(f"{len(failed)} of {len(orders)} leg orders failed: {', '.join(failed)}", filled, failed)
+   return filled
  
 # Strategy functions
-def enter_delta_neutral_position(expiry=None):
-   """Monitor IV and enter delta-neutral short position on IV spike."""
-   # Monitor until IV spike condition met
-   baseline_iv = None
-   spike_triggered = False
-   selected_call = selected_put = None
-   selected_call_info = selected_put_info = None
- 
-   logging.info("Monitoring IV for a spike...")
-   while not spike_triggered:
-       data = get_iv_and_greeks(expiry)
-       logging.info("get_iv_and_greeks data:")
+class EntryMonitor:
+   """Tracks the ATM IV baseline across market updates and enters the short legs on a spike."""
+   def __init__(self, expiry=None):
+       self.expiry = expiry
+       self.baseline_iv = None
+
+   def check(self, data):
+       """Evaluate one option chain update. Returns the new position_state once entered, else None."""
        # Compute an aggregate IV measure (e.g., ATM IV or average of near-the-money options)
        # For simplicity, take IV of ATM call as baseline indicator:
        # Find option with delta closest to 0.5 (ATM) to represent ATM IV
-       delta = None
-       atm_diff = float("inf")
-       atm_iv = None
-       atm_sym = None
-       for sym, info in data.items():
-           if sym.endswith("-C-USDT"):  # check call (could also consider put)
-               diff = abs(info["delta"] - 0.5)
-               if diff < atm_diff:
-                   atm_diff = diff
-                   atm_iv = info["iv"]
-                   delta = info["delta"]
-                   atm_sym = sym
-       if atm_iv is None:
-           logging.warning("No ATM IV found, trying again...")
-           time.sleep(5)
-           continue  # no data, try again
-       logging.info(f"atm_sym: {atm_sym}")
-       logging.info(f"atm_iv: {atm_iv}")
-       logging.info(f"delta: {delta}")
+       atm_sym = data.nearest_delta(0.5, is_call=True)  # check call (could also consider put)
+       if not atm_sym:
+           logging.warning("No ATM IV found, waiting for the next update...")
+           return None
+       atm_iv = data[atm_sym]["iv"]
+       logging.info(f"atm_sym: {atm_sym}, atm_iv: {atm_iv}, delta: {data[atm_sym]['delta']}")
        
-       if baseline_iv is None:
+       if self.baseline_iv is None:
            # initialize baseline (could use a moving average; here just first sample)
-           baseline_iv = atm_iv
+           self.baseline_iv = atm_iv
        # Check for +30% spike
-       if atm_iv >= 1.3 * baseline_iv or True:
-           spike_triggered = True
+       if atm_iv >= params.iv_spike_ratio * self.baseline_iv or not params.wait_for_iv_spike:
            # Identify the 0.1 delta call and -0.1 delta put for entry
-           (call_sym, call_info), (put_sym, put_info) = find_delta_neutral_legs(data)
-           selected_call, selected_call_info = call_sym, call_info
-           selected_put, selected_put_info = put_sym, put_info
-           logging.info(f"IV spike detected! ATM IV {atm_iv:.2f} vs baseline {baseline_iv:.2f}.")
-           logging.info(f"Selected call: {selected_call} (delta {selected_call_info['delta']:.2f})")
-           logging.info(f"Selected put:  {selected_put} (delta {selected_put_info['delta']:.2f})")
-       else:
-           # Update baseline gradually (to adapt to slowly rising volatility, avoiding one-off spikes)
-           baseline_iv = 0.9 * baseline_iv + 0.1 * atm_iv
-           logging.info(f"No spike yet. Current ATM IV={atm_iv:.2f}, baseline={baseline_iv:.2f}.")
-           time.sleep(1)  # wait 1 minute before next check
-   
+           best_call, best_put = find_delta_neutral_legs(data)
+           if best_call is None or best_put is None:
+               logging.info("No call/put legs to enter yet, waiting for the next update...")
+               return None
+           (call_sym, call_info), (put_sym, put_info) = best_call, best_put
+           logging.info(f"IV spike detected! ATM IV {atm_iv:.2f} vs baseline {self.baseline_iv:.2f}.")
+           logging.info(f"Selected call: {call_sym} (delta {call_info['delta']:.2f})")
+           logging.info(f"Selected put:  {put_sym} (delta {put_info['delta']:.2f})")
+           journal.record("decision", action="enter", atm_iv=atm_iv, baseline_iv=self.baseline_iv,
+                          call=call_sym, call_delta=call_info["delta"], put=put_sym, put_delta=put_info["delta"])
+           return open_short_legs(call_sym, call_info, put_sym, put_info)
+       # Update baseline gradually (to adapt to slowly rising volatility, avoiding one-off spikes)
+       self.baseline_iv = 0.9 * self.baseline_iv + 0.1 * atm_iv
+       logging.info(f"No spike yet. Current ATM IV={atm_iv:.2f}, baseline={self.baseline_iv:.2f}.")
+       return None
+
+def start_market_updates(scheduler, expiry=None, poll_interval=POLL_INTERVAL, poll_chain=True):
+   """Post market updates to the scheduler: on every stream message, or a REST chain every poll_interval.
+
+   Without poll_chain, polls post None and each handler fetches its own chain
+   (for instances trading different chains on one scheduler).
+   """
+   def post(event=None):
+       global pending_tick_time
+       if pending_tick_time is None:
+           pending_tick_time = time.perf_counter()
+       metrics.inc("strategy_market_updates_total")
+       scheduler.post(event)
+
+   if market_feed is not None:
+       market_feed.store.add_listener(post)
+   else:
+       def poll_option_chain():
+           post(get_option_chain(expiry) if poll_chain else None)
+       scheduler.call_every(poll_interval, poll_option_chain, first_delay=0)
+
+@contextmanager
+def handling_market_update():
+   """Orders placed inside the block count as reacting to the oldest market update since the last one handled"""
+   global pending_tick_time, tick_time
+   tick_time, pending_tick_time = pending_tick_time, None
+   try:
+       yield
+   finally:
+       tick_time = None
+
+def enter_delta_neutral_position(expiry=None, poll_interval=POLL_INTERVAL):
+   """Monitor IV and enter delta-neutral short position on IV spike."""
+   monitor = EntryMonitor(expiry)
+   scheduler = Scheduler(fatal_exceptions=(LegOrderError,))
+   entered = {}
+
+   def on_market_update(data):
+       with handling_market_update():
+           position_state = monitor.check(data if data is not None else get_option_chain(expiry))
+       if position_state is not None:
+           entered["position"] = position_state
+           scheduler.stop()
+
+   scheduler.on_market_update(on_market_update)
+   start_market_updates(scheduler, expiry, poll_interval)
+   logging.info("Monitoring IV for a spike...")
+   scheduler.run()
+   return entered.get("position")
+
+def open_short_legs(selected_call, selected_call_info, selected_put, selected_put_info):
    # Place orders for the selected legs (short call and short put)
    call_symbol = selected_call
    put_symbol = selected_put
-   # We'll sell 1 contract each for now
-   order_id_call = place_order(side="Sell", symbol=call_symbol, qty=0.01)
-   order_id_put  = place_order(side="Sell", symbol=put_symbol, qty=0.01)
-   logging.info(f"Entered short position: Sold 1x {call_symbol} and 1x {put_symbol}.")
-   # Log the entry trades (realized PnL = 0 for entry since just opening positions)
-   # Assuming we have price info from selected_call_info (bid/ask). Use bid for sell price as conservative.
-   entry_call_price = selected_call_info["bid"] or selected_call_info["ask"]  # if bid is 0 (no bid), use ask as proxy
-   entry_put_price  = selected_put_info["bid"] or selected_put_info["ask"]
-   log_trade(order_id_call, call_symbol, "Sell", 0.01, entry_call_price, realized_pnl=0.0)
-   log_trade(order_id_put,  put_symbol,  "Sell", 0.01, entry_put_price,  realized_pnl=0.0)
-   # Return a structure representing current position state
-   position_state = {
-       "call": {"order_id": order_id_call, "symbol": call_symbol, "delta": selected_call_info["delta"], "entry_price": entry_call_price, "contracts": 1, "qty": 0.01},
-       "put":  {"order_id": order_id_put,  "symbol": put_symbol,  "delta": selected_put_info["delta"],  "entry_price": entry_put_price,  "contracts": 1, "qty": 0.01}
+   # We'll sell 1 contract each for now, both legs submitted together to limit legging risk
+   try:
+       fills = place_legs({
+           "call": {"side": "Sell", "symbol": call_symbol, "qty": 0.01},
+           "put":  {"side": "Sell", "symbol": put_symbol, "qty": 0.01},
+       })
+       leg_error = None
+   except LegOrderError as e:
+       fills, leg_error = e.filled, e
+   # Book the entry fills at the bid (the ask if there is no bid) and log them
+   legs = {
+       "call": (call_symbol, selected_call_info),
+       "put":  (put_symbol, selected_put_info),
    }
+   position_state = {}
+   for leg, (order_id, qty) in fills.items():
+       symbol, info = legs[leg]
+       entry_price, _ = book_fill(order_id, symbol, "Sell", qty, info)
+       # Return a structure representing current position state; qty is what filled, so exits buy back no more
+       position_state[leg] = {"order_id": order_id, "symbol": symbol, "delta": info["delta"], "entry_price": entry_price, "contracts": 1, "qty": qty}
+       log_trade(order_id, symbol, "Sell", qty, entry_price, realized_pnl=0.0)
+   if leg_error:
+       leg_error.position_state = position_state
+       raise leg_error
+   logging.info(f"Entered short position: Sold 1x {call_symbol} and 1x {put_symbol}.")
    global intital_margin_prices
-   intital_margin_prices = get_initial_margin_of_position_state(position_state)
+   intital_margin_prices = fetch_initial_margin(position_state)
+   if intital_margin_prices <= 0:
+       # The exit band is a fraction of the margin: with none, the first tick would close the legs on fees alone
+       raise LegOrderError("No initial margin for the new position, flattening it", fills, {},
+                           position_state=position_state)
    print(f"intital_margin_prices: {intital_margin_prices}")
    return position_state
 
+def fetch_initial_margin(position_state, attempts=3):
+   """Initial margin of the position's legs from a fresh position snapshot, retried with backoff (0.0 if none)"""
+   backoff = Backoff()
+   symbols = [info["symbol"] for info in position_state.values()]
+   for attempt in range(1, attempts + 1):
+       try:
+           reconcile_ledger()
+           margin = ledger.initial_margin(symbols)
+           if margin > 0:
+               return margin
+           logging.error(f"Initial margin attempt {attempt}/{attempts}: exchange reports none for {symbols}")
+       except Exception as e:
+           logging.error(f"Initial margin attempt {attempt}/{attempts} failed: {e}")
+       if attempt < attempts:
+           time.sleep(backoff.next_delay())
+   return 0.0
+
 def calculate_current_pnl(position_state, get_iv_and_greeks_data, expiry=None):
     """Calculate current PnL for the position including both realized and unrealized components."""
-    unrealized_pnl = get_pnl_of_position_state(position_state)  
+    # Unrealized PnL of the open legs at the chain's mark prices, from the local ledger
+    with metrics.time("strategy_step_seconds", step="pnl_check"):
+        unrealized_pnl = ledger.unrealized_pnl(get_iv_and_greeks_data, [info["symbol"] for info in position_state.values()])
     # Total PnL = realized PnL + unrealized PnL
     total_pnl = total_realized_pnl + unrealized_pnl
     logging.info(f"Total PnL: {total_pnl:.4f} (Realized: {total_realized_pnl:.4f}, Unrealized: {unrealized_pnl:.4f})")
@@ -220,70 +465,114 @@ def calculate_current_pnl(position_state, get_iv_and_greeks_data, expiry=None):
 
 def check_pnl_and_exit(position_state, get_iv_and_greeks_data, expiry=None):
     """Check PnL and exit if it's too low."""
+    if intital_margin_prices <= 0:
+        logging.error("No initial margin to set the profit target and stop loss from, not checking exits")
+        return False
     current_pnl = calculate_current_pnl(position_state, get_iv_and_greeks_data, expiry)
     logging.info(f"Current PnL: {current_pnl} and intital_margin_prices: {intital_margin_prices}")
     # Get current market data
+    exit_pnl = intital_margin_prices * params.exit_margin_fraction
     # Check if PnL is above initial margin prices plus 10% (profit target)
-    global total_realized_pnl
-    if current_pnl >= intital_margin_prices * 0.1:
-        logging.info(f"Profit target reached! Current PnL: {current_pnl:.4f}, which is above initial margin plus 10%: {(intital_margin_prices * 0.1):.4f}")
-        # Close positions (buy back what we sold)
-        for leg, info in position_state.items():
-            symbol = info["symbol"]
-            qty = info["qty"]
-            contracts = info["contracts"]
-            current_price = get_iv_and_greeks_data.get(symbol, {}).get("ask") or get_iv_and_greeks_data.get(symbol, {}).get("bid") or 0.0
-            entry_price = info["entry_price"]
-            realized_pnl = (entry_price - current_price) * contracts
-           
-            order_id = place_order(side="Buy", symbol=symbol, qty=qty)
-            realized_pnl_squared_position = get_pnl_of_sqaured_position(info["order_id"], order_id)
-            total_realized_pnl += realized_pnl_squared_position
-            log_trade(info["order_id"], symbol, "Buy", qty, current_price, realized_pnl=realized_pnl_squared_position)    
-            logging.info(f"Closed {leg} position with realized PnL: {realized_pnl_squared_position:.4f}")
-        logging.info(f"Exited position with total realized PnL: {total_realized_pnl:.4f}")
+    if current_pnl >= exit_pnl:
+        logging.info(f"Profit target reached! Current PnL: {current_pnl:.4f}, which is above initial margin plus {params.exit_margin_fraction:.0%}: {exit_pnl:.4f}")
+        journal.record("decision", action="exit", reason="take_profit", pnl=current_pnl, threshold=exit_pnl,
+                       legs=[info["symbol"] for info in position_state.values()])
+        close_position_legs(position_state, get_iv_and_greeks_data)
         return True  # Signal that we've exited the position
     
     # Check if PnL is below initial margin prices minus 10% (stop loss)
-    if current_pnl <= intital_margin_prices * -0.1:
-        logging.info(f"Stop loss triggered! Current PnL: {current_pnl:.4f}, which is below initial margin minus 10%: {intital_margin_prices * -0.1:.4f}")
-        # Close positions (buy back what we sold)
-        for leg, info in position_state.items():
-            symbol = info["symbol"]
-            qty = info["qty"]
-            contracts = info["contracts"]
-            current_price = get_iv_and_greeks_data.get(symbol, {}).get("ask") or get_iv_and_greeks_data.get(symbol, {}).get("bid") or 0.0
-            entry_price = info["entry_price"]
-            realized_pnl = (entry_price - current_price) * contracts
-            
-            order_id = place_order(side="Buy", symbol=symbol, qty=qty)
-            realized_pnl_squared_position = get_pnl_of_sqaured_position(info["order_id"], order_id)
-            total_realized_pnl += realized_pnl_squared_position
-            log_trade(info["order_id"], symbol, "Buy", qty, current_price, realized_pnl=realized_pnl_squared_position)
-            logging.info(f"Closed {leg} position with realized PnL: {realized_pnl_squared_position:.4f}")
-        logging.info(f"Exited position with total realized PnL: {total_realized_pnl:.4f}")
+    if current_pnl <= -exit_pnl:
+        logging.info(f"Stop loss triggered! Current PnL: {current_pnl:.4f}, which is below initial margin minus {params.exit_margin_fraction:.0%}: {-exit_pnl:.4f}")
+        journal.record("decision", action="exit", reason="stop_loss", pnl=current_pnl, threshold=-exit_pnl,
+                       legs=[info["symbol"] for info in position_state.values()])
+        close_position_legs(position_state, get_iv_and_greeks_data)
         return True  # Signal that we've exited the position
     
     # If we're here, we're within our PnL thresholds
-    logging.info(f"Current PnL: {current_pnl:.4f} is within acceptable range of initial margin ±10%: {intital_margin_prices:.4f} ±{intital_margin_prices * 0.1:.4f}")
+    logging.info(f"Current PnL: {current_pnl:.4f} is within acceptable range of initial margin ±{params.exit_margin_fraction:.0%}: {intital_margin_prices:.4f} ±{exit_pnl:.4f}")
     return False  # Signal that we're still in the position
 
-def rebalance_delta(position_state, expiry=None):
-   """Check portfolio delta and rebalance if outside ±0.1 by adjusting the appropriate leg."""
+def close_position_legs(position_state, get_iv_and_greeks_data):
+    """Buy back every short leg concurrently and book the realized PnL.
+
+    Closed legs are removed from position_state. If any leg fails to close,
+    or only partly, LegOrderError is raised after the fills are booked, leaving
+    only the still-open legs (and quantities) in position_state.
+    """
+    orders = {leg: {"side": "Buy", "symbol": info["symbol"], "qty": info["qty"]} for leg, info in position_state.items()}
+    leg_error = None
+    try:
+        fills = place_legs(orders)
+    except LegOrderError as e:
+        leg_error = e
+        fills = e.filled
+
+    for leg, (order_id, qty) in fills.items():
+        info = position_state[leg]
+        symbol = info["symbol"]
+        current_price, realized_pnl_squared_position = book_fill(order_id, symbol, "Buy", qty, get_iv_and_greeks_data.get(symbol, {}))
+        log_trade(info["order_id"], symbol, "Buy", qty, current_price, realized_pnl=realized_pnl_squared_position)
+        remaining = round(info["qty"] - qty, 8)
+        if remaining > 0:
+            info["qty"] = remaining
+            logging.error(f"{leg} only partly closed, {remaining} {symbol} still open")
+            leg_error = leg_error or LegOrderError(f"{leg} leg only partly closed", fills, {})
+            leg_error.failed[leg] = Exception(f"Order {order_id} filled {qty} of {qty + remaining}")
+            continue
+        del position_state[leg]
+        logging.info(f"Closed {leg} position with realized PnL: {realized_pnl_squared_position:.4f}")
+
+    if leg_error:
+        logging.error(f"Partial exit, legs still open: {list(position_state)}")
+        leg_error.position_state = position_state
+        raise leg_error
+    logging.info(f"Exited position with total realized PnL: {total_realized_pnl:.4f}")
+
+def leg_deltas(position_state, option_chain, underlying=None, now_ms=None):
+   """Delta of each leg (times contracts), computed locally from the leg's IV.
+
+   Pass the latest underlying price to re-evaluate deltas on an underlying tick
+   without refetching the chain. Legs missing from the chain count as 0.
+   """
+   now_ms = now_ms if now_ms is not None else int(clock() * 1000)
+   legs = [leg for leg, info in position_state.items() if info["symbol"] in option_chain]
+   deltas = {leg: 0.0 for leg in position_state}
+   if legs:
+       rows = [option_chain.row_of[position_state[leg]["symbol"]] for leg in legs]
+       greeks = chain_greeks(option_chain, now_ms, underlying=underlying, rows=rows)
+       for leg, delta in zip(legs, greeks["delta"]):
+           deltas[leg] = float(delta) * position_state[leg]["contracts"]
+   return deltas
+
+def latest_underlying(option_chain, expiry=None):
+   """Latest underlying price for the chain's expiry: the stream's last tick while it is connected, else the
+   chain's"""
+   if stream_live() and expiry is not None:
+       price = market_feed.store.underlying_price(expiry, base_coin)
+       if price:
+           return price
+   prices = option_chain.underlying[option_chain.underlying > 0]
+   return float(np.median(prices)) if len(prices) else None
+
+def rebalance_delta(position_state, expiry=None, data=None, underlying=None):
+   """Check portfolio delta and rebalance if outside ±0.1 by adjusting the appropriate leg.
+
+   Pass the chain already in hand (and the latest underlying price) to re-check on an underlying tick
+   without fetching it again.
+   """
    logging.info(f"Rebalancing delta: {position_state}")
-   data = get_iv_and_greeks(expiry)
+   data = data if data is not None else get_option_chain(expiry)
    exit_signal = check_pnl_and_exit(position_state, data, expiry)
    if exit_signal:
        return {}
    # Calculate current net delta of the portfolio
-   call_sym = position_state["call"]["symbol"]
-   put_sym  = position_state["put"]["symbol"]
-   call_delta = data.get(call_sym, {}).get("delta", 0) * position_state["call"]["contracts"]
-   put_delta  = data.get(put_sym, {}).get("delta", 0) * position_state["put"]["contracts"]
+   deltas = leg_deltas(position_state, data, underlying=underlying)
+   call_delta = deltas["call"]
+   put_delta  = deltas["put"]
    net_delta = call_delta + put_delta
    logging.info(f"Current net delta: {net_delta:.3f} (call leg {call_delta:.3f}, put leg {put_delta:.3f})")
-   if abs(net_delta) <= 0.1:
-       logging.info("Portfolio delta is within ±0.1, no rebalance needed at this interval.")
+   if abs(net_delta) <= params.rebalance_band:
+       logging.info(f"Portfolio delta is within ±{params.rebalance_band}, no rebalance needed at this interval.")
        return None  # no adjustment made
    
    # Determine which leg has smaller delta contribution in magnitude
@@ -293,85 +582,76 @@ def rebalance_delta(position_state, expiry=None):
        leg_to_adjust = "put"
    # Decide adjustment: we will add one more short contract on the weaker side
    adjust_symbol = position_state[leg_to_adjust]["symbol"]
-   # Close the existing position, we have to buy since we are short
-   price = data.get(adjust_symbol, {}).get("bid") or data.get(adjust_symbol, {}).get("ask") or 0.0
+   new_adjust_symbol = get_position_near_delta(data, leg_to_adjust, abs(put_delta) if leg_to_adjust == "call" else abs(call_delta))
+   journal.record("decision", action="rebalance", net_delta=net_delta, leg=leg_to_adjust, close=adjust_symbol,
+                  open=new_adjust_symbol)
+   # Buy back the old leg and sell its replacement together
+   old_qty = position_state[leg_to_adjust]["qty"]
+   try:
+       fills = place_legs({
+           "close": {"side": "Buy", "symbol": adjust_symbol, "qty": old_qty},
+           "open": {"side": "Sell", "symbol": new_adjust_symbol, "qty": 0.01},
+       })
+       leg_error = None
+   except LegOrderError as e:
+       fills, leg_error = e.filled, e
    
-   order_id = place_order(side="Buy", symbol=adjust_symbol, qty=0.01)
+   if "close" in fills:
+       # Close the existing position, we have to buy since we are short
+       close_id, close_qty = fills["close"]
+       old_leg = position_state[leg_to_adjust]
+       price, realized_pnl_squared_position = book_fill(close_id, adjust_symbol, "Buy", close_qty, data.get(adjust_symbol, {}))
+       log_trade(old_leg["order_id"], adjust_symbol, "Buy", close_qty, price, realized_pnl=realized_pnl_squared_position)
+       remaining = round(old_qty - close_qty, 8)
+       if remaining > 0:
+           # Partly bought back: the rest stays open, for the caller to flatten
+           old_leg["qty"] = remaining
+           leg_error = leg_error or LegOrderError(f"{leg_to_adjust} leg only partly closed", fills, {})
+           leg_error.failed["close"] = Exception(f"Order {close_id} filled {close_qty} of {old_qty}")
+       else:
+           del position_state[leg_to_adjust]
    
-   global total_realized_pnl
-   realized_pnl_squared_position = get_pnl_of_sqaured_position(position_state[leg_to_adjust]["order_id"], order_id)
-   total_realized_pnl += realized_pnl_squared_position
-   log_trade(position_state[leg_to_adjust]["order_id"], adjust_symbol, "Buy", 0.01, price, realized_pnl=realized_pnl_squared_position)
+   if "open" in fills:
+       order_id_new_symbol, new_qty = fills["open"]
+       new_adjust_price, _ = book_fill(order_id_new_symbol, new_adjust_symbol, "Sell", new_qty, data.get(new_adjust_symbol, {}))
+       # If the old leg could not be closed, keep both open legs so the caller can flatten them
+       new_leg_key = leg_to_adjust if leg_to_adjust not in position_state else f"{leg_to_adjust}_new"
+       position_state[new_leg_key] = {"order_id": order_id_new_symbol, "symbol": new_adjust_symbol,  "delta": data.get(new_adjust_symbol, {}).get("delta", 0),  "entry_price": new_adjust_price,  "contracts": 1, "qty": new_qty}
+       # Log the adjustment trade. Realized PnL = 0 (we are opening new position, not closing any).
+       log_trade(order_id_new_symbol, new_adjust_symbol, "Sell", new_qty, new_adjust_price, realized_pnl=0.0)
    
-   new_adjust_symbol = get_position_near_delta(data, leg_to_adjust, abs(put_delta) if leg_to_adjust == "call" else abs(call_delta))
-   order_id_new_symbol = place_order(side="Sell", symbol=new_adjust_symbol, qty=0.01)
-   new_adjust_price = data.get(new_adjust_symbol, {}).get("bid") or data.get(new_adjust_symbol, {}).get("ask") or 0.0
-   position_state[leg_to_adjust] = {"order_id": order_id_new_symbol, "symbol": new_adjust_symbol,  "delta": data.get(new_adjust_symbol, {}).get("delta", 0),  "entry_price": new_adjust_price,  "contracts": 1, "qty": 0.01}
-   # Log the adjustment trade. Realized PnL = 0 (we are opening new position, not closing any).
-   log_trade(order_id_new_symbol, new_adjust_symbol, "Sell", 0.01, new_adjust_price, realized_pnl=0.0)
+   if leg_error:
+       leg_error.position_state = position_state
+       raise leg_error
    logging.info(f"New position state after rebalancing: {position_state}")
    return position_state  # adjustment made
  
-def get_position_near_delta(get_iv_and_greeks_data, leg_to_adjust, target_delta):
+def get_position_near_delta(option_chain, leg_to_adjust, target_delta):
    """Get the position near the delta"""
-   symbol_ends_with = "-C-USDT" if leg_to_adjust == "call" else "-P-USDT"
-   best_symbol = None
-   delta_diff_call = float("inf")
-   delta_diff_put = float("inf")
-   
-   for symbol, info in get_iv_and_greeks_data.items():
-        d = info["delta"]
-        if symbol.endswith(symbol_ends_with):
-            if symbol_ends_with == "-C-USDT":  # call option
-                # We want a call with delta ~ target_delta (d should be positive)
-                if d > 0:
-                    diff = abs(d - target_delta)
-                    if diff < delta_diff_call:
-                        delta_diff_call = diff
-                        best_symbol = symbol
-            else:  # put option
-                # We want a put with delta ~ -target_delta (d should be negative)
-                if d < 0:
-                    diff = abs(d + target_delta)  # Note the + sign here for puts
-                    if diff < delta_diff_put:
-                        delta_diff_put = diff
-                        best_symbol = symbol
-   return best_symbol
+   # Calls are matched to +target_delta, puts to -target_delta
+   with metrics.time("strategy_step_seconds", step="leg_selection"):
+       if leg_to_adjust == "call":
+           return option_chain.nearest_delta(target_delta, is_call=True)
+       return option_chain.nearest_delta(-target_delta, is_call=False)
    
 def convert_to_iron_butterfly(position_state, expiry=None):
    """If the short positions form a straddle, buy wings to form an iron butterfly."""
    logging.info(f"Converting to iron butterfly: {position_state}")
    # Determine current short strikes for call and put
-   call_strike = float(position_state["call"]["symbol"].split("-")[-3])  # e.g., symbol format "Symbol-<expiry>-<strike>-C-USDT"
-   put_strike  = float(position_state["put"]["symbol"].split("-")[-3])
+   call_strike = parse_symbol(position_state["call"]["symbol"]).strike  # e.g., symbol format "Symbol-<expiry>-<strike>-C-USDT"
+   put_strike  = parse_symbol(position_state["put"]["symbol"]).strike
    print(f"call_strike: {call_strike}, put_strike: {put_strike}")
    # Check if strikes are effectively equal (or very close) indicating a straddle
    if abs(call_strike - put_strike) > 1e-6:
        return False  # not a straddle yet
    center_strike = call_strike  # (which equals put_strike)
    
-   # Initialize wing options
-   chosen_call_wing = None
-   chosen_put_wing = None
-   
    # Get market data for available options
-   data = get_iv_and_greeks(expiry)
+   data = get_option_chain(expiry)
    
    # Find the closest call option above center strike and put option below center strike
-   min_diff_call = float("inf")
-   min_diff_put = float("inf")
-   
-   for sym, info in data.items():
-       if sym.endswith("-C-USDT"):
-           strike = float(sym.split("-")[-3])
-           if strike > center_strike and abs(strike - center_strike) < min_diff_call:
-               min_diff_call = abs(strike - center_strike)
-               chosen_call_wing = sym
-       elif sym.endswith("-P-USDT"):
-           strike = float(sym.split("-")[-3])
-           if strike < center_strike and abs(strike - center_strike) < min_diff_put:
-               min_diff_put = abs(strike - center_strike)
-               chosen_put_wing = sym
+   chosen_call_wing = data.next_strike(center_strike, is_call=True, above=True)
+   chosen_put_wing = data.next_strike(center_strike, is_call=False, above=False)
    
    print(f"center_strike: {center_strike}")
    print(f"chosen_call_wing: {chosen_call_wing}, chosen_put_wing: {chosen_put_wing}")
@@ -379,59 +659,446 @@ def convert_to_iron_butterfly(position_state, expiry=None):
        logging.warning("Could not find suitable wing strikes for iron butterfly.")
        return False
  
+   journal.record("decision", action="iron_butterfly", center_strike=center_strike, call_wing=chosen_call_wing,
+                  put_wing=chosen_put_wing)
    # Place buy orders for the wings
-   order_id1 = place_order(side="Buy", symbol=chosen_call_wing, qty=0.01)
-   order_id2 = place_order(side="Buy", symbol=chosen_put_wing, qty=0.01)
+   wings = {"call_wing": chosen_call_wing, "put_wing": chosen_put_wing}
+   try:
+       fills = place_legs({leg: {"side": "Buy", "symbol": symbol, "qty": 0.01} for leg, symbol in wings.items()})
+       leg_error = None
+   except LegOrderError as e:
+       fills, leg_error = e.filled, e
+   # Book and log every wing bought, including a lone one when the other failed
+   wing_prices = {}
+   for leg, (order_id, qty) in fills.items():
+       wing_prices[leg], _ = book_fill(order_id, wings[leg], "Buy", qty, data.get(wings[leg], {}))
+       # Realized PnL 0: the wing cost is part of the structure's P&L
+       log_trade(order_id, wings[leg], "Buy", qty, wing_prices[leg], realized_pnl=0.0)
+   if leg_error:
+       raise leg_error
    # Calculate cost of wings and total credit from shorts
-   wing_call_price = data.get(chosen_call_wing, {}).get("ask") or 0.0
-   wing_put_price  = data.get(chosen_put_wing, {}).get("ask") or 0.0
-   total_wing_cost = wing_call_price + wing_put_price
+   total_wing_cost = wing_prices["call_wing"] + wing_prices["put_wing"]
    # Calculate total premium received from shorts (approximate using entry prices * contracts)
    total_short_premium = (position_state["call"]["entry_price"] * position_state["call"]["contracts"] +
                           position_state["put"]["entry_price"] * position_state["put"]["contracts"])
    net_credit_after_wings = total_short_premium - total_wing_cost
    logging.info(f"Added wings: Bought 1x {chosen_call_wing} and 1x {chosen_put_wing}. Total wing cost ~{total_wing_cost:.2f}, net credit remaining ~{net_credit_after_wings:.2f}.")
-   # Log the wing purchase trades (realized PnL negative here as cost, but we treat it as part of strategy P&L)
-   log_trade(order_id1, chosen_call_wing, "Buy", 1, wing_call_price, realized_pnl=0.0)
-   log_trade(order_id2, chosen_put_wing,  "Buy", 1, wing_put_price,  realized_pnl=0.0)
    # Once wings are added, the position is now an iron butterfly with defined risk.
    return True
  
+def flatten_open_legs(position_state, expiry=None, attempts=3):
+    """Close whatever short legs are left after a leg order failure. Returns True once flat."""
+    backoff = Backoff()
+    for attempt in range(1, attempts + 1):
+        if not position_state:
+            return True
+        try:
+            close_position_legs(position_state, get_option_chain(expiry))
+            return True
+        except LegOrderError as e:
+            logging.error(f"Flatten attempt {attempt}/{attempts} failed: {e}")
+            time.sleep(backoff.next_delay())
+    logging.critical(f"Could not flatten legs after {attempts} attempts, still open: {position_state}")
+    return False
+
+class StrategyState:
+    """What one strategy instance trades and has booked: its underlying and expiry, thresholds, ledger and PnL.
+
+    The module globals of the same names are the state of a single-instance
+    run; see using_state() for running strategy functions on another instance.
+    """
+    def __init__(self, base_coin="BTC", expiry=None, params=None, ledger=None):
+        self.base_coin = base_coin
+        self.expiry = expiry
+        self.params = params or StrategyParams()
+        self.ledger = ledger or PositionLedger()
+        self.total_realized_pnl = 0.0
+        self.intital_margin_prices = 0.0
+        self.pending_orders = set()
+
+    @property
+    def name(self):
+        return f"{self.base_coin}-{self.expiry}"
+
+# Module globals that hold the state of the running instance
+STATE_FIELDS = ("base_coin", "params", "ledger", "total_realized_pnl", "intital_margin_prices", "pending_orders")
+
+@contextmanager
+def using_state(state):
+    """Run strategy functions on a StrategyState: its fields replace the module globals inside the block
+    and are saved back to it after. Only for the scheduler thread, which runs every instance's callbacks."""
+    module = globals()
+    saved = {name: module[name] for name in STATE_FIELDS}
+    module.update({name: getattr(state, name) for name in STATE_FIELDS})
+    try:
+        yield state
+    finally:
+        for name in STATE_FIELDS:
+            setattr(state, name, module[name])
+        module.update(saved)
+
+class StrategyInstance:
+    """One run of the strategy on a scheduler: enter on an IV spike, then manage the position.
+
+    Take-profit/stop-loss is checked on every market update; delta rebalancing
+    and the iron butterfly conversion run every rebalance_interval seconds, and
+    the local ledger is checked against exchange positions every reconcile_interval.
+    A leg order failure ends the instance after flattening whatever legs are still open.
+
+    With a StrategyState, callbacks run on it (see using_state), so instances
+    for several underlyings/expiries can share one scheduler; without one they
+    use the module globals. on_done(instance) is called when the instance
+    finishes (default: stop the scheduler).
+
+    With a StateCheckpoint, the instance's record() is saved before its
+    orders are sent, after each fill is booked and after every callback that
+    changed it; resume() picks a saved record up again after a restart.
+    """
+    def __init__(self, expiry, scheduler, state=None, rebalance_interval=REBALANCE_INTERVAL,
+                 reconcile_interval=RECONCILE_INTERVAL, on_done=None, checkpoint=None):
+        self.expiry = expiry
+        self.scheduler = scheduler
+        self.state = state
+        self.rebalance_interval = rebalance_interval
+        self.reconcile_interval = reconcile_interval
+        self.on_done = on_done or (lambda instance: scheduler.stop())
+        self.checkpoint = checkpoint
+        self.monitor = EntryMonitor(expiry)
+        self.position = None
+        self.adjustments = 0
+        self.last_underlying = None
+        self.last_rebalance = None
+        self.done = False
+        self._timers = []
+
+    @property
+    def name(self):
+        return self.state.name if self.state is not None else f"{base_coin}-{self.expiry}"
+
+    def start(self):
+        self.scheduler.on_market_update(self._callback(self.on_market_update))
+        return self
+
+    def _callback(self, fn):
+        def callback(*args):
+            global checkpoint_state
+            if self.done:
+                return
+            outer, checkpoint_state = checkpoint_state, self.save
+            with using_state(self.state) if self.state is not None else nullcontext():
+                try:
+                    fn(*args)
+                except LegOrderError as e:
+                    self.on_leg_error(e)
+                finally:
+                    checkpoint_state = outer
+                    self.save()
+        callback.__name__ = fn.__name__
+        return callback
+
+    def record(self):
+        """What a restart needs to carry on with this instance (call it on the instance's state, as callbacks do)"""
+        return {"base_coin": base_coin, "expiry": self.expiry, "position": self.position,
+                "adjustments": self.adjustments, "baseline_iv": self.monitor.baseline_iv,
+                "total_realized_pnl": total_realized_pnl, "intital_margin_prices": intital_margin_prices,
+                "ledger": ledger.open_positions(), "pending_orders": sorted(pending_orders), "finished": self.done}
+
+    def save(self):
+        """Checkpoint record() if it changed since the last save"""
+        if self.checkpoint is not None:
+            self.checkpoint.save(self.name, self.record())
+
+    def resume(self, record, snapshot):
+        """Carry on from a checkpointed record, checked against an exchange position snapshot.
+
+        The ledger is restored from the record and reconciled with the snapshot,
+        along with the symbols of orders sent but not booked when it was saved;
+        legs the exchange no longer holds are dropped. An unfinished instance
+        whose legs are all still open goes straight to managing them. If some
+        were closed while it was down, or it holds shorts that no leg records
+        (the process died between an order and the end of its step), those and
+        the legs left are flattened and the instance finishes, as after a leg
+        order failure. Wings that no leg records mean the iron butterfly
+        conversion had begun: the instance finishes without adjusting. A
+        finished record with no open legs is ignored, so the instance starts afresh.
+        """
+        global total_realized_pnl, intital_margin_prices
+        ledger.restore(record["ledger"])
+        pending_orders.update(record.get("pending_orders", ()))
+        corrected = reconcile_positions(snapshot)
+        if corrected:
+            logging.warning(f"Ledger corrected from exchange positions on resume: {corrected}")
+        position = record["position"] or {}
+        open_legs = {leg: info for leg, info in position.items()
+                     if ledger.position(info["symbol"]) is not None and ledger.position(info["symbol"]).qty}
+        closed = [info["symbol"] for leg, info in position.items() if leg not in open_legs]
+        if closed:
+            logging.warning(f"{self.name}: legs closed while the strategy was down: {closed}")
+        leg_symbols = {info["symbol"] for info in position.values()}
+        orphans = {symbol: qty for symbol, (qty, _) in ledger.open_positions().items() if symbol not in leg_symbols}
+        if orphans and not record["finished"]:
+            logging.warning(f"{self.name}: open positions that no leg records: {orphans}")
+        if record["finished"] and not open_legs:
+            logging.info(f"{self.name}: checkpointed run had finished flat, starting afresh")
+            return
+        total_realized_pnl = record["total_realized_pnl"]
+        intital_margin_prices = record["intital_margin_prices"]
+        self.adjustments = record["adjustments"]
+        self.monitor.baseline_iv = record["baseline_iv"]
+        self.position = open_legs if position else None
+        if record["finished"]:
+            logging.info(f"{self.name}: checkpointed run had finished, not managing {list(open_legs)}")
+            self.done = True
+        elif closed or any(qty < 0 for qty in orphans.values()):
+            self.position = dict(open_legs)
+            for symbol, qty in orphans.items():
+                if qty < 0:
+                    self.position[symbol] = {"order_id": None, "symbol": symbol, "qty": -qty}
+            logging.error(f"{self.name}: flattening the legs left: {list(self.position)}")
+            flatten_open_legs(self.position, self.expiry)
+            self.finish(f"{self.name}: position changed while the strategy was down. Stopping strategy execution.")
+        elif orphans:
+            self.finish(f"{self.name}: wings {list(orphans)} were bought before the restart. "
+                        "No further adjustments will be made.")
+        elif open_legs:
+            logging.info(f"{self.name}: resumed managing {list(open_legs)} "
+                         f"(realized PnL {total_realized_pnl:.4f}, initial margin {intital_margin_prices:.4f})")
+            self._manage()
+        else:
+            logging.info(f"{self.name}: resumed waiting for entry (baseline IV {self.monitor.baseline_iv})")
+
+    def _manage(self):
+        self._timers = [self.scheduler.call_every(self.rebalance_interval, self._callback(self.manage_position)),
+                        self.scheduler.call_every(self.reconcile_interval, self._callback(reconcile_ledger))]
+
+    def finish(self, message=None):
+        if message:
+            logging.info(message)
+        self.done = True
+        for timer in self._timers:
+            timer.cancel()
+        self.on_done(self)
+
+    def on_market_update(self, data):
+        with handling_market_update():
+            data = data if data is not None else get_option_chain(self.expiry)
+            # Step 1: Enter position on IV spike
+            if self.position is None:
+                position = self.monitor.check(data)
+                if position is not None:
+                    self.position = position
+                    self._manage()
+            # Step 2: Exit on profit target / stop loss as soon as the market moves
+            elif check_pnl_and_exit(self.position, data, self.expiry):
+                self.finish("All positions have been exited. Stopping strategy execution.")
+            # Step 3: Re-check delta when the underlying moves, between the rebalance timer's checks
+            else:
+                self.check_delta(data)
+
+    def check_delta(self, data):
+        """Revalue the legs' deltas at the latest underlying price against the chain in hand (no refetch),
+        and rebalance now if net delta left the band, at most once per REBALANCE_COOLDOWN"""
+        underlying = latest_underlying(data, self.expiry)
+        if underlying is None or underlying == self.last_underlying:
+            return
+        self.last_underlying = underlying
+        net_delta = sum(leg_deltas(self.position, data, underlying=underlying).values())
+        if abs(net_delta) <= params.rebalance_band:
+            return
+        now = self.scheduler.clock()
+        if self.last_rebalance is not None and now - self.last_rebalance < REBALANCE_COOLDOWN:
+            return
+        logging.info(f"Net delta {net_delta:.3f} at underlying {underlying:.2f} is outside ±{params.rebalance_band}")
+        self.manage_position(data, underlying)
+
+    def manage_position(self, data=None, underlying=None):
+        # Rebalance periodically until conversion condition met or until expiry
+        self.last_rebalance = self.scheduler.clock()
+        adjusted = rebalance_delta(self.position, self.expiry, data, underlying)
+        if adjusted is not None:
+            if adjusted == {}:
+                self.finish("All positions have been exited. Stopping strategy execution.")
+                return
+            self.position = adjusted
+            self.adjustments += 1
+        # Check if we should convert to iron butterfly
+        if self.adjustments > 0:  # after at least one adjustment, consider conversion
+            if convert_to_iron_butterfly(self.position, self.expiry):
+                self.finish("Converted to Iron Butterfly structure. No further adjustments will be made.")
+
+    def on_leg_error(self, e):
+        if e.position_state is None:
+            # A lone wing only reduces risk: report it and stop adjusting, as after a conversion
+            logging.error(f"Wing purchase partially failed ({e}), wings bought: {e.filled}")
+        else:
+            logging.error(f"Leg order failure ({e}), flattening remaining legs: {list(e.position_state)}")
+            flatten_open_legs(e.position_state, self.expiry)
+        self.finish()
+
+def _run_scheduler(scheduler):
+    """Run the scheduler, exporting metrics periodically, then flush the journal and report tick-to-order"""
+    if metrics.sinks:
+        scheduler.call_every(METRICS_INTERVAL, metrics.export)
+    logging.info("Monitoring IV for a spike...")
+    try:
+        scheduler.run()
+    finally:
+        journal.flush()
+        metrics.export()
+        tick_to_order = metrics.quantiles("strategy_tick_to_order_seconds")
+        logging.info(f"Tick-to-order p50 {tick_to_order[0.5] * 1e3:.1f} ms, p99 {tick_to_order[0.99] * 1e3:.1f} ms")
+
+def resume_instances(instances, checkpoint):
+    """Resume each instance that has a record in the checkpoint, all checked against one position snapshot"""
+    started = time.perf_counter()
+    records = checkpoint.load()
+    to_resume = [(instance, records[instance.name]) for instance in instances if instance.name in records]
+    if not to_resume:
+        logging.info(f"Nothing to resume in {checkpoint.path}")
+        return
+    from helpers import get_position_snapshot
+    snapshot = get_position_snapshot()
+    if snapshot is None:
+        raise Exception("Failed to fetch position snapshot to resume from")
+    for instance, record in to_resume:
+        instance._callback(instance.resume)(record, snapshot)
+    logging.info(f"Resumed {len(to_resume)} strategy instance(s) from {checkpoint.path} "
+                 f"in {(time.perf_counter() - started) * 1e3:.0f} ms")
+
+def run_strategy(expiry, rebalance_interval=REBALANCE_INTERVAL, poll_interval=POLL_INTERVAL,
+                 reconcile_interval=RECONCILE_INTERVAL, scheduler=None, checkpoint=None, resume=False):
+    """Run one StrategyInstance on the module globals until it finishes. Returns its position state.
+
+    With a checkpoint, its state is saved on every change; with resume, it first carries on from the saved state.
+    """
+    scheduler = scheduler or Scheduler(fatal_exceptions=(LegOrderError,))
+    instance = StrategyInstance(expiry, scheduler, rebalance_interval=rebalance_interval,
+                                reconcile_interval=reconcile_interval, checkpoint=checkpoint).start()
+    if resume:
+        resume_instances([instance], checkpoint)
+        if instance.done:
+            return instance.position
+    start_market_updates(scheduler, expiry, poll_interval)
+    _run_scheduler(scheduler)
+    return instance.position
+
+def run_instances(states, rebalance_interval=REBALANCE_INTERVAL, poll_interval=POLL_INTERVAL,
+                  reconcile_interval=RECONCILE_INTERVAL, scheduler=None, checkpoint=None, resume=False):
+    """Run a StrategyInstance per StrategyState on one scheduler until all finish. Returns {state.name: position}.
+
+    Instances share the API client (its connection pool, response cache and
+    rate limits), the market feed or REST poll timer, and the journal. Every
+    market update first refreshes a ChainManager, one full-chain fetch (or
+    stream copy) per base coin, and instances read their expiry's view of it.
+    Each must trade its own chain: ledgers are reconciled per symbol against
+    the one account. checkpoint and resume are as for run_strategy.
+    """
+    names = [state.name for state in states]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Strategy instances must trade different chains: {names}")
+    global chain_manager
+    scheduler = scheduler or Scheduler()
+    running = set(names)
+    manager = ChainManager(client=bybit_client, store=market_feed.store if market_feed is not None else None,
+                           live=stream_live,
+                           base_coins=sorted({state.base_coin for state in states}))
+
+    def refresh_chains(event):
+        manager.refresh()
+
+    def on_done(instance):
+        running.discard(instance.state.name)
+        logging.info(f"Strategy instance {instance.state.name} finished, {len(running)} still running")
+        if not running:
+            scheduler.stop()
+
+    scheduler.on_market_update(refresh_chains)  # before the instances' handlers
+    instances = [StrategyInstance(state.expiry, scheduler, state, rebalance_interval, reconcile_interval, on_done,
+                                  checkpoint).start()
+                 for state in states]
+    chain_manager = manager
+    try:
+        if resume:
+            resume_instances(instances, checkpoint)
+            running.difference_update(instance.name for instance in instances if instance.done)
+        if running:
+            start_market_updates(scheduler, poll_interval=poll_interval, poll_chain=False)
+            _run_scheduler(scheduler)
+    finally:
+        chain_manager = None
+    return {instance.state.name: instance.position for instance in instances}
+
+def parse_instance(spec):
+    """BASE:EXPIRY (e.g. ETH:25APR25) -> StrategyState"""
+    coin, _, expiry = spec.partition(":")
+    if not coin or not expiry:
+        raise argparse.ArgumentTypeError(f"Expected BASE:EXPIRY (e.g. BTC:25APR25), got {spec!r}")
+    return StrategyState(coin.upper(), expiry.upper())
+
 def main():
     parser = argparse.ArgumentParser(description='Run options trading strategy')
     parser.add_argument('--expiry', type=str, help='Expiry date in format DDMMMYY (e.g., 21APR25)', default="21APR25")
+    parser.add_argument('--instances', type=parse_instance, nargs='+', metavar='BASE:EXPIRY',
+                        help='Run one strategy instance per chain in this process (e.g. BTC:25APR25 ETH:25APR25), instead of --expiry')
+    parser.add_argument('--stream', action='store_true', help='Read tickers from the WebSocket stream instead of polling REST')
+    parser.add_argument('--stream-url', type=str, help='Override the ticker stream URL (e.g. a local replay server)')
+    parser.add_argument('--order-stream', action='store_true',
+                        help='Follow orders to their fills on the private order stream (default: poll order status)')
+    parser.add_argument('--order-stream-url', type=str, help='Override the private order stream URL')
+    parser.add_argument('--record-ticks', type=str, help='With --stream, also record ticker updates to a tick store in this directory')
+    parser.add_argument('--rebalance-interval', type=float, default=REBALANCE_INTERVAL, help='Seconds between delta checks')
+    parser.add_argument('--poll-interval', type=float, default=POLL_INTERVAL, help='Seconds between REST chain polls (without --stream)')
+    parser.add_argument('--journal-flush-interval', type=float, default=JOURNAL_FLUSH_INTERVAL,
+                        help='Seconds between trade journal writes')
+    parser.add_argument('--journal-flush-size', type=int, default=JOURNAL_FLUSH_SIZE,
+                        help='Write the trade journal once this many events are queued')
+    parser.add_argument('--metrics-file', type=str, help='Write metrics in Prometheus text format to this file every 15s')
+    parser.add_argument('--checkpoint', type=str, help=f'Position state checkpoint file (default: {DATA_DIR}/state.json)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Carry on managing the position saved in the checkpoint, instead of entering a new one')
     args = parser.parse_args()
     
     print("Starting strategy execution")
     
     # Use expiry from command line argument
     expiry = args.expiry
-    logging.info("Starting strategy execution for expiry: %s", args.expiry)
-    # Step 1: Enter position on IV spike
-    position = enter_delta_neutral_position(expiry)
-    # Step 2: Rebalance periodically until conversion condition met or until expiry
-    adjustments_count = 0
-    while True:
-        time.sleep(15 * 60)  # wait 15 minutes
-
-        adjusted = rebalance_delta(position, expiry)
-        if adjusted is not None:
-            if adjusted == {}:
-                logging.info("All positions have been exited. Stopping strategy execution.")
-                break
-            else:
-                position = adjusted
-                adjustments_count += 1
-        # Check if we should convert to iron butterfly
-        if adjustments_count > 0:  # after at least one adjustment, consider conversion
-            converted = convert_to_iron_butterfly(position, expiry)
-            if converted:
-                logging.info("Converted to Iron Butterfly structure. No further adjustments will be made.")
-                break
-       
+    context = AppContext(journal_flush_interval=args.journal_flush_interval, journal_flush_size=args.journal_flush_size,
+                         checkpoint_path=args.checkpoint)
+    context.start_logging()
+    init_app(context)
+    if args.instances:
+        logging.info("Starting strategy instances: %s", ", ".join(state.name for state in args.instances))
+    else:
+        logging.info("Starting strategy execution for expiry: %s", args.expiry)
+    if args.metrics_file:
+        metrics.add_sink(PrometheusFileSink(args.metrics_file))
+        for name in bybit_client.rate_limiter.limits:
+            metrics.gauge("api_rate_limit_queue_depth", lambda name=name: bybit_client.rate_limiter.queue_depth(name),
+                          endpoint_class=name)
+        metrics.gauge("api_cache_hits", lambda: bybit_client.cache.hits)
+        metrics.gauge("api_cache_misses", lambda: bybit_client.cache.misses)
+    try:
+        if args.order_stream:
+            context.start_order_stream(args.order_stream_url)
+        if args.stream:
+            chains = [(state.base_coin, state.expiry) for state in args.instances] if args.instances else None
+            start_market_feed(expiry, args.stream_url, args.record_ticks, chains)
+        if not args.resume:
+            open_positions = [name for name, record in context.checkpoint.load().items()
+                              if record["position"] and not record["finished"]]
+            if open_positions:
+                logging.warning(f"{context.checkpoint.path} has open positions for {', '.join(open_positions)}, "
+                                "starting afresh (use --resume to manage them)")
+        if args.instances:
+            run_instances(args.instances, args.rebalance_interval, args.poll_interval,
+                          checkpoint=context.checkpoint, resume=args.resume)
+        else:
+            run_strategy(expiry, args.rebalance_interval, args.poll_interval,
+                         checkpoint=context.checkpoint, resume=args.resume)
+    finally:
+        stop_market_feed()
+        context.close()
+
 
 if __name__ == "__main__":
     main()
- 
- 
- 
\ No newline at end of file
@@ -1,26 +1,52 @@
+import unittest
 import sys
 import os
 from datetime import datetime, timedelta
+from unittest import mock
 
 # Add the parent directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dotenv import load_dotenv
+import strategy
 from strategy import enter_delta_neutral_position
 
-def test_enter_delta_neutral_position():
-    # Get the next Friday's date
-    today = datetime.now()
-    days_until_friday = (4 - today.weekday()) % 7
-    next_friday = today + timedelta(days=days_until_friday)
-    expiry_date = next_friday.strftime("%d%b%y").upper()
-    
-    print(f"\nTesting enter_delta_neutral_position with expiry: {expiry_date}")
-    print("Starting to monitor for IV spike...")
-    
-    # Call the function
-    position_state = enter_delta_neutral_position(expiry="19APR25")
-    
-    print("\nFinal position state:")
-    print(position_state)
+# Live API test: needs the credentials from the environment or .env, and places real orders on a spike
+load_dotenv()
+LIVE_API = bool(os.getenv('API_KEY') and os.getenv('API_SECRET'))
+ENTRY_TIMEOUT = 300  # seconds to monitor for an IV spike before giving up
+
+class BoundedScheduler(strategy.Scheduler):
+    """Stops itself after ENTRY_TIMEOUT, so the test ends even if the IV never spikes"""
+
+    def run(self):
+        self.call_later(ENTRY_TIMEOUT, self.stop)
+        return super().run()
+
+@unittest.skipUnless(LIVE_API, "needs API_KEY and API_SECRET for the live API")
+class TestEnterDeltaNeutralPosition(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        strategy.init_app()
+
+    def test_enter_delta_neutral_position(self):
+        # Get the next Friday's date
+        today = datetime.now()
+        days_until_friday = (4 - today.weekday()) % 7
+        next_friday = today + timedelta(days=days_until_friday)
+        expiry_date = next_friday.strftime("%d%b%y").upper()
+
+        print(f"\nTesting enter_delta_neutral_position with expiry: {expiry_date}")
+        print("Starting to monitor for IV spike...")
+
+        # Call the function
+        with mock.patch.object(strategy, "Scheduler", BoundedScheduler):
+            position_state = enter_delta_neutral_position(expiry=expiry_date)
+        if position_state is None:
+            self.skipTest(f"no IV spike within {ENTRY_TIMEOUT}s")
+
+        print("\nFinal position state:")
+        print(position_state)
+        self.assertEqual(set(position_state), {"call", "put"})
 
 if __name__ == '__main__':
-    test_enter_delta_neutral_position() 
\ No newline at end of file
+    unittest.main()
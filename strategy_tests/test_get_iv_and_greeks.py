@@ -5,9 +5,20 @@ from datetime import datetime, timedelta
 
 # Add the parent directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dotenv import load_dotenv
+import strategy
 from strategy import get_iv_and_greeks
 
+# Live API test: needs the credentials from the environment or .env
+load_dotenv()
+LIVE_API = bool(os.getenv('API_KEY') and os.getenv('API_SECRET'))
+
+@unittest.skipUnless(LIVE_API, "needs API_KEY and API_SECRET for the live API")
 class TestGetIVAndGreeks(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        strategy.init_app()
+
     def test_get_iv_and_greeks(self):
         # Test with no specific expiry (should get all expiries)
         result = get_iv_and_greeks()
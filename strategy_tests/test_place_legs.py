@@ -0,0 +1,259 @@
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import helpers
+import strategy
+from ledger import PositionLedger
+from order_manager import OrderManager, OrderTimeout
+from strategy import LegFill, LegOrderError, close_position_legs, place_legs
+
+
+class FakeClient:
+    """Stands in for DMABybit.place_order; each order takes 50ms, symbols in `reject` fail."""
+
+    def __init__(self, reject=()):
+        self.reject = set(reject)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def place_order(self, body):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.05)
+        with self.lock:
+            self.in_flight -= 1
+        if body["symbol"] in self.reject:
+            return {"retCode": 10001, "retMsg": "rejected"}
+        return {"retCode": 0, "result": {"orderLinkId": body.get("orderLinkId", f"id-{body['symbol']}")}}
+
+
+class FillingClient(FakeClient):
+    """FakeClient whose accepted orders fill at fill_price, except IOC orders in `unfilled`, which expire.
+
+    The first order in a symbol of `partial` ({symbol: qty}) fills only that qty. Orders in `silent`
+    symbols are never found by get_order_details, nor is any order looked up under another symbol than
+    its own. get_open_positions lists `positions` ({symbol: /v5/position/list record}).
+    """
+
+    def __init__(self, fill_price, unfilled=(), silent=(), positions=None, partial=None):
+        super().__init__()
+        self.fill_price = fill_price
+        self.unfilled = set(unfilled)
+        self.silent = set(silent)
+        self.positions = positions or {}
+        self.partial = dict(partial or {})
+        self.orders = {}
+        self.filled = {}
+
+    def place_order(self, body):
+        self.orders[body["orderLinkId"]] = body
+        filled = 0.0 if body["symbol"] in self.unfilled else float(body["qty"])
+        self.filled[body["orderLinkId"]] = self.partial.pop(body["symbol"], filled)
+        return super().place_order(body)
+
+    def get_order_details(self, order_link_id, symbol=None):
+        body = self.orders[order_link_id]
+        if body["symbol"] in self.silent or symbol not in (None, body["symbol"]):
+            return {"retCode": 0, "result": {"list": []}}
+        filled = self.filled[order_link_id]
+        status = "Cancelled" if not filled else "Filled" if filled == float(body["qty"]) else "PartiallyFilledCanceled"
+        return {"retCode": 0, "result": {"list": [{
+            "orderLinkId": order_link_id, "symbol": body["symbol"], "side": body["side"],
+            "orderStatus": status, "qty": body["qty"], "cumExecQty": str(filled),
+            "avgPrice": str(self.fill_price if filled else 0), "cumExecValue": str(self.fill_price * filled),
+            "cumExecFee": "0.02" if filled else "0"}]}}
+
+    def get_open_positions(self, symbol=None, cursor=None, limit=None):
+        return {"retCode": 0, "result": {"list": list(self.positions.values())}}
+
+
+class TestPlaceLegs(unittest.TestCase):
+    def test_legs_are_submitted_concurrently(self):
+        client = FakeClient()
+        with mock.patch.object(strategy, "bybit_client", client):
+            order_ids = place_legs({
+                "call": {"side": "Sell", "symbol": "C1", "qty": 0.01},
+                "put": {"side": "Sell", "symbol": "P1", "qty": 0.01},
+            })
+        self.assertEqual(order_ids, {"call": LegFill("id-C1", 0.01), "put": LegFill("id-P1", 0.01)})
+        self.assertEqual(client.max_in_flight, 2)
+
+    def test_failed_leg_is_reported_with_filled_legs(self):
+        client = FakeClient(reject={"P1"})
+        with mock.patch.object(strategy, "bybit_client", client):
+            with self.assertRaises(LegOrderError) as ctx:
+                place_legs({
+                    "call": {"side": "Sell", "symbol": "C1", "qty": 0.01},
+                    "put": {"side": "Sell", "symbol": "P1", "qty": 0.01},
+                })
+        self.assertEqual(ctx.exception.filled, {"call": LegFill("id-C1", 0.01)})
+        self.assertEqual(list(ctx.exception.failed), ["put"])
+
+    def test_partial_exit_keeps_only_open_legs(self):
+        client = FakeClient(reject={"P1"})
+        position_state = {
+            "call": {"order_id": "sell-C1", "symbol": "C1", "entry_price": 10, "contracts": 1, "qty": 0.01},
+            "put": {"order_id": "sell-P1", "symbol": "P1", "entry_price": 10, "contracts": 1, "qty": 0.01},
+        }
+        ledger = PositionLedger()
+        ledger.record_fill("C1", "Sell", 0.01, 160.0)
+        ledger.record_fill("P1", "Sell", 0.01, 150.0)
+        quotes = {"C1": {"bid": 5.0, "ask": 10.0}, "P1": {"bid": 5.0, "ask": 10.0}}
+        with mock.patch.object(strategy, "bybit_client", client), \
+                mock.patch.object(strategy, "ledger", ledger), \
+                mock.patch.object(strategy, "log_trade"), \
+                mock.patch.object(strategy, "total_realized_pnl", 0.0):
+            with self.assertRaises(LegOrderError) as ctx:
+                close_position_legs(position_state, quotes)
+            # Call bought back at the ask: (160 - 10) * 0.01
+            self.assertAlmostEqual(strategy.total_realized_pnl, 1.5)
+        self.assertEqual(ledger.open_symbols(), ["P1"])
+        self.assertEqual(list(position_state), ["put"])
+        self.assertIs(ctx.exception.position_state, position_state)
+
+    def test_entry_without_initial_margin_is_flattened(self):
+        ledger = PositionLedger()
+        info = {"delta": 0.1, "bid": 150.0, "ask": 160.0}
+        with mock.patch.object(strategy, "bybit_client", FakeClient()), \
+                mock.patch.object(strategy, "ledger", ledger), \
+                mock.patch.object(strategy, "log_trade"), \
+                mock.patch.object(strategy, "total_realized_pnl", 0.0), \
+                mock.patch.object(strategy, "intital_margin_prices", 0.0), \
+                mock.patch.object(strategy, "reconcile_ledger", side_effect=Exception("snapshot failed")) as reconcile, \
+                mock.patch.object(strategy.time, "sleep"):
+            with self.assertRaises(LegOrderError) as ctx:
+                strategy.open_short_legs("C1", info, "P1", info)
+            self.assertEqual(reconcile.call_count, 3)
+            # Never armed with a zero band: no exit check runs until there is a margin
+            self.assertFalse(strategy.check_pnl_and_exit(ctx.exception.position_state, {}))
+        self.assertEqual(sorted(ctx.exception.position_state), ["call", "put"])
+        self.assertEqual(sorted(ledger.open_symbols()), ["C1", "P1"])
+
+    def test_lone_wing_is_booked_when_the_other_fails(self):
+        ledger = PositionLedger()
+        chain = mock.Mock()
+        chain.next_strike.side_effect = lambda strike, is_call, above: "WC" if is_call else "WP"
+        chain.get.side_effect = lambda symbol, default: {"bid": 5.0, "ask": 6.0}
+        position_state = {
+            "call": {"order_id": "sell-C1", "symbol": "BTC-25APR25-85000-C-USDT", "entry_price": 10, "contracts": 1, "qty": 0.01},
+            "put": {"order_id": "sell-P1", "symbol": "BTC-25APR25-85000-P-USDT", "entry_price": 10, "contracts": 1, "qty": 0.01},
+        }
+        with mock.patch.object(strategy, "bybit_client", FakeClient(reject={"WP"})), \
+                mock.patch.object(strategy, "ledger", ledger), \
+                mock.patch.object(strategy, "log_trade") as log_trade, \
+                mock.patch.object(strategy, "get_option_chain", return_value=chain), \
+                mock.patch.object(strategy, "total_realized_pnl", 0.0):
+            with self.assertRaises(LegOrderError) as ctx:
+                strategy.convert_to_iron_butterfly(position_state)
+        self.assertEqual(ctx.exception.filled, {"call_wing": LegFill("id-WC", 0.01)})
+        self.assertEqual(ledger.open_symbols(), ["WC"])
+        log_trade.assert_called_once_with("id-WC", "WC", "Buy", 0.01, 6.0, realized_pnl=0.0)
+
+
+class TestTrackedOrders(unittest.TestCase):
+    def setUp(self):
+        self.position_state = {
+            "call": {"order_id": "sell-C1", "symbol": "C1", "entry_price": 10, "contracts": 1, "qty": 0.01},
+            "put": {"order_id": "sell-P1", "symbol": "P1", "entry_price": 10, "contracts": 1, "qty": 0.01},
+        }
+        self.ledger = PositionLedger()
+        self.ledger.record_fill("C1", "Sell", 0.01, 160.0)
+        self.ledger.record_fill("P1", "Sell", 0.01, 150.0)
+        self.quotes = {"C1": {"bid": 5.0, "ask": 10.0}, "P1": {"bid": 5.0, "ask": 10.0}}
+
+    def close_legs(self, client):
+        return self.run_tracked(client, close_position_legs, self.position_state, self.quotes)
+
+    def run_tracked(self, client, fn, *args):
+        """fn(*args) with the client's orders followed by an OrderManager. Returns the realized PnL booked."""
+        manager = OrderManager(client, poll_base=0.01, timeout=0.2)
+        self.pending_orders = set()
+        try:
+            with mock.patch.object(strategy, "bybit_client", client), \
+                    mock.patch.object(helpers, "bybit", client), \
+                    mock.patch.object(strategy, "order_manager", manager), \
+                    mock.patch.object(strategy, "ledger", self.ledger), \
+                    mock.patch.object(strategy, "pending_orders", self.pending_orders), \
+                    mock.patch.object(strategy, "log_trade"), \
+                    mock.patch.object(strategy, "fetch_initial_margin", return_value=100.0), \
+                    mock.patch.object(strategy, "intital_margin_prices", 0.0), \
+                    mock.patch.object(strategy, "total_realized_pnl", 0.0):
+                try:
+                    fn(*args)
+                finally:
+                    realized = strategy.total_realized_pnl
+        finally:
+            manager.close()
+        return realized
+
+    def test_fills_are_booked_at_the_exchange_fill(self):
+        realized = self.close_legs(FillingClient(fill_price=12.0))
+        # Bought back at the 12.0 fill, not the 10.0 ask: (160 - 12 + 150 - 12) * 0.01 less 0.02 fee per order
+        self.assertAlmostEqual(realized, 2.86 - 0.04)
+        self.assertEqual(self.ledger.open_symbols(), [])
+        self.assertEqual(self.position_state, {})
+
+    def test_expired_ioc_order_is_a_failed_leg(self):
+        client = FillingClient(fill_price=12.0, unfilled={"P1"})
+        with self.assertRaises(LegOrderError) as ctx:
+            self.close_legs(client)
+        self.assertEqual(list(ctx.exception.failed), ["put"])
+        self.assertIn("not filled: Cancelled", str(ctx.exception.failed["put"]))
+        self.assertEqual(self.ledger.open_symbols(), ["P1"])
+        self.assertEqual(list(self.position_state), ["put"])
+
+    def test_timed_out_order_counts_as_filled_when_the_position_moved(self):
+        # The put's status never comes back, but the account no longer holds it
+        realized = self.close_legs(FillingClient(fill_price=12.0, silent={"P1"}))
+        # The put is booked at the 10.0 ask, without a fee from the exchange
+        self.assertAlmostEqual(realized, (160 - 12 + 150 - 10) * 0.01 - 0.02, places=2)
+        self.assertEqual(self.ledger.open_symbols(), [])
+        self.assertEqual(self.position_state, {})
+        self.assertEqual(self.pending_orders, set())
+
+    def test_timed_out_order_is_left_to_reconcile_when_the_position_did_not_move(self):
+        client = FillingClient(fill_price=12.0, silent={"P1"},
+                               positions={"P1": {"symbol": "P1", "side": "Sell", "size": "0.01", "avgPrice": "150"}})
+        with self.assertRaises(LegOrderError) as ctx:
+            self.close_legs(client)
+        self.assertIsInstance(ctx.exception.failed["put"], OrderTimeout)
+        self.assertEqual(self.ledger.open_symbols(), ["P1"])
+        self.assertEqual(self.pending_orders, {"P1"})
+
+    def test_partly_filled_entry_is_closed_without_overbuying(self):
+        self.ledger = PositionLedger()
+        client = FillingClient(fill_price=12.0, partial={"C1": 0.005})
+        info = {"delta": 0.1, "bid": 150.0, "ask": 160.0}
+        entered = []
+        self.run_tracked(client, lambda: entered.append(strategy.open_short_legs("C1", info, "P1", info)))
+        self.position_state = entered[0]
+        self.assertEqual(self.position_state["call"]["qty"], 0.005)
+        self.assertEqual(self.position_state["put"]["qty"], 0.01)
+        self.assertEqual(self.ledger.open_positions(), {"C1": (-0.005, 12.0), "P1": (-0.01, 12.0)})
+
+        self.close_legs(client)
+        self.assertEqual(self.ledger.open_symbols(), [])
+        self.assertEqual(self.position_state, {})
+
+    def test_timed_out_order_books_only_what_the_position_shows(self):
+        # Half the put was bought back: the other half stays open, for the caller to flatten
+        client = FillingClient(fill_price=12.0, silent={"P1"},
+                               positions={"P1": {"symbol": "P1", "side": "Sell", "size": "0.005", "avgPrice": "150"}})
+        with self.assertRaises(LegOrderError) as ctx:
+            self.close_legs(client)
+        self.assertEqual(ctx.exception.filled["put"].qty, 0.005)
+        self.assertEqual(list(ctx.exception.failed), ["put"])
+        self.assertEqual(self.ledger.open_positions(), {"P1": (-0.005, 150.0)})
+        self.assertEqual(self.position_state["put"]["qty"], 0.005)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,184 @@
+"""
+Parameter sweep of the delta-neutral strategy over recorded market-data days.
+
+Every combination of strategy thresholds (target delta, IV spike ratio,
+exit fraction of initial margin, rebalance band) is backtested on every day
+in a process pool, and the results are aggregated into one table.
+
+Days come from a tick store (tickstore.py), or from recordings that are
+parsed once, in the parent, into tick records. Workers memory-map the day
+files, so market data is never re-parsed per task and its pages are shared
+between the processes through the OS page cache.
+
+    python sweep.py --tick-store ticks --target-delta 0.1 0.15 --iv-spike-ratio 1.2 1.3 \\
+        --wait-for-iv-spike --exit-margin-fraction 0.05 0.1 --rebalance-band 0.05 0.1 --workers 8 --out sweep.csv
+    python sweep.py --data day1.jsonl day2.jsonl --target-delta 0.1 0.15
+"""
+
+import argparse
+import csv
+import itertools
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+import strategy
+from backtest import RecordEvents, TouchFillModel, encode_events, load_events, run_backtest
+from instruments import parse_symbol
+from tickstore import TickStore, map_records
+
+RESULT_COLUMNS = ("target_delta", "iv_spike_ratio", "wait_for_iv_spike", "exit_margin_fraction", "rebalance_band",
+                  "days", "total_pnl", "mean_pnl", "worst_day_pnl", "max_drawdown", "trades", "fees")
+
+
+class Day(NamedTuple):
+    name: str
+    records_path: str  # tick store day file (or .npy) of tickstore.TICK_DTYPE records
+    symbols: list
+    expiry: str
+
+
+def _nearest_expiry(records, symbols):
+    return parse_symbol(symbols[records["symbol"][np.argmin(records["expiry"])]]).expiry_code
+
+
+def pack_day(name, events, records_path, expiry=None):
+    """Save one day's replay events as tick records. Without an expiry, the day trades its nearest one."""
+    records, symbols = encode_events(events)
+    records.tofile(records_path)
+    return Day(name, records_path, symbols, expiry or _nearest_expiry(records, symbols))
+
+
+def store_days(root, days=None, expiry=None):
+    """Days of a tick store (default: all of them) as [Day]"""
+    store = TickStore(root)
+    return [Day(day, store.day_path(day), store.symbols, expiry or _nearest_expiry(store.read(day), store.symbols))
+            for day in (days or store.days())]
+
+
+def prepare_days(paths, cache_dir, expiry=None):
+    """Parse each recorded day once and save it as packed records in cache_dir. Returns [Day]."""
+    return [pack_day(os.path.basename(path), load_events([path]), os.path.join(cache_dir, f"day{i}.ticks"), expiry)
+            for i, path in enumerate(paths)]
+
+
+def param_grid(target_delta=(0.1,), iv_spike_ratio=(1.3,), exit_margin_fraction=(0.1,), rebalance_band=(0.1,),
+               wait_for_iv_spike=False):
+    """Every combination of the given values, as strategy.StrategyParams"""
+    return [strategy.StrategyParams(delta, spike, wait_for_iv_spike, exit_fraction, band)
+            for delta, spike, exit_fraction, band
+            in itertools.product(target_delta, iv_spike_ratio, exit_margin_fraction, rebalance_band)]
+
+
+# Per-worker cache of memory-mapped days
+_days = {}
+
+
+def _init_worker():
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+def _day_events(day):
+    events = _days.get(day.records_path)
+    if events is None:
+        events = _days[day.records_path] = RecordEvents(map_records(day.records_path), day.symbols)
+    return events
+
+
+def run_task(task):
+    """Backtest one (day, params) pair. Returns (params, day name, BacktestResult without trades)."""
+    day, params, rebalance_interval, reconcile_interval, slippage = task
+    result = run_backtest(_day_events(day), day.expiry, rebalance_interval, reconcile_interval,
+                          TouchFillModel(slippage), params)
+    return params, day.name, result._replace(trades=len(result.trades), open_position=bool(result.open_position))
+
+
+def sweep(days, grid, workers=None, rebalance_interval=strategy.REBALANCE_INTERVAL,
+          reconcile_interval=strategy.RECONCILE_INTERVAL, slippage=0.0):
+    """Backtest every params in grid on every day. Returns [(params, day name, result)].
+
+    workers=1 runs in this process; otherwise a pool of that many processes
+    (default: one per CPU) is used. Tasks are ordered by day so each worker
+    keeps reusing the days it has mapped.
+    """
+    tasks = [(day, params, rebalance_interval, reconcile_interval, slippage) for day in days for params in grid]
+    if workers == 1:
+        _init_worker()
+        return [run_task(task) for task in tasks]
+    workers = workers or os.cpu_count()
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with multiprocessing.get_context("spawn").Pool(workers, initializer=_init_worker) as pool:
+        return list(pool.imap_unordered(run_task, tasks, chunksize))
+
+
+def summarize(results):
+    """One row per params: PnL over all days, worst day and drawdown, trade count and fees"""
+    by_params = {}
+    for params, _, result in results:
+        by_params.setdefault(params, []).append(result)
+    rows = []
+    for params, day_results in by_params.items():
+        pnl = [r.total_pnl for r in day_results]
+        rows.append(dict(params._asdict(), days=len(day_results), total_pnl=sum(pnl), mean_pnl=sum(pnl) / len(pnl),
+                         worst_day_pnl=min(pnl), max_drawdown=max(r.max_drawdown for r in day_results),
+                         trades=sum(r.trades for r in day_results), fees=sum(r.fees for r in day_results)))
+    rows.sort(key=lambda row: row["total_pnl"], reverse=True)
+    return rows
+
+
+def print_table(rows):
+    widths = {column: max(len(column), 10) for column in RESULT_COLUMNS}
+    print("  ".join(f"{column:>{widths[column]}}" for column in RESULT_COLUMNS))
+    for row in rows:
+        print("  ".join(f"{row[c]:>{widths[c]}.4f}" if isinstance(row[c], float) else f"{row[c]!s:>{widths[c]}}"
+                        for c in RESULT_COLUMNS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sweep strategy parameters over recorded market-data days')
+    parser.add_argument('--data', nargs='+', help='One recording per day (.jsonl stream or REST dump)')
+    parser.add_argument('--tick-store', type=str, help='Sweep over the days of this tick store instead')
+    parser.add_argument('--days', nargs='+', help='Tick store days (YYYYMMDD), default: all')
+    parser.add_argument('--expiry', type=str, help='Expiry to trade on every day (default: nearest in each day)')
+    parser.add_argument('--target-delta', type=float, nargs='+', default=[0.1])
+    parser.add_argument('--iv-spike-ratio', type=float, nargs='+', default=[1.3])
+    parser.add_argument('--wait-for-iv-spike', action='store_true', help='Enter only on an IV spike')
+    parser.add_argument('--exit-margin-fraction', type=float, nargs='+', default=[0.1])
+    parser.add_argument('--rebalance-band', type=float, nargs='+', default=[0.1])
+    parser.add_argument('--rebalance-interval', type=float, default=strategy.REBALANCE_INTERVAL)
+    parser.add_argument('--reconcile-interval', type=float, default=strategy.RECONCILE_INTERVAL)
+    parser.add_argument('--slippage', type=float, default=0.0, help='Fill price slippage as a fraction of the touch')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--out', type=str, help='Also write the table to this CSV file')
+    args = parser.parse_args()
+    if not args.data and not args.tick_store:
+        parser.error("one of --data or --tick-store is required")
+    logging.getLogger().setLevel(logging.WARNING)
+
+    grid = param_grid(args.target_delta, args.iv_spike_ratio, args.exit_margin_fraction, args.rebalance_band,
+                      args.wait_for_iv_spike)
+    with tempfile.TemporaryDirectory(prefix="sweep-") as cache_dir:
+        started = time.perf_counter()
+        if args.tick_store:
+            days = store_days(args.tick_store, args.days, args.expiry)
+        else:
+            days = prepare_days(args.data, cache_dir, args.expiry)
+        results = sweep(days, grid, args.workers, args.rebalance_interval, args.reconcile_interval, args.slippage)
+        elapsed = time.perf_counter() - started
+    rows = summarize(results)
+    print_table(rows)
+    print(f"{len(results)} backtests ({len(grid)} parameter sets x {len(days)} days) in {elapsed:.2f}s")
+    if args.out:
+        with open(args.out, mode='w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import helpers
+import strategy
+from app_context import AppContext
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestAppContext(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.context = AppContext(logs_dir=os.path.join(self.tmp.name, "logs"),
+                                  data_dir=os.path.join(self.tmp.name, "trades_data"))
+
+    def tearDown(self):
+        self.context.close()
+        self.tmp.cleanup()
+
+    def test_resources_are_created_on_first_use(self):
+        self.assertEqual(os.listdir(self.tmp.name), [])
+        self.context.journal.record("decision", action="exit")
+        self.assertIs(self.context.journal, self.context.journal)
+        self.assertEqual(os.listdir(self.tmp.name), ["trades_data"])
+        self.context.journal.flush(5)
+        self.assertEqual(os.listdir(self.context.data_dir), [f"journal_{self.context.run_id}.jsonl"])
+
+    def test_logging_to_file(self):
+        root = logging.getLogger()
+        saved = root.handlers[:]
+        root.handlers = []
+        try:
+            listener = self.context.start_logging()
+            self.assertIs(self.context.start_logging(), listener)
+            logging.warning("Ledger corrected from exchange positions")
+            self.context.close()
+            self.context.close()
+        finally:
+            root.handlers = saved
+        for handler in listener.handlers:
+            handler.close()
+        with open(os.path.join(self.context.logs_dir, f"strategy_{self.context.run_id}.log")) as f:
+            self.assertIn("WARNING - Ledger corrected from exchange positions", f.read())
+
+    def test_client_shares_the_helpers_connection_pool(self):
+        client = self.context.client
+        self.assertIs(client.session, helpers.bybit.session)
+        self.assertIs(client.rate_limiter, helpers.bybit.rate_limiter)
+        self.assertIs(self.context.client, client)
+
+    def test_init_app_installs_client_journal_and_order_manager(self):
+        saved = strategy.app, strategy.bybit_client, strategy.journal, strategy.order_manager
+        try:
+            self.assertIs(strategy.init_app(self.context), self.context)
+            self.assertIs(strategy.bybit_client, self.context.client)
+            self.assertIs(strategy.journal, self.context.journal)
+            self.assertIs(strategy.order_manager, self.context.order_manager)
+            self.assertIs(strategy.order_manager.client, self.context.client)
+        finally:
+            strategy.app, strategy.bybit_client, strategy.journal, strategy.order_manager = saved
+
+
+class TestImportStrategy(unittest.TestCase):
+    def test_import_has_no_side_effects(self):
+        with tempfile.TemporaryDirectory() as cwd:
+            code = ("import sys, strategy; "
+                    "print(' '.join(m for m in ('requests', 'websockets', 'dotenv', 'bybit_apis') if m in sys.modules))")
+            result = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=dict(os.environ, PYTHONPATH=REPO_DIR),
+                                    capture_output=True, text=True, check=True)
+            self.assertEqual(os.listdir(cwd), [])
+        self.assertEqual(result.stdout.strip(), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
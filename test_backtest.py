@@ -0,0 +1,185 @@
+import json
+import os
+import tempfile
+import unittest
+
+import helpers
+import strategy
+from backtest import (DEFAULT_DATA as STREAM_SAMPLE, BacktestScheduler, ReplayFeed, SimulatedBybit,
+                      TouchFillModel, _replaced, load_events, run_backtest)
+from checkpoint import StateCheckpoint
+from journal import TradeJournal
+from ledger import PositionLedger
+from recordings import recorded_files
+
+
+class TestLoadEvents(unittest.TestCase):
+    def test_stream_and_rest_recordings_merge_in_time_order(self):
+        events = load_events([STREAM_SAMPLE, recorded_files()[0]])
+        kinds = {kind for _, kind, _ in events}
+        self.assertEqual(kinds, {"message", "tickers"})
+        times = [t for t, _, _ in events]
+        self.assertEqual(times, sorted(times))
+
+
+class TestSimulatedBybit(unittest.TestCase):
+    def setUp(self):
+        self.feed = ReplayFeed(load_events([STREAM_SAMPLE]))
+        self.feed.replay_until(float("inf"))
+        self.client = SimulatedBybit(self.feed.store, lambda: 1744984255.0)
+        self.symbol = "BTC-25APR25-90000-C-USDT"
+        self.ticker = self.feed.store.ticker(self.symbol)
+
+    def test_market_orders_fill_at_the_touch(self):
+        sell = self.client.place_order({"symbol": self.symbol, "side": "Sell", "qty": "0.01", "orderType": "Market"})
+        self.assertEqual(sell["retCode"], 0)
+        order = self.client.get_order_details(sell["result"]["orderLinkId"])["result"]["list"][0]
+        self.assertEqual(float(order["avgPrice"]), float(self.ticker["bid1Price"]))
+        positions = self.client.get_open_positions()["result"]["list"]
+        self.assertEqual([(p["symbol"], p["side"], p["size"]) for p in positions], [(self.symbol, "Sell", "0.01")])
+        self.assertGreater(float(positions[0]["positionIM"]), 0)
+
+        self.client.place_order({"symbol": self.symbol, "side": "Buy", "qty": "0.01"})
+        self.assertEqual(self.client.get_open_positions()["result"]["list"], [])
+
+    def test_unfillable_orders_are_rejected(self):
+        self.assertNotEqual(self.client.place_order({"symbol": "BTC-25APR25-1-C-USDT", "side": "Buy", "qty": "1"})["retCode"], 0)
+        bid = float(self.ticker["bid1Price"])
+        limit_above_bid = {"symbol": self.symbol, "side": "Sell", "qty": "0.01", "price": str(bid + 100)}
+        self.assertNotEqual(self.client.place_order(limit_above_bid)["retCode"], 0)
+
+    def test_slippage_moves_fills_against_the_order(self):
+        model = TouchFillModel(slippage=0.01)
+        self.assertAlmostEqual(model.fill_price("Buy", self.ticker), float(self.ticker["ask1Price"]) * 1.01)
+        self.assertAlmostEqual(model.fill_price("Sell", self.ticker), float(self.ticker["bid1Price"]) * 0.99)
+
+
+class TestBacktest(unittest.TestCase):
+    def test_scheduler_runs_timers_on_simulated_time(self):
+        events = load_events([STREAM_SAMPLE])
+        scheduler = BacktestScheduler(ReplayFeed(events))
+        start = scheduler.now
+        ticks = []
+        scheduler.call_every(0.5, lambda: ticks.append(scheduler.now - start))
+        scheduler.run()
+        self.assertEqual(len(ticks), 6)
+        self.assertAlmostEqual(ticks[-1], 3.0)
+
+    def test_strategy_runs_offline_and_restores_its_globals(self):
+        client, bybit = strategy.bybit_client, helpers.bybit
+        result = run_backtest(load_events([STREAM_SAMPLE]), "25APR25", rebalance_interval=1.0, reconcile_interval=1.0)
+        self.assertEqual(result.events, 104)
+        self.assertEqual(sorted(result.open_position), ["call", "put"])
+        self.assertEqual([trade[3] for trade in result.trades], ["Sell", "Sell"])
+        self.assertLess(result.realized_pnl, 0)  # entry fees
+        self.assertIs(strategy.bybit_client, client)
+        self.assertIs(helpers.bybit, bybit)
+
+    def test_underlying_ticks_trigger_a_rebalance_between_timer_checks(self):
+        result = run_backtest(load_events([STREAM_SAMPLE]), "25APR25", rebalance_interval=3600,
+                              reconcile_interval=3600, params=strategy.StrategyParams(rebalance_band=0.01))
+        # Entry, then one rebalance of the call (the cooldown stops any repeat within the replay)
+        self.assertEqual([trade[3] for trade in result.trades], ["Sell", "Sell", "Buy", "Sell"])
+        self.assertEqual(result.trades[2][2], result.trades[0][2])
+        self.assertEqual(sorted(result.open_position), ["call", "put"])
+
+    def test_instances_share_one_scheduler_and_feed_with_their_own_state(self):
+        btc_events = load_events([STREAM_SAMPLE])
+        # The same market under another base coin, one millisecond later
+        eth_events = [(t + 0.001, kind, json.loads(json.dumps(payload).replace("BTC-", "ETH-")))
+                      for t, kind, payload in btc_events]
+        feed = ReplayFeed(sorted(btc_events + eth_events, key=lambda event: event[0]))
+        scheduler = BacktestScheduler(feed)
+        client = SimulatedBybit(feed.store, scheduler.clock)
+        states = [strategy.StrategyState("BTC", "25APR25"), strategy.StrategyState("ETH", "25APR25")]
+        ledger = strategy.ledger
+        with _replaced(helpers, bybit=client), \
+                _replaced(strategy, bybit_client=client, market_feed=feed, clock=scheduler.clock,
+                          journal=TradeJournal(None), log_trade=lambda *args, **kwargs: None):
+            positions = strategy.run_instances(states, rebalance_interval=1.0, reconcile_interval=1.0,
+                                               scheduler=scheduler)
+        self.assertEqual(sorted(positions), ["BTC-25APR25", "ETH-25APR25"])
+        for state in states:
+            self.assertEqual(sorted(positions[state.name]), ["call", "put"])
+            symbols = state.ledger.open_symbols()
+            self.assertEqual(len(symbols), 2)
+            self.assertTrue(all(symbol.startswith(state.base_coin + "-") for symbol in symbols))
+            self.assertLess(state.total_realized_pnl, 0)  # entry fees
+            self.assertGreater(state.intital_margin_prices, 0)
+        self.assertEqual(len(client.book.open_symbols()), 4)
+        self.assertIs(strategy.ledger, ledger)
+        self.assertEqual(strategy.base_coin, "BTC")
+        with self.assertRaises(ValueError):
+            strategy.run_instances([strategy.StrategyState("BTC", "25APR25")] * 2)
+
+    def run_on_account(self, states, book, checkpoint, resume=False):
+        """run_instances over the sample stream against an account holding book's positions"""
+        feed = ReplayFeed(load_events([STREAM_SAMPLE]))
+        if resume:
+            feed.replay_until(feed.next_time() + 1.0)  # the first pass over the chain: a live restart seeds it first
+        scheduler = BacktestScheduler(feed)
+        client = SimulatedBybit(feed.store, scheduler.clock)
+        client.book = book
+        with _replaced(helpers, bybit=client), \
+                _replaced(strategy, bybit_client=client, market_feed=feed, clock=scheduler.clock,
+                          journal=TradeJournal(None), log_trade=lambda *args, **kwargs: None):
+            return strategy.run_instances(states, rebalance_interval=1.0, reconcile_interval=1.0, scheduler=scheduler,
+                                          checkpoint=checkpoint, resume=resume)
+
+    def test_restart_resumes_the_checkpointed_position(self):
+        book = PositionLedger()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "state.json")
+            crashed = strategy.StrategyState("BTC", "25APR25")
+            positions = self.run_on_account([crashed], book, StateCheckpoint(path))
+            fills = len(book.fills)
+
+            # A new process: fresh state, the account as the crashed run left it
+            restarted = strategy.StrategyState("BTC", "25APR25")
+            resumed = self.run_on_account([restarted], book, StateCheckpoint(path), resume=True)
+            self.assertEqual(resumed, positions)
+            self.assertEqual(len(book.fills), fills)  # managed the same legs instead of entering again
+            self.assertEqual(restarted.total_realized_pnl, crashed.total_realized_pnl)
+            self.assertEqual(restarted.intital_margin_prices, crashed.intital_margin_prices)
+            self.assertEqual(restarted.ledger.open_positions(), crashed.ledger.open_positions())
+
+            # The call was bought back while the strategy was down: the put is flattened and the instance finishes
+            call = positions["BTC-25APR25"]["call"]["symbol"]
+            book.record_fill(call, "Buy", 0.01, book.position(call).avg_price)
+            flattened = strategy.StrategyState("BTC", "25APR25")
+            self.assertEqual(self.run_on_account([flattened], book, StateCheckpoint(path), resume=True),
+                             {"BTC-25APR25": {}})
+            self.assertEqual(book.open_symbols(), [])
+            self.assertTrue(StateCheckpoint(path).load()["BTC-25APR25"]["finished"])
+
+    def test_restart_after_a_crash_mid_entry_flattens_the_unrecorded_legs(self):
+        class Crash(BaseException):
+            """The process dying: nothing after it runs, so the checkpoint is not written again"""
+
+        class DyingCheckpoint(StateCheckpoint):
+            def save(self, name, record):
+                written = super().save(name, record)
+                if record["ledger"]:  # right after the first fill is booked
+                    raise Crash()
+                return written
+
+        book = PositionLedger()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "state.json")
+            with self.assertRaises(Crash):
+                self.run_on_account([strategy.StrategyState("BTC", "25APR25")], book, DyingCheckpoint(path))
+            record = StateCheckpoint(path).load()["BTC-25APR25"]
+            self.assertIsNone(record["position"])
+            self.assertEqual(len(record["ledger"]), 1)  # the call was booked, the put was not
+            self.assertEqual(len(record["pending_orders"]), 1)
+            self.assertEqual(len(book.open_symbols()), 2)
+
+            restarted = strategy.StrategyState("BTC", "25APR25")
+            self.assertEqual(self.run_on_account([restarted], book, StateCheckpoint(path), resume=True),
+                             {"BTC-25APR25": {}})
+            self.assertEqual(book.open_symbols(), [])
+            self.assertTrue(StateCheckpoint(path).load()["BTC-25APR25"]["finished"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+
+import numpy as np
+
+from chain_manager import ChainManager
+from decoding import ticker_columns
+from market_data_feed import OptionChainStore
+from recordings import load_recorded_tickers
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeClient:
+    """Serves the recorded BTC chain (unfiltered) and counts ticker requests"""
+
+    def __init__(self, tickers):
+        self.tickers = tickers
+        self.requests = []
+
+    def get_tickers(self, category=None, base_coin=None, exp_date=None, typed=False):
+        self.requests.append((base_coin, exp_date))
+        tickers = [t for t in self.tickers if t["symbol"].startswith(base_coin + "-")]
+        return {"retCode": 0, "result": {"list": ticker_columns(tickers) if typed else tickers}}
+
+
+class TestChainManager(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tickers, _ = load_recorded_tickers()
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.client = FakeClient(self.tickers)
+        self.chains = ChainManager(client=self.client, base_coins=["BTC"], clock=self.clock)
+
+    def test_one_fetch_serves_every_expiry(self):
+        self.chains.refresh()
+        near, far = self.chains.chain("BTC", "25APR25"), self.chains.chain("BTC", "27JUN25")
+        self.assertEqual(self.client.requests, [("BTC", None)])
+        self.assertEqual({symbol.split("-")[1] for symbol in near.symbols}, {"25APR25"})
+        self.assertEqual(len(near) + len(far), sum(t["symbol"].split("-")[1] in ("25APR25", "27JUN25")
+                                                   for t in self.tickers))
+        # Views of one partitioned chain, not copies
+        self.assertIsNotNone(near.delta.base)
+        self.assertIs(near.delta.base, far.delta.base)
+        self.assertEqual(near.nearest_delta(0.1, is_call=True), near.nearest_delta(0.1, is_call=True, expiry="25APR25"))
+        self.assertEqual(len(self.chains.chain("BTC", "1JAN30")), 0)
+        self.assertEqual(len(self.client.requests), 1)
+
+    def test_stale_chains_are_refetched(self):
+        self.chains.chain("BTC", "25APR25")
+        self.clock.now = 0.5
+        self.chains.chain("BTC", "25APR25")
+        self.assertEqual(len(self.client.requests), 1)
+        self.clock.now = 2.0
+        self.chains.chain("BTC", "27JUN25")
+        self.assertEqual(len(self.client.requests), 2)
+
+    def test_reads_from_a_store(self):
+        store = OptionChainStore()
+        store.load_tickers(self.tickers)
+        store.load_tickers([dict(t, symbol=t["symbol"].replace("BTC-", "ETH-")) for t in self.tickers[:20]])
+        chains = ChainManager(store=store, base_coins=["BTC", "ETH"], clock=self.clock)
+        chains.refresh()
+        eth = chains.chain("ETH", self.tickers[0]["symbol"].split("-")[1])
+        self.assertTrue(len(eth) > 0 and all(symbol.startswith("ETH-") for symbol in eth.symbols))
+        self.assertTrue(np.all(eth.base_coin == "ETH"))
+        self.assertEqual(chains.fetches, 2)
+
+    def test_disconnected_store_falls_back_to_the_client(self):
+        store = OptionChainStore()
+        store.load_tickers(self.tickers)
+        live = [True]
+        chains = ChainManager(client=self.client, store=store, clock=self.clock, live=lambda: live[0])
+        chains.refresh()
+        self.assertEqual(self.client.requests, [])
+        live[0] = False
+        chains.refresh()
+        self.assertEqual(self.client.requests, [("BTC", None)])
+
+    def test_failed_fetch_raises(self):
+        self.client.get_tickers = lambda **kwargs: {"retCode": 10006, "retMsg": "Too many visits"}
+        with self.assertRaises(Exception):
+            self.chains.chain("BTC", "25APR25")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+import unittest
+
+from checkpoint import StateCheckpoint
+from ledger import PositionLedger
+
+
+class TestStateCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "trades_data", "state.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_records_survive_a_restart(self):
+        checkpoint = StateCheckpoint(self.path)
+        self.assertEqual(checkpoint.load(), {})
+        position = {"call": {"symbol": "BTC-25APR25-90000-C-USDT", "qty": 0.01, "entry_price": 205.0}}
+        self.assertTrue(checkpoint.save("BTC-25APR25", {"position": position, "total_realized_pnl": -0.39}))
+        self.assertTrue(checkpoint.save("ETH-25APR25", {"position": None, "total_realized_pnl": 0.0}))
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["state.json"])  # the temporary file was renamed
+
+        restarted = StateCheckpoint(self.path)
+        records = restarted.load()
+        self.assertEqual(records["BTC-25APR25"]["position"], position)
+        self.assertIsNone(records["ETH-25APR25"]["position"])
+        restarted.save("ETH-25APR25", {"position": None, "total_realized_pnl": -0.1})
+        self.assertEqual(sorted(StateCheckpoint(self.path).load()), ["BTC-25APR25", "ETH-25APR25"])
+
+    def test_unchanged_records_are_not_rewritten(self):
+        checkpoint = StateCheckpoint(self.path)
+        position = {"call": {"symbol": "BTC-25APR25-90000-C-USDT", "qty": 0.01}}
+        record = {"position": position, "adjustments": 0}
+        checkpoint.save("BTC-25APR25", record)
+        self.assertFalse(checkpoint.save("BTC-25APR25", record))
+        position["put"] = {"symbol": "BTC-25APR25-80000-P-USDT", "qty": 0.01}  # mutated in place, as the strategy does
+        self.assertTrue(checkpoint.save("BTC-25APR25", record))
+        self.assertEqual(checkpoint.writes, 2)
+
+        restarted = StateCheckpoint(self.path)
+        restarted.load()
+        self.assertFalse(restarted.save("BTC-25APR25", record))
+        self.assertEqual(restarted.writes, 0)
+
+    def test_unknown_version_is_refused(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as f:
+            json.dump({"version": 99, "instances": {}}, f)
+        with self.assertRaises(ValueError):
+            StateCheckpoint(self.path).load()
+
+    def test_ledger_positions_round_trip(self):
+        ledger = PositionLedger()
+        ledger.record_fill("BTC-25APR25-90000-C-USDT", "Sell", 0.01, 205.0)
+        ledger.record_fill("BTC-25APR25-95000-C-USDT", "Buy", 0.01, 120.0)
+        ledger.record_fill("BTC-25APR25-95000-C-USDT", "Sell", 0.01, 125.0)
+        checkpoint = StateCheckpoint(self.path)
+        checkpoint.save("BTC-25APR25", {"ledger": ledger.open_positions()})
+
+        restored = PositionLedger()
+        restored.restore(StateCheckpoint(self.path).load()["BTC-25APR25"]["ledger"])
+        self.assertEqual(restored.open_positions(), {"BTC-25APR25-90000-C-USDT": (-0.01, 205.0)})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import json
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import decoding
+from bybit_apis import DMABybit
+from decoding import decode_tickers_response, loads, ticker_columns
+from market_data_feed import parse_option_tickers
+from option_chain import TICKER_FIELDS, OptionChain, TickerColumns
+from recordings import load_recorded_tickers
+
+
+def tickers_body(tickers, time_ms=1744984251261):
+    return json.dumps({"retCode": 0, "retMsg": "SUCCESS", "time": time_ms,
+                       "result": {"category": "option", "list": tickers}}).encode()
+
+
+class TestDecodeTickers(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tickers, cls.time_ms = load_recorded_tickers()
+        cls.body = tickers_body(cls.tickers, cls.time_ms)
+
+    def assertSameChain(self, chain, expected):
+        self.assertEqual(chain.symbols.tolist(), expected.symbols.tolist())
+        for name in TICKER_FIELDS:
+            np.testing.assert_array_equal(getattr(chain, name), getattr(expected, name))
+
+    def test_typed_decode_matches_dict_path(self):
+        response = decode_tickers_response(self.body)
+        self.assertEqual((response["retCode"], response["time"]), (0, self.time_ms))
+        columns = response["result"]["list"]
+        self.assertIsInstance(columns, TickerColumns)
+        self.assertEqual(len(columns), len(self.tickers))
+        self.assertSameChain(OptionChain.from_tickers(columns), OptionChain.from_tickers(self.tickers))
+        self.assertEqual(parse_option_tickers(columns), parse_option_tickers(self.tickers))
+
+    def test_untyped_fallback(self):
+        # Empty strings are not valid typed floats; they decode as 0 like float(x or 0)
+        tickers = [dict(t) for t in self.tickers[:3]]
+        tickers[1]["bid1Price"] = ""
+        columns = decode_tickers_response(tickers_body(tickers))["result"]["list"]
+        self.assertEqual(columns.fields["bid"][1], 0.0)
+        self.assertSameChain(OptionChain.from_tickers(columns), OptionChain.from_tickers(tickers))
+        with mock.patch.object(decoding, "msgspec", None):
+            columns = decode_tickers_response(self.body)["result"]["list"]
+        self.assertSameChain(OptionChain.from_tickers(columns), OptionChain.from_tickers(self.tickers))
+
+    def test_error_response(self):
+        response = decode_tickers_response(b'{"retCode": 10001, "retMsg": "params error", "result": {}}')
+        self.assertEqual((response["retCode"], response["retMsg"]), (10001, "params error"))
+        self.assertEqual(len(response["result"].get("list", ())), 0)
+
+    def test_ticker_columns(self):
+        columns = ticker_columns([{"symbol": "BTC-25APR25-90000-C-USDT", "markIv": "0.5", "delta": 0.1}])
+        self.assertEqual(columns.symbols, ["BTC-25APR25-90000-C-USDT"])
+        self.assertEqual((columns.fields["iv"][0], columns.fields["delta"][0], columns.fields["bid"][0]), (0.5, 0.1, 0.0))
+
+
+class TestClientDecoding(unittest.TestCase):
+    def setUp(self):
+        self.client = DMABybit("key", "11" * 32, symbol="BTCUSDT", category="option")
+        tickers, _ = load_recorded_tickers()
+        self.response = mock.Mock(content=tickers_body(tickers[:5]), headers={}, status_code=200)
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_get_tickers_typed(self):
+        with mock.patch.object(self.client.session, "get", return_value=self.response):
+            plain = self.client.get_tickers(category="option", base_coin="BTC")
+            typed = self.client.get_tickers(category="option", base_coin="BTC", typed=True)
+        self.assertEqual(plain, loads(self.response.content))
+        self.assertIsInstance(typed["result"]["list"], TickerColumns)
+
+    def test_invalid_body_returns_none(self):
+        self.response.content = b"<html>bad gateway</html>"
+        with mock.patch.object(self.client.session, "get", return_value=self.response), \
+                mock.patch("builtins.print"):
+            self.assertIsNone(self.client.get_tickers(category="option", base_coin="BTC", typed=True))
+            self.assertIsNone(self.client.get_balance())
+
+
+if __name__ == "__main__":
+    unittest.main()
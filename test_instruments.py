@@ -0,0 +1,35 @@
+import unittest
+from datetime import date
+
+from instruments import parse_expiry_code, parse_symbol
+from recordings import load_recorded_tickers
+
+
+class TestInstruments(unittest.TestCase):
+    def test_usdt_and_unsuffixed_symbols(self):
+        usdt = parse_symbol("BTC-23APR25-93000-C-USDT")
+        self.assertEqual((usdt.underlying, usdt.expiry, usdt.strike, usdt.option_type, usdt.settle_coin),
+                         ("BTC", date(2025, 4, 23), 93000.0, "C", "USDT"))
+        self.assertTrue(usdt.is_call)
+        usdc = parse_symbol("BTC-27JUN25-120000-P")
+        self.assertEqual((usdc.expiry, usdc.strike, usdc.is_call, usdc.settle_coin),
+                         (date(2025, 6, 27), 120000.0, False, "USDC"))
+        self.assertEqual(usdc.expiry_code, "27JUN25")
+
+    def test_records_are_cached(self):
+        self.assertIs(parse_symbol("ETH-2MAY25-1800-P-USDT"), parse_symbol("ETH-2MAY25-1800-P-USDT"))
+        self.assertEqual(parse_expiry_code("2MAY25"), parse_expiry_code("02MAY25"))
+
+    def test_rejects_non_option_symbols(self):
+        for symbol in ("BTCUSDT", "BTC-25APR25-90000-X-USDT", "BTC-25APR25-abc-C", "BTC-99XYZ25-90000-C"):
+            with self.assertRaises(ValueError):
+                parse_symbol(symbol)
+
+    def test_parses_every_recorded_symbol(self):
+        tickers, _ = load_recorded_tickers()
+        settle_coins = {parse_symbol(t["symbol"]).settle_coin for t in tickers}
+        self.assertEqual(settle_coins, {"USDT", "USDC"})
+
+
+if __name__ == '__main__':
+    unittest.main()
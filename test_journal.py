@@ -0,0 +1,118 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from journal import TradeJournal, setup_logging
+
+
+def read_events(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+class TestTradeJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "trades", "journal.jsonl")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_events_are_written_as_json_lines(self):
+        journal = TradeJournal(self.path, clock=lambda: 100.0)
+        journal.record("trade", order_link_id="1", symbol="BTC-25APR25-90000-C-USDT", side="Sell", qty=0.01,
+                       price=205.0, realized_pnl=0.0)
+        journal.record("decision", action="exit", reason="stop_loss", pnl=-12.5, threshold=-10.0)
+        self.assertTrue(journal.flush(5))
+        self.assertEqual(read_events(self.path), [
+            {"ts": 100.0, "event": "trade", "order_link_id": "1", "symbol": "BTC-25APR25-90000-C-USDT",
+             "side": "Sell", "qty": 0.01, "price": 205.0, "realized_pnl": 0.0},
+            {"ts": 100.0, "event": "decision", "action": "exit", "reason": "stop_loss", "pnl": -12.5,
+             "threshold": -10.0},
+        ])
+        journal.close(5)
+
+    def wait_written(self, journal, n):
+        deadline = time.monotonic() + 5
+        while journal.written < n and time.monotonic() < deadline:
+            time.sleep(0.001)
+        return journal.written
+
+    def test_batches_by_size(self):
+        journal = TradeJournal(self.path, flush_interval=60, flush_size=3)
+        with mock.patch("journal.os.fsync") as fsync:
+            for i in range(7):
+                journal.record("trade", n=i)
+            self.assertEqual(self.wait_written(journal, 6), 6)  # the 7th waits for the interval
+            self.assertEqual(fsync.call_count, 2)
+            self.assertTrue(journal.flush(5))
+            self.assertEqual(fsync.call_count, 3)
+        self.assertEqual([event["n"] for event in read_events(self.path)], list(range(7)))
+        journal.close(5)
+
+    def test_flushes_on_interval(self):
+        journal = TradeJournal(self.path, flush_interval=0.01, flush_size=1000)
+        journal.record("trade", n=0)
+        self.assertEqual(self.wait_written(journal, 1), 1)
+        self.assertEqual(len(read_events(self.path)), 1)
+        journal.close(5)
+
+    def test_close_writes_everything_queued(self):
+        journal = TradeJournal(self.path, flush_interval=60, flush_size=1000)
+        for i in range(250):
+            journal.record("trade", n=i)
+        journal.close(5)
+        self.assertEqual(len(read_events(self.path)), 250)
+        journal.record("trade", n=250)  # after close: not written, and no new writer thread
+        self.assertEqual(len(read_events(self.path)), 250)
+
+    def test_record_does_not_wait_for_the_disk(self):
+        journal = TradeJournal(self.path, flush_size=1)
+        release = threading.Event()
+        with mock.patch("journal.os.fsync", side_effect=lambda fd: release.wait(5)):
+            started = time.perf_counter()
+            for i in range(100):
+                journal.record("trade", n=i)
+            elapsed = time.perf_counter() - started
+            release.set()
+        self.assertLess(elapsed, 1)
+        journal.close(5)
+        self.assertEqual(len(read_events(self.path)), 100)
+
+    def test_without_path_records_are_dropped(self):
+        journal = TradeJournal(None)
+        journal.record("trade", n=1)
+        self.assertTrue(journal.flush())
+        journal.close()
+        self.assertIsNone(journal._thread)
+
+
+class TestSetupLogging(unittest.TestCase):
+    def test_records_written_by_listener(self):
+        root = logging.getLogger()
+        saved = root.handlers[:]
+        root.handlers = []
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "strategy.log")
+            try:
+                listener = setup_logging(path)
+                with mock.patch.object(listener.handlers[1], "emit"):
+                    logging.info("Placing order: %s", "BTC-25APR25-90000-C-USDT")
+                    listener.stop()
+            finally:
+                for handler in root.handlers:
+                    handler.close()
+                root.handlers = saved
+                for handler in listener.handlers:
+                    handler.close()
+            with open(path) as f:
+                self.assertIn("INFO - Placing order: BTC-25APR25-90000-C-USDT", f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+
+from ledger import PositionLedger, estimate_fee
+from option_chain import OptionChain
+from recordings import load_recorded_tickers
+
+
+class TestEstimateFee(unittest.TestCase):
+    def test_fee_is_capped_by_premium(self):
+        # 0.03% of 84000 = 25.2 per contract, below 7% of a 1000 premium
+        self.assertAlmostEqual(estimate_fee(1000.0, 84000.0, 0.01), 0.252)
+        # Cheap options pay at most 7% of the premium
+        self.assertAlmostEqual(estimate_fee(100.0, 84000.0, 0.01), 0.07)
+
+
+class TestPositionLedger(unittest.TestCase):
+    def test_round_trip_short_matches_squared_position_pnl(self):
+        ledger = PositionLedger()
+        ledger.record_fill("C1", "Sell", 0.01, 1200.0, fee=0.25)
+        realized = ledger.record_fill("C1", "Buy", 0.01, 900.0, fee=0.25)
+        # sell value - buy value - fees, as helpers.get_pnl_of_sqaured_position computes it
+        self.assertAlmostEqual(ledger.realized_pnl(), 12.0 - 9.0 - 0.5)
+        self.assertAlmostEqual(realized, 3.0 - 0.25)
+        self.assertEqual(ledger.open_symbols(), [])
+        self.assertEqual(len(ledger.fills), 2)
+
+    def test_average_price_partial_close_and_flip(self):
+        ledger = PositionLedger()
+        ledger.record_fill("P1", "Sell", 0.01, 100.0)
+        ledger.record_fill("P1", "Sell", 0.03, 200.0)
+        position = ledger.position("P1")
+        self.assertAlmostEqual(position.qty, -0.04)
+        self.assertAlmostEqual(position.avg_price, 175.0)
+        self.assertAlmostEqual(ledger.record_fill("P1", "Buy", 0.02, 150.0), 0.5)
+        self.assertAlmostEqual(position.avg_price, 175.0)
+        # Buying more than the short flips the position long at the fill price
+        self.assertAlmostEqual(ledger.record_fill("P1", "Buy", 0.03, 125.0), 1.0)
+        self.assertAlmostEqual(position.qty, 0.01)
+        self.assertAlmostEqual(position.avg_price, 125.0)
+
+    def test_unrealized_pnl_from_chain_marks(self):
+        tickers, _ = load_recorded_tickers()
+        chain = OptionChain.from_tickers(tickers)
+        call, put = chain.symbols[0], chain.symbols[1]
+        ledger = PositionLedger()
+        ledger.record_fill(call, "Sell", 0.01, chain[call]["mark"] + 50.0)
+        ledger.record_fill(put, "Buy", 0.02, chain[put]["mark"] - 10.0)
+        self.assertAlmostEqual(ledger.unrealized_pnl(chain), 0.5 + 0.2)
+        self.assertAlmostEqual(ledger.unrealized_pnl(chain, [call]), 0.5)
+        # Symbols missing from a later chain keep their last mark
+        self.assertAlmostEqual(ledger.total_pnl(chain.subset(chain.symbols == call)), 0.5 + 0.2)
+
+    def test_reconcile_adopts_exchange_positions(self):
+        ledger = PositionLedger()
+        ledger.record_fill("C1", "Sell", 0.01, 1200.0)
+        ledger.record_fill("P1", "Sell", 0.01, 800.0)
+        snapshot = {
+            "C1": {"symbol": "C1", "side": "Sell", "size": "0.01", "avgPrice": "1201", "positionIM": "40"},
+            "P1": {"symbol": "P1", "side": "Sell", "size": "0.02", "avgPrice": "810", "positionIM": "70"},
+            "OTHER": {"symbol": "OTHER", "side": "Buy", "size": "1", "avgPrice": "5", "positionIM": "0"},
+        }
+        with self.assertLogs(level="WARNING"):
+            corrected = ledger.reconcile(snapshot)
+        self.assertEqual(corrected, ["P1"])
+        self.assertAlmostEqual(ledger.position("C1").avg_price, 1200.0)
+        self.assertAlmostEqual(ledger.position("P1").qty, -0.02)
+        self.assertAlmostEqual(ledger.position("P1").avg_price, 810.0)
+        self.assertIsNone(ledger.position("OTHER"))
+        self.assertAlmostEqual(ledger.initial_margin(), 110.0)
+        # A position closed on the exchange is flattened locally
+        self.assertEqual(ledger.reconcile({"P1": snapshot["P1"]}), ["C1"])
+        self.assertEqual(ledger.open_symbols(), ["P1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from market_data_feed import STREAM_TO_REST_FIELDS, OptionChainStore, OptionTickerFeed, ReplayServer
+import strategy
+from option_chain import OptionChain
+from tickstore import TickRecorder, TickStore
+
+SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "api_responses",
+                      "bybit_option_ticker_stream_sample.jsonl")
+
+
+def load_sample():
+    with open(SAMPLE) as f:
+        return [json.loads(line) for line in f]
+
+
+class TestOptionChainStore(unittest.TestCase):
+    def test_delta_merges_into_snapshot(self):
+        store = OptionChainStore()
+        store.apply_message({"topic": "tickers.BTC-25APR25-90000-C-USDT", "type": "snapshot", "data": {
+            "symbol": "BTC-25APR25-90000-C-USDT", "bidPrice": "100", "askPrice": "110", "markPriceIv": "0.5",
+            "delta": "0.2", "underlyingPrice": "85000"}})
+        store.apply_message({"topic": "tickers.BTC-25APR25-90000-C-USDT", "type": "delta", "data": {
+            "symbol": "BTC-25APR25-90000-C-USDT", "delta": "0.25"}})
+        option = store.options_data()["BTC-25APR25-90000-C-USDT"]
+        self.assertEqual(option, {"iv": 0.5, "delta": 0.25, "underlying": 85000.0, "bid": 100.0, "ask": 110.0})
+        self.assertEqual(store.underlying_price("25APR25"), 85000.0)
+        store.apply_message({"topic": "tickers.BTC-25APR25-95000-P-USDT", "type": "snapshot", "data": {
+            "symbol": "BTC-25APR25-95000-P-USDT", "underlyingPrice": "85100"}})
+        self.assertEqual(store.underlying_price("25APR25"), 85100.0)
+        self.assertIsNone(store.underlying_price("25APR25", "ETH"))
+
+    def test_non_ticker_messages_are_ignored(self):
+        store = OptionChainStore()
+        self.assertFalse(store.apply_message({"op": "subscribe", "success": True}))
+        self.assertEqual(store.version, 0)
+
+
+class TestOptionTickerFeed(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.server = asyncio.run_coroutine_threadsafe(ReplayServer.from_file(SAMPLE).start(), self.loop).result()
+
+    def tearDown(self):
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def test_feed_replays_recorded_stream(self):
+        messages = load_sample()
+        symbols = sorted({m["data"]["symbol"] for m in messages})
+        # Seed from the snapshots as from_rest would, and build the live chain before the replay
+        store = OptionChainStore()
+        store.load_tickers([{STREAM_TO_REST_FIELDS.get(k, k): v for k, v in m["data"].items()}
+                            for m in messages if m["type"] == "snapshot"])
+        live_chain = store.option_chain()
+        feed = OptionTickerFeed(symbols, url=self.server.url, store=store).start()
+        try:
+            version = store.version
+            while version < len(messages) + 1:
+                previous, version = version, feed.store.wait_for_update(version, timeout=5)
+                self.assertGreater(version, previous, "feed stalled")
+        finally:
+            feed.stop()
+
+        self.assertEqual(sorted(self.server.subscriptions), sorted(f"tickers.{s}" for s in symbols))
+        last = {m["data"]["symbol"]: m["data"] for m in messages}
+        options_data = feed.store.options_data("25APR25")
+        self.assertEqual(len(options_data), len(symbols))
+        for symbol, data in last.items():
+            self.assertEqual(options_data[symbol]["delta"], float(data["delta"]))
+            self.assertEqual(options_data[symbol]["iv"], float(data["markPriceIv"]))
+        # The incrementally updated chain matches one rebuilt from the merged tickers
+        chain = feed.store.option_chain("25APR25")
+        self.assertIs(chain.symbols, live_chain.symbols)  # updated in place, not rebuilt
+        for symbol, data in last.items():
+            self.assertEqual(chain[symbol]["delta"], float(data["delta"]))
+        self.assertEqual(chain.nearest_delta(0.3, is_call=True),
+                         OptionChain.from_tickers(feed.store.tickers()).nearest_delta(0.3, is_call=True))
+        # Fields not carried by deltas keep their snapshot value
+        first = {m["data"]["symbol"]: m["data"] for m in reversed(messages)}
+        self.assertEqual(options_data[symbols[0]]["bid"], float(first[symbols[0]]["bidPrice"]))
+
+    def test_malformed_messages_are_skipped(self):
+        messages = load_sample()
+        symbol = messages[0]["data"]["symbol"]
+        bad = ["not json", json.dumps({"topic": f"tickers.{symbol}", "type": "delta", "data": {"delta": "0.3"}})]
+        server = asyncio.run_coroutine_threadsafe(
+            ReplayServer(bad + [json.dumps(messages[0])]).start(), self.loop).result()
+        feed = OptionTickerFeed([symbol], url=server.url).start()
+        try:
+            with self.assertLogs(level="WARNING") as logs:
+                self.assertGreater(feed.store.wait_for_update(0, timeout=5), 0, "feed stalled")
+        finally:
+            feed.stop()
+            asyncio.run_coroutine_threadsafe(server.stop(), self.loop).result()
+        self.assertEqual(len([line for line in logs.output if "malformed" in line]), 2)
+        self.assertEqual(feed.store.options_data()[symbol]["delta"], float(messages[0]["data"]["delta"]))
+
+    def test_strategy_reads_rest_while_the_stream_reconnects(self):
+        messages = load_sample()
+        symbols = sorted({m["data"]["symbol"] for m in messages})
+        rest_tickers = [{STREAM_TO_REST_FIELDS.get(k, k): v for k, v in m["data"].items()}
+                        for m in messages if m["type"] == "snapshot"]
+        client = mock.Mock()
+        client.get_tickers.return_value = {"retCode": 0, "result": {"list": rest_tickers}}
+        server = asyncio.run_coroutine_threadsafe(
+            ReplayServer([json.dumps(m) for m in messages]).start(), self.loop).result()
+        feed = OptionTickerFeed(symbols, url=server.url).start()
+        try:
+            self.assertGreater(feed.store.wait_for_update(0, timeout=5), 0, "feed stalled")
+            with mock.patch.object(strategy, "market_feed", feed), mock.patch.object(strategy, "bybit_client", client):
+                self.assertTrue(strategy.stream_live())
+                self.assertGreater(len(strategy.get_option_chain("25APR25")), 0)
+                client.get_tickers.assert_not_called()
+
+                # The exchange drops the connection: the feed keeps retrying, its store frozen
+                asyncio.run_coroutine_threadsafe(server.stop(), self.loop).result()
+                deadline = time.monotonic() + 5
+                while feed.connected.is_set() and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                self.assertFalse(strategy.stream_live())
+                chain = strategy.get_option_chain("25APR25")
+                self.assertEqual(len(chain), len(rest_tickers))
+                self.assertEqual(client.get_tickers.call_count, 1)
+                self.assertEqual(strategy.get_iv_and_greeks("25APR25").keys(), {t["symbol"] for t in rest_tickers})
+                self.assertEqual(client.get_tickers.call_count, 2)
+        finally:
+            feed.stop()
+
+    def test_stopping_the_strategy_feed_writes_buffered_ticks(self):
+        messages = load_sample()
+        symbols = sorted({m["data"]["symbol"] for m in messages})
+        with tempfile.TemporaryDirectory() as tick_dir:
+            store = TickStore(tick_dir)
+            feed = OptionTickerFeed(symbols, url=self.server.url, recorder=TickRecorder(store)).start()
+            previous, strategy.market_feed = strategy.market_feed, feed
+            try:
+                version = 0
+                while version < len(messages):
+                    previous_version, version = version, feed.store.wait_for_update(version, timeout=5)
+                    self.assertGreater(version, previous_version, "feed stalled")
+                self.assertEqual(store.days(), [])  # all still buffered
+                strategy.stop_market_feed()
+            finally:
+                feed.stop()
+                strategy.market_feed = previous
+            self.assertEqual(sum(len(store.read(day)) for day in store.days()), len(messages))
+
+
+if __name__ == '__main__':
+    unittest.main()
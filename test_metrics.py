@@ -0,0 +1,113 @@
+import math
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+import strategy
+from bybit_apis import DMABybit
+from metrics import Histogram, MetricsRegistry, PrometheusFileSink, prometheus_text
+
+
+class TestHistogram(unittest.TestCase):
+    def test_quantiles_within_bucket_resolution(self):
+        rng = random.Random(0)
+        values = sorted(rng.lognormvariate(math.log(0.02), 0.5) for _ in range(10000))
+        histogram = Histogram()
+        for value in values:
+            histogram.observe(value)
+        for q in (0.5, 0.99):
+            exact = values[int(q * len(values)) - 1]
+            self.assertLess(abs(histogram.quantile(q) - exact) / exact, 0.25)
+        self.assertEqual(histogram.count, len(values))
+        self.assertAlmostEqual(histogram.sum, sum(values))
+        self.assertTrue(math.isnan(Histogram().quantile(0.5)))
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry(buckets=(0.01, 0.1))
+
+    def test_series_by_labels_and_timer(self):
+        self.registry.observe("latency_seconds", 0.05, endpoint="/a")
+        self.registry.observe("latency_seconds", 0.5, endpoint="/b")
+        with self.assertRaises(ValueError), self.registry.time("step_seconds", step="x"):
+            raise ValueError
+        self.registry.inc("requests_total", endpoint="/a", outcome="ok")
+        self.registry.inc("requests_total", 2, outcome="ok", endpoint="/a")
+        self.assertEqual(self.registry.histogram("latency_seconds", endpoint="/a").count, 1)
+        self.assertEqual(self.registry.histogram("step_seconds", step="x").count, 1)
+        self.assertEqual(self.registry.counter("requests_total", endpoint="/a", outcome="ok").value, 3)
+        self.assertEqual(self.registry.quantiles("latency_seconds", endpoint="/b")[0.5], 0.1)
+
+    def test_prometheus_text(self):
+        self.registry.observe("latency_seconds", 0.005, endpoint='/v5/"x"')
+        self.registry.observe("latency_seconds", 0.05, endpoint='/v5/"x"')
+        self.registry.inc("requests_total", outcome="ok")
+        self.registry.gauge("queue_depth", lambda: 3, endpoint_class="trade")
+        text = prometheus_text(self.registry)
+        self.assertEqual(text.splitlines(), [
+            "# TYPE latency_seconds histogram",
+            'latency_seconds_bucket{endpoint="/v5/\\"x\\"",le="0.01"} 1',
+            'latency_seconds_bucket{endpoint="/v5/\\"x\\"",le="0.1"} 2',
+            'latency_seconds_bucket{endpoint="/v5/\\"x\\"",le="+Inf"} 2',
+            'latency_seconds_sum{endpoint="/v5/\\"x\\""} 0.055',
+            'latency_seconds_count{endpoint="/v5/\\"x\\""} 2',
+            "# TYPE requests_total counter",
+            'requests_total{outcome="ok"} 1',
+            "# TYPE queue_depth gauge",
+            'queue_depth{endpoint_class="trade"} 3',
+        ])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "metrics.prom")
+            self.registry.add_sink(PrometheusFileSink(path))
+            self.registry.export()
+            with open(path) as f:
+                self.assertEqual(f.read(), text)
+            self.assertEqual(os.listdir(tmp), ["metrics.prom"])
+
+    def test_clear_drops_gauges_too(self):
+        self.registry.inc("requests_total", outcome="ok")
+        self.registry.gauge("queue_depth", lambda: 3, endpoint_class="trade")
+        self.registry.clear()
+        self.assertEqual(prometheus_text(self.registry).strip(), "")
+        self.assertEqual(self.registry.gauges, {})
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_client_records_request_phases(self):
+        registry = MetricsRegistry()
+        client = DMABybit("key", "11" * 32, symbol="BTCUSDT", category="option", metrics=registry)
+        response = mock.Mock(content=b'{"retCode": 0, "result": {}}', headers={}, status_code=200)
+        with mock.patch.object(client.session, "get", return_value=response):
+            client.get_order_details("abc")
+            client.get_order_details("abc")
+        response.content = b"not json"
+        with mock.patch.object(client.session, "get", return_value=response), mock.patch("builtins.print"):
+            client.get_order_details("abc")
+        endpoint = "/v5/order/realtime"
+        for name in ("api_rate_limit_wait_seconds", "api_sign_seconds", "api_network_seconds"):
+            self.assertEqual(registry.histogram(name, endpoint=endpoint).count, 3, name)
+        self.assertEqual(registry.histogram("api_decode_seconds", endpoint=endpoint).count, 2)
+        self.assertEqual(registry.counter("api_requests_total", endpoint=endpoint, outcome="ok").value, 2)
+        self.assertEqual(registry.counter("api_requests_total", endpoint=endpoint, outcome="decode_error").value, 1)
+        client.close()
+
+    def test_tick_to_order_only_for_orders_reacting_to_market_updates(self):
+        registry = MetricsRegistry()
+        client = mock.Mock()
+        client.place_order.return_value = {"retCode": 0, "result": {"orderLinkId": "1"}}
+        with mock.patch.object(strategy, "metrics", registry), mock.patch.object(strategy, "bybit_client", client):
+            strategy.place_order("Sell", "BTC-25APR25-90000-C-USDT", 0.01)  # e.g. from a rebalance timer
+            strategy.pending_tick_time = strategy.time.perf_counter()
+            with strategy.handling_market_update():
+                strategy.place_order("Sell", "BTC-25APR25-90000-C-USDT", 0.01)
+            self.assertIsNone(strategy.tick_time)
+        self.assertEqual(registry.histogram("strategy_tick_to_order_seconds").count, 1)
+        self.assertEqual(registry.histogram("strategy_step_seconds", step="order_round_trip").count, 2)
+        self.assertEqual(registry.counter("strategy_orders_total", side="Sell", outcome="ok").value, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
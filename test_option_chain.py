@@ -0,0 +1,104 @@
+import datetime
+import unittest
+
+import numpy as np
+
+from option_chain import OptionChain
+from recordings import load_recorded_tickers
+
+
+def brute_nearest_delta(chain, target, is_call):
+    """Full-scan reference for the index lookup"""
+    mask = chain.mask(is_call) & (chain.delta > 0 if is_call else chain.delta < 0)
+    rows = np.flatnonzero(mask)
+    return chain.symbols[rows[np.argmin(np.abs(chain.delta[rows] - target))]] if len(rows) else None
+
+
+def scan_nearest_delta(tickers, target, suffix):
+    """The dict-of-dicts scan the strategy used before OptionChain"""
+    best, best_diff = None, float("inf")
+    for t in tickers:
+        d = float(t["delta"])
+        if t["symbol"].endswith(suffix) and (d > 0 if suffix == "-C-USDT" else d < 0) and abs(d - target) < best_diff:
+            best, best_diff = t["symbol"], abs(d - target)
+    return best
+
+
+class TestOptionChain(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tickers, _ = load_recorded_tickers()
+        cls.chain = OptionChain.from_tickers(cls.tickers)
+
+    def test_columns_and_metadata(self):
+        self.assertEqual(len(self.chain), len(self.tickers))
+        row = self.chain["BTC-27JUN25-120000-P"]
+        self.assertAlmostEqual(row["delta"], -0.90960108)
+        self.assertAlmostEqual(row["iv"], 0.5346)
+        self.assertEqual(row["strike"], 120000)
+        i = self.chain.row_of["BTC-27JUN25-120000-P"]
+        self.assertEqual(self.chain.settle[i], "USDC")
+        self.assertFalse(self.chain.is_call[i])
+        self.assertEqual(self.chain.expiry[i], np.datetime64("2025-06-27"))
+        self.assertEqual(self.chain.base_coin[i], "BTC")
+        self.assertFalse(self.chain.mask(settle=None, base_coin="ETH").any())
+        self.assertEqual(self.chain.subset(self.chain.mask(settle=None, base_coin="BTC")).base_coin[0], "BTC")
+        self.assertEqual(self.chain.get("missing", {}), {})
+
+    def test_nearest_delta_matches_scan(self):
+        for target in (0.1, 0.25, 0.5):
+            self.assertEqual(self.chain.nearest_delta(target, is_call=True),
+                             scan_nearest_delta(self.tickers, target, "-C-USDT"))
+            self.assertEqual(self.chain.nearest_delta(-target, is_call=False),
+                             scan_nearest_delta(self.tickers, -target, "-P-USDT"))
+
+    def test_selectors_filter_expiry_and_strike(self):
+        call = self.chain.nearest_delta(0.1, is_call=True, expiry="25APR25")
+        self.assertTrue(call.startswith("BTC-25APR25-") and call.endswith("-C-USDT"))
+        self.assertEqual(self.chain.next_strike(85000, is_call=True, above=True, expiry="25APR25"),
+                         "BTC-25APR25-86000-C-USDT")
+        self.assertEqual(self.chain.next_strike(85000, is_call=False, above=False, expiry="25APR25"),
+                         "BTC-25APR25-84000-P-USDT")
+        self.assertIsNone(self.chain.next_strike(1e9, is_call=True, above=True))
+
+    def test_nearest_strike_is_atm(self):
+        self.assertEqual(self.chain.nearest_strike(84575.98, is_call=True, expiry="25APR25"),
+                         "BTC-25APR25-85000-C-USDT")
+
+    def test_index_follows_in_place_delta_updates(self):
+        chain = OptionChain.from_tickers(self.tickers)
+        rng = np.random.default_rng(7)
+        symbols = list(chain.symbols)
+        for step in range(500):
+            symbol = symbols[rng.integers(len(symbols))]
+            i = chain.row_of[symbol]
+            # Jitter the delta, sometimes onto an existing value to exercise ties
+            new_delta = chain.delta[rng.integers(len(symbols))] if step % 5 == 0 else \
+                float(np.clip(chain.delta[i] + rng.normal(0, 0.05), -1, 1))
+            chain.update_from_ticker({"symbol": symbol, "delta": str(new_delta)})
+            target = float(rng.uniform(0.05, 0.6))
+            self.assertEqual(chain.nearest_delta(target, is_call=True), brute_nearest_delta(chain, target, True))
+            self.assertEqual(chain.nearest_delta(-target, is_call=False), brute_nearest_delta(chain, -target, False))
+
+    def test_copy_is_independent(self):
+        chain = OptionChain.from_tickers(self.tickers)
+        chain.nearest_delta(0.1, is_call=True)
+        snapshot = chain.copy()
+        best = snapshot.nearest_delta(0.3, is_call=True)
+        chain.update(best, {"delta": 0.99})
+        self.assertEqual(snapshot.nearest_delta(0.3, is_call=True), best)
+        self.assertNotEqual(chain.nearest_delta(0.3, is_call=True), best)
+
+    def test_partition_by_expiry(self):
+        parts = self.chain.partition()
+        self.assertEqual(sum(len(part) for part in parts.values()), len(self.chain))
+        part = parts[("BTC", datetime.date(2025, 4, 25))]
+        self.assertTrue(np.all(part.expiry == np.datetime64("2025-04-25")))
+        self.assertEqual(part.nearest_delta(0.1, is_call=True),
+                         self.chain.nearest_delta(0.1, is_call=True, expiry="25APR25"))
+        symbol = part.symbols[0]
+        self.assertEqual(part[symbol], self.chain[symbol])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from concurrent.futures import CancelledError
+
+from market_data_feed import ReplayServer
+from order_manager import OrderManager, OrderResult, OrderTimeout, PrivateOrderStream
+
+
+SYMBOL = "BTC-25APR25-90000-C-USDT"
+
+
+def order_record(order_link_id, status, filled_qty=0.0, avg_price=0.0):
+    return {"orderLinkId": order_link_id, "symbol": SYMBOL, "side": "Sell",
+            "orderStatus": status, "qty": "0.01", "cumExecQty": str(filled_qty), "avgPrice": str(avg_price),
+            "cumExecValue": str(filled_qty * avg_price), "cumExecFee": "0.25"}
+
+
+class FakeClient:
+    """get_order_details answering from a list of statuses per order (the last one repeats).
+
+    Like Bybit, a lookup by another symbol than the order's finds nothing.
+    """
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.polls = []
+
+    def get_order_details(self, order_link_id, symbol=None):
+        self.polls.append((order_link_id, time.monotonic()))
+        statuses = self.statuses.get(order_link_id)
+        if not statuses or symbol not in (None, SYMBOL):
+            return {"retCode": 0, "result": {"list": []}}  # not visible yet, or not found under that symbol
+        status = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+        filled = 0.01 if status == "Filled" else 0.0
+        return {"retCode": 0, "result": {"list": [order_record(order_link_id, status, filled, 205.0)]}}
+
+
+class TestOrderManagerPolling(unittest.TestCase):
+    def test_order_is_polled_with_backoff_until_filled(self):
+        client = FakeClient({"sell-1": ["New", "New", "New", "Filled"]})
+        manager = OrderManager(client, poll_base=0.01, poll_max=0.04)
+        try:
+            result = manager.track("sell-1").result(timeout=5)
+        finally:
+            manager.close()
+        self.assertEqual(result, OrderResult("sell-1", SYMBOL, "Sell", "Filled",
+                                             0.01, 0.01, 205.0, 2.05, 0.25))
+        self.assertEqual(len(client.polls), 4)
+        gaps = [b[1] - a[1] for a, b in zip(client.polls, client.polls[1:])]
+        self.assertGreater(gaps[-1], gaps[0])
+        self.assertEqual(manager.take("sell-1"), result)
+        self.assertIsNone(manager.take("sell-1"))
+
+    def test_orders_are_tracked_independently(self):
+        client = FakeClient({"sell-1": [None, "Filled"], "sell-2": ["Cancelled"]})
+        manager = OrderManager(client, poll_base=0.01)
+        try:
+            first, second = manager.track("sell-1"), manager.track("sell-2")
+            self.assertIs(manager.track("sell-1"), first)
+            self.assertEqual(second.result(timeout=5).status, "Cancelled")
+            self.assertEqual(second.result().filled_qty, 0.0)
+            self.assertEqual(first.result(timeout=5).status, "Filled")
+        finally:
+            manager.close()
+
+    def test_order_is_polled_under_its_own_symbol(self):
+        client = FakeClient({"sell-1": ["Filled"], "sell-2": ["Filled"]})
+        manager = OrderManager(client, poll_base=0.01, poll_max=0.02, timeout=0.2)
+        try:
+            self.assertEqual(manager.track("sell-1", SYMBOL).result(timeout=5).status, "Filled")
+            with self.assertRaises(OrderTimeout):
+                manager.track("sell-2", "BTCUSDT").result(timeout=5)
+        finally:
+            manager.close()
+
+    def test_order_that_never_finishes_times_out(self):
+        manager = OrderManager(FakeClient({"sell-1": ["New"]}), poll_base=0.01, poll_max=0.02, timeout=0.1)
+        try:
+            with self.assertRaises(OrderTimeout):
+                manager.track("sell-1").result(timeout=5)
+        finally:
+            manager.close()
+
+    def test_forget_and_close_cancel_open_orders(self):
+        manager = OrderManager(FakeClient({}), poll_base=10)
+        rejected, pending = manager.track("rejected"), manager.track("pending")
+        manager.forget("rejected")
+        manager.close()
+        self.assertTrue(rejected.cancelled())
+        with self.assertRaises(CancelledError):
+            pending.result(timeout=1)
+        with self.assertRaises(RuntimeError):
+            manager.track("late")
+
+
+class TestPrivateOrderStream(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        messages = [json.dumps({"topic": "order", "data": [order_record("sell-1", "New"),
+                                                            order_record("sell-1", "Filled", 0.01, 210.0)]})]
+        self.server = asyncio.run_coroutine_threadsafe(ReplayServer(messages).start(), self.loop).result()
+
+    def tearDown(self):
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def test_fill_arrives_on_the_stream_without_polling(self):
+        client = FakeClient({})
+        manager = OrderManager(client, poll_base=10)
+        fill = manager.track("sell-1")
+        manager.attach_stream(PrivateOrderStream(lambda: ["key", 1744984251000, "signature"], url=self.server.url))
+        try:
+            result = fill.result(timeout=5)
+        finally:
+            manager.close()
+        self.assertEqual((result.status, result.filled_qty, result.avg_price), ("Filled", 0.01, 210.0))
+        self.assertEqual(client.polls, [])
+        self.assertEqual(self.server.subscriptions, ["order"])
+
+
+if __name__ == "__main__":
+    unittest.main()
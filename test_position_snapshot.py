@@ -0,0 +1,64 @@
+import unittest
+from unittest import mock
+
+import helpers
+from helpers import get_initial_margin_of_position_state, get_pnl_of_position_state, get_position_snapshot
+
+PAGES = {
+    None: {"retCode": 0, "result": {"nextPageCursor": "page2", "list": [
+        {"symbol": "BTC-25APR25-95000-C-USDT", "unrealisedPnl": "1.5", "curRealisedPnl": "-0.1", "positionIM": "40"},
+        {"symbol": "BTC-25APR25-85000-P-USDT", "unrealisedPnl": "-0.5", "curRealisedPnl": "-0.1", "positionIM": "35"},
+    ]}},
+    "page2": {"retCode": 0, "result": {"nextPageCursor": "", "list": [
+        {"symbol": "BTC-25APR25-100000-C-USDT", "unrealisedPnl": "0.2", "curRealisedPnl": "0", "positionIM": "0"},
+        {"symbol": "BTC-25APR25-80000-P-USDT", "unrealisedPnl": "0.3", "curRealisedPnl": "0", "positionIM": "0"},
+    ]}},
+}
+
+IRON_BUTTERFLY = {
+    "call": {"symbol": "BTC-25APR25-95000-C-USDT"},
+    "put": {"symbol": "BTC-25APR25-85000-P-USDT"},
+    "call_wing": {"symbol": "BTC-25APR25-100000-C-USDT"},
+    "put_wing": {"symbol": "BTC-25APR25-80000-P-USDT"},
+}
+
+
+def fake_get_open_positions(symbol=None, cursor=None, limit=None):
+    return PAGES[cursor]
+
+
+class TestPositionSnapshot(unittest.TestCase):
+    def test_snapshot_follows_cursor_pages(self):
+        with mock.patch.object(helpers.bybit, "get_open_positions", side_effect=fake_get_open_positions) as get:
+            snapshot = get_position_snapshot()
+        self.assertEqual(get.call_count, 2)
+        self.assertEqual(len(snapshot), 4)
+
+    def test_failed_page_returns_none(self):
+        with mock.patch.object(helpers.bybit, "get_open_positions", return_value=None):
+            self.assertIsNone(get_position_snapshot())
+
+    def test_failed_snapshot_is_not_read_as_flat(self):
+        with mock.patch.object(helpers.bybit, "get_open_positions", return_value=None):
+            self.assertIsNone(get_pnl_of_position_state(IRON_BUTTERFLY))
+            self.assertIsNone(get_initial_margin_of_position_state(IRON_BUTTERFLY))
+
+    def test_four_legs_from_one_snapshot(self):
+        with mock.patch.object(helpers.bybit, "get_open_positions", side_effect=fake_get_open_positions) as get:
+            pnl = get_pnl_of_position_state(IRON_BUTTERFLY)
+            margin = get_initial_margin_of_position_state(IRON_BUTTERFLY)
+        self.assertAlmostEqual(pnl, 1.3)
+        self.assertAlmostEqual(margin, 75)
+        # One paginated snapshot per helper call instead of one request per leg
+        self.assertEqual(get.call_count, 4)
+
+    def test_shared_snapshot_skips_fetch(self):
+        snapshot = {leg["symbol"]: {"unrealisedPnl": "1", "positionIM": "2"} for leg in IRON_BUTTERFLY.values()}
+        with mock.patch.object(helpers.bybit, "get_open_positions") as get:
+            self.assertEqual(get_pnl_of_position_state(IRON_BUTTERFLY, snapshot), 4)
+            self.assertEqual(get_initial_margin_of_position_state(IRON_BUTTERFLY, snapshot), 8)
+        get.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+import numpy as np
+
+from option_chain import OptionChain
+from pricing import bs_price, chain_greeks, implied_vol, time_to_expiry
+from recordings import load_recorded_tickers
+
+
+class TestPricing(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        tickers, cls.now_ms = load_recorded_tickers()
+        cls.chain = OptionChain.from_tickers(tickers)
+        cls.t = time_to_expiry(cls.chain.expiry, cls.now_ms)
+
+    def test_greeks_match_recorded_chain(self):
+        chain = self.chain
+        greeks = chain_greeks(chain, self.now_ms)
+        np.testing.assert_allclose(greeks["delta"], chain.delta, atol=2e-4)
+        np.testing.assert_allclose(greeks["price"], chain.mark, atol=5.0, rtol=1e-3)
+        np.testing.assert_allclose(greeks["vega"], chain.vega, atol=0.1)
+        # Away from the final day the exchange's gamma/theta agree closely too
+        later = (self.t > 2 / 365) & (np.abs(chain.theta) > 1)
+        np.testing.assert_allclose(greeks["gamma"][later], chain.gamma[later], rtol=0.02, atol=1e-8)
+        np.testing.assert_allclose(greeks["theta"][later], chain.theta[later], rtol=0.02)
+
+    def test_implied_vol_recovers_mark_iv(self):
+        chain = self.chain
+        iv = implied_vol(chain.mark, chain.underlying, chain.strike, self.t, chain.is_call)
+        self.assertFalse(np.isnan(iv).any())
+        np.testing.assert_allclose(iv, chain.iv, atol=1e-3)
+
+    def test_implied_vol_round_trip_and_bounds(self):
+        iv = np.array([0.2, 0.5, 1.2, 0.8])
+        strike = np.array([60000.0, 85000.0, 120000.0, 90000.0])
+        is_call = np.array([True, False, True, False])
+        price = bs_price(85000.0, strike, 0.25, iv, is_call)
+        np.testing.assert_allclose(implied_vol(price, 85000.0, strike, 0.25, is_call), iv, atol=1e-5)
+        # Below intrinsic / above the underlying / expired cannot be inverted
+        bad = implied_vol(np.array([100.0, 90000.0, 500.0]), 85000.0, np.array([80000.0, 80000.0, 85000.0]),
+                          np.array([0.25, 0.25, 0.0]), True)
+        self.assertTrue(np.isnan(bad).all())
+
+    def test_revalue_on_underlying_tick(self):
+        chain = self.chain
+        row = chain.row_of["BTC-25APR25-90000-C-USDT"]
+        base = chain_greeks(chain, self.now_ms, rows=[row])
+        bumped = chain_greeks(chain, self.now_ms, underlying=chain.underlying[row] + 100, rows=[row])
+        # First-order: delta moves by about gamma * dS
+        self.assertAlmostEqual(bumped["delta"][0] - base["delta"][0], base["gamma"][0] * 100, delta=2e-4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import threading
+import time
+import unittest
+
+from rate_limiter import EndpointLimit, RateLimiter, TokenBucket, endpoint_class
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_refill_cap_and_pause(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, burst=2, clock=clock)
+        bucket.take()
+        bucket.take()
+        self.assertAlmostEqual(bucket.delay(), 0.5)
+        clock.now = 10.0
+        self.assertEqual(bucket.delay(), 0.0)
+        self.assertEqual(bucket.tokens, 2)  # never above burst
+        bucket.cap(0)
+        self.assertAlmostEqual(bucket.delay(), 0.5)
+        bucket.pause(3)
+        self.assertAlmostEqual(bucket.delay(), 3.0)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_endpoint_classes(self):
+        self.assertEqual(endpoint_class("/v5/order/create"), "trade")
+        self.assertEqual(endpoint_class("/v5/market/tickers"), "market")
+        self.assertEqual(endpoint_class("/v5/order/realtime"), "account")
+        self.assertEqual(endpoint_class("/v5/position/list"), "account")
+
+    def test_burst_then_wait_for_refill(self):
+        clock = FakeClock()
+        limiter = RateLimiter({"trade": EndpointLimit(0, 1, 2), "market": EndpointLimit(1, 10, 10),
+                               "account": EndpointLimit(2, 10, 10)}, EndpointLimit(0, 100, 100), clock)
+        self.assertEqual(limiter.acquire("/v5/order/create"), 0.0)
+        self.assertEqual(limiter.acquire("/v5/order/create"), 0.0)
+        self.assertIsNone(limiter.acquire("/v5/order/create", timeout=0))
+        # Other classes have their own buckets
+        self.assertEqual(limiter.acquire("/v5/market/tickers"), 0.0)
+        clock.now = 1.0
+        self.assertEqual(limiter.acquire("/v5/order/create", timeout=0), 0.0)
+        self.assertEqual(limiter.stats()["trade"]["requests"], 3)
+        self.assertEqual(limiter.queue_depth(), 0)
+
+    def test_orders_jump_ahead_of_queued_calls(self):
+        limiter = RateLimiter(total_limit=EndpointLimit(0, 20, 1))
+        limiter.acquire("/v5/position/list")  # the only shared token
+        served = []
+
+        def call(endpoint):
+            limiter.acquire(endpoint)
+            served.append(endpoint)
+
+        threads = [threading.Thread(target=call, args=("/v5/position/list",)),
+                   threading.Thread(target=call, args=("/v5/market/tickers",)),
+                   threading.Thread(target=call, args=("/v5/order/create",))]
+        for i, thread in enumerate(threads):
+            thread.start()
+            wait_until(lambda: limiter.queue_depth() == i + 1)
+        self.assertEqual(limiter.stats()["account"]["queue_depth"], 1)
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(served, ["/v5/order/create", "/v5/market/tickers", "/v5/position/list"])
+        stats = limiter.stats()
+        self.assertEqual(stats["trade"]["waited"], 1)
+        self.assertEqual(stats["account"]["max_queue_depth"], 1)
+        self.assertGreater(stats["account"]["max_wait"], stats["trade"]["max_wait"])
+
+    def test_rate_limit_headers_and_throttling(self):
+        limiter = RateLimiter()
+        reset_ms = str(int((time.time() + 60) * 1000))
+        limiter.update("/v5/position/list", {"X-Bapi-Limit-Status": "0", "X-Bapi-Limit-Reset-Timestamp": reset_ms})
+        self.assertIsNone(limiter.acquire("/v5/position/list", timeout=0))
+        self.assertEqual(limiter.acquire("/v5/order/create", timeout=0), 0.0)
+        limiter.update("/v5/market/tickers", {}, status_code=200, ret_code=10006)
+        self.assertIsNone(limiter.acquire("/v5/market/tickers", timeout=0))
+        self.assertEqual(limiter.stats()["market"]["throttled"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import threading
+import unittest
+from unittest import mock
+
+from bybit_apis import DMABybit
+from response_cache import ResponseCache
+
+OK = {"retCode": 0, "result": {"list": []}}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ResponseCache({"tickers": 1.0, "positions": 2.0}, clock=self.clock)
+        self.fetches = 0
+
+    def fetch(self, response=OK):
+        def fetch():
+            self.fetches += 1
+            return response
+        return fetch
+
+    def test_ttl_per_group(self):
+        for _ in range(3):
+            self.assertIs(self.cache.get_or_fetch(("tickers", "BTC"), self.fetch()), OK)
+        self.assertEqual(self.fetches, 1)
+        self.clock.now = 1.5
+        self.cache.get_or_fetch(("tickers", "BTC"), self.fetch())
+        self.cache.get_or_fetch(("positions",), self.fetch())
+        self.assertEqual(self.fetches, 3)
+        self.clock.now = 3.0
+        self.cache.get_or_fetch(("positions",), self.fetch())
+        self.assertEqual(self.fetches, 3)
+        # Groups without a TTL always fetch
+        self.cache.get_or_fetch(("orders",), self.fetch())
+        self.cache.get_or_fetch(("orders",), self.fetch())
+        self.assertEqual(self.fetches, 5)
+        self.assertEqual((self.cache.hits, self.cache.misses), (3, 3))
+
+    def test_failures_are_not_cached(self):
+        for response in (None, {"retCode": 10006, "retMsg": "Too many visits"}):
+            self.cache.get_or_fetch(("tickers",), self.fetch(response))
+            self.cache.get_or_fetch(("tickers",), self.fetch(response))
+        self.assertEqual(self.fetches, 4)
+
+    def test_invalidate_groups(self):
+        self.cache.get_or_fetch(("tickers",), self.fetch())
+        self.cache.get_or_fetch(("positions",), self.fetch())
+        self.cache.invalidate("positions")
+        self.cache.get_or_fetch(("tickers",), self.fetch())
+        self.cache.get_or_fetch(("positions",), self.fetch())
+        self.assertEqual(self.fetches, 3)
+
+    def test_concurrent_callers_share_one_fetch(self):
+        release = threading.Event()
+        started = threading.Event()
+
+        def slow_fetch():
+            self.fetches += 1
+            started.set()
+            release.wait(5)
+            return OK
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get_or_fetch(("tickers",), slow_fetch)))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        started.wait(5)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(self.fetches, 1)
+        self.assertEqual(results, [OK] * 5)
+
+    def test_fetch_in_flight_during_invalidation_is_not_stored(self):
+        def fetch():
+            self.fetches += 1
+            self.cache.invalidate("positions")  # an order fills while positions are being read
+            return OK
+
+        self.assertIs(self.cache.get_or_fetch(("positions",), fetch), OK)
+        self.cache.get_or_fetch(("positions",), self.fetch())
+        self.assertEqual(self.fetches, 2)
+
+    def test_errors_reach_waiting_callers(self):
+        with self.assertRaises(RuntimeError):
+            self.cache.get_or_fetch(("tickers",), mock.Mock(side_effect=RuntimeError("boom")))
+        self.assertIs(self.cache.get_or_fetch(("tickers",), self.fetch()), OK)
+
+
+class TestClientCache(unittest.TestCase):
+    def setUp(self):
+        self.client = DMABybit("key", "11" * 32, symbol="BTCUSDT", category="option")
+        self.other = DMABybit("key", "11" * 32, symbol="BTCUSDT", category="option", session=self.client.session,
+                              cache=self.client.cache)
+        self.response = mock.Mock(content=b'{"retCode": 0, "result": {"list": []}}', headers={}, status_code=200)
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_reads_are_cached_and_orders_invalidate_account_state(self):
+        with mock.patch.object(self.client.session, "get", return_value=self.response) as get, \
+                mock.patch.object(self.client.session, "post", return_value=self.response), \
+                mock.patch("builtins.print"):
+            self.client.get_tickers(category="option", base_coin="BTC", exp_date="25APR25")
+            self.other.get_tickers(category="option", base_coin="BTC", exp_date="25APR25")
+            self.client.get_tickers(category="option", base_coin="BTC", exp_date="25APR25", typed=True)
+            self.client.get_open_positions()
+            self.other.get_open_positions()
+            self.client.get_balance()
+            self.assertEqual(get.call_count, 4)
+
+            self.other.place_order({"symbol": "BTC-25APR25-90000-C-USDT", "side": "Sell", "qty": "0.01"})
+            self.client.get_open_positions()
+            self.client.get_balance()
+            self.client.get_tickers(category="option", base_coin="BTC", exp_date="25APR25")
+            self.assertEqual(get.call_count, 6)
+
+            # Order details are never cached
+            self.client.get_order_details("abc")
+            self.client.get_order_details("abc")
+            self.assertEqual(get.call_count, 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import threading
+import unittest
+
+from market_data_feed import OptionChainStore
+from recordings import load_recorded_tickers
+from scheduler import Backoff, Scheduler
+
+
+class SimulatedScheduler(Scheduler):
+    """Scheduler on a fake clock: waiting advances time instantly, events come from a script."""
+
+    def __init__(self, script=(), **kwargs):
+        self.now = 0.0
+        super().__init__(clock=lambda: self.now, **kwargs)
+        self.script = sorted(script)  # (time, event)
+
+    def _wait(self, timeout):
+        events = super()._wait(0)
+        if events:
+            return events
+        next_event = self.script[0][0] if self.script else None
+        if timeout is None and next_event is None:
+            raise AssertionError("scheduler would block forever")
+        target = next_event if timeout is None else self.now + timeout
+        if next_event is not None and next_event <= target:
+            self.now = max(self.now, next_event)
+            due = [event for t, event in self.script if t <= self.now]
+            self.script = [(t, event) for t, event in self.script if t > self.now]
+            return due
+        self.now = target
+        return []
+
+
+class TestBackoff(unittest.TestCase):
+    def test_doubles_up_to_the_cap_and_resets(self):
+        backoff = Backoff(base=1, factor=2, maximum=5)
+        self.assertEqual([backoff.next_delay() for _ in range(5)], [1, 2, 4, 5, 5])
+        backoff.reset()
+        self.assertEqual(backoff.next_delay(), 1)
+
+
+class TestScheduler(unittest.TestCase):
+    def test_periodic_timer_keeps_its_cadence(self):
+        scheduler = SimulatedScheduler()
+        fired = []
+
+        def tick():
+            fired.append(scheduler.now)
+            if len(fired) == 4:
+                scheduler.stop()
+
+        scheduler.call_every(900, tick)
+        scheduler.run()
+        self.assertEqual(fired, [900, 1800, 2700, 3600])
+
+    def test_market_updates_are_coalesced(self):
+        # Three updates arrive together, then one more later
+        scheduler = SimulatedScheduler([(1, "a"), (1, "b"), (1, "c"), (5, "d")])
+        seen = []
+
+        def on_update(event):
+            seen.append((scheduler.now, event))
+            if event == "d":
+                scheduler.stop()
+
+        scheduler.on_market_update(on_update)
+        scheduler.run()
+        self.assertEqual(seen, [(1, "c"), (5, "d")])
+
+    def test_failing_timer_retries_with_backoff(self):
+        scheduler = SimulatedScheduler()
+        calls = []
+
+        def flaky():
+            calls.append(scheduler.now)
+            if len(calls) < 4:
+                raise ConnectionError("exchange unavailable")
+            scheduler.stop()
+
+        scheduler.call_later(10, flaky)
+        with self.assertLogs(level="WARNING"):
+            scheduler.run()
+        self.assertEqual(calls, [10, 11, 13, 17])
+
+    def test_backoff_is_capped_by_the_interval(self):
+        scheduler = SimulatedScheduler()
+        calls = []
+
+        def always_fails():
+            calls.append(scheduler.now)
+            if len(calls) == 5:
+                scheduler.stop()
+            raise ConnectionError("exchange unavailable")
+
+        scheduler.call_every(3, always_fails)
+        with self.assertLogs(level="WARNING"):
+            scheduler.run()
+        self.assertEqual(calls, [3, 4, 6, 9, 12])
+
+    def test_fatal_exceptions_propagate(self):
+        scheduler = SimulatedScheduler([(2, None)], fatal_exceptions=(KeyError,))
+        scheduler.on_market_update(lambda event: {}["missing"])
+        with self.assertRaises(KeyError):
+            scheduler.run()
+        self.assertFalse(scheduler.running)
+
+    def test_cancelled_timer_does_not_run(self):
+        scheduler = SimulatedScheduler()
+        fired = []
+        timer = scheduler.call_later(1, lambda: fired.append("cancelled"))
+        scheduler.call_later(2, lambda: fired.append("kept"))
+        timer.cancel()
+        scheduler.run()
+        self.assertEqual(fired, ["kept"])
+
+    def test_store_updates_wake_the_loop(self):
+        tickers, _ = load_recorded_tickers()
+        store = OptionChainStore()
+        scheduler = Scheduler()
+        store.add_listener(scheduler.post)
+        versions = []
+
+        def on_update(event):
+            versions.append(store.version)
+            scheduler.stop()
+
+        scheduler.on_market_update(on_update)
+        threading.Timer(0.05, store.load_tickers, [tickers]).start()
+        scheduler.call_later(5, scheduler.stop)  # safety net
+        scheduler.run()
+        self.assertEqual(versions, [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from backtest import DEFAULT_DATA, RecordEvents, encode_events, load_events, run_backtest
+from sweep import param_grid, prepare_days, summarize, sweep
+from tickstore import map_records
+
+
+class TestSweep(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.days = prepare_days([DEFAULT_DATA, DEFAULT_DATA], self.cache_dir.name)
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def test_grid_covers_every_combination(self):
+        grid = param_grid(target_delta=(0.1, 0.2), exit_margin_fraction=(0.05, 0.1, 0.2), wait_for_iv_spike=True)
+        self.assertEqual(len(grid), 6)
+        self.assertEqual(len(set(grid)), 6)
+        self.assertTrue(all(params.wait_for_iv_spike and params.rebalance_band == 0.1 for params in grid))
+
+    def test_packed_days_replay_like_the_recording(self):
+        self.assertEqual(self.days[0].expiry, "25APR25")
+        records = map_records(self.days[0].records_path)
+        self.assertIsInstance(records, np.memmap)
+        from_records = run_backtest(RecordEvents(records, self.days[0].symbols), "25APR25", 1.0, 1.0)
+        from_json = run_backtest(load_events([DEFAULT_DATA]), "25APR25", 1.0, 1.0)
+        self.assertEqual(from_records.trades, from_json.trades)
+        self.assertAlmostEqual(from_records.total_pnl, from_json.total_pnl)
+
+    def test_pool_matches_inline_run_and_summary_aggregates_days(self):
+        grid = param_grid(target_delta=(0.1, 0.2))
+        inline = sweep(self.days, grid, workers=1, rebalance_interval=1.0)
+        pooled = sweep(self.days, grid, workers=2, rebalance_interval=1.0)
+        key = lambda item: (item[0], item[1])
+        self.assertEqual(sorted(inline, key=key), sorted(pooled, key=key))
+
+        rows = summarize(pooled)
+        self.assertEqual(len(rows), 2)
+        for row in rows:
+            self.assertEqual(row["days"], 2)
+            day_results = [r for params, _, r in pooled if params.target_delta == row["target_delta"]]
+            self.assertAlmostEqual(row["total_pnl"], sum(r.total_pnl for r in day_results))
+            self.assertEqual(row["trades"], sum(r.trades for r in day_results))
+        self.assertGreaterEqual(rows[0]["total_pnl"], rows[1]["total_pnl"])
+
+    def test_encoding_keeps_only_strategy_fields(self):
+        records, symbols = encode_events(load_events([DEFAULT_DATA]))
+        self.assertEqual(len(symbols), 26)
+        self.assertEqual(int(records["snapshot"].sum()), 26)
+        self.assertTrue(np.isnan(records["bid1Price"][~records["snapshot"].astype(bool)]).any())
+
+
+if __name__ == "__main__":
+    unittest.main()
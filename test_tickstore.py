@@ -0,0 +1,129 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from backtest import DEFAULT_DATA
+from instruments import parse_symbol
+from recordings import load_events, load_recorded_tickers
+from tickstore import FORMAT_FILE, TICK_DTYPE, TickRecorder, TickStore, day_of, event_updates, map_records
+
+
+class TestTickStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.store = TickStore(self.root)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip_of_recorded_stream(self):
+        updates = event_updates(load_events([DEFAULT_DATA]))
+        self.store.append_updates(updates)
+        day = day_of(updates[0][0])
+        self.assertEqual(self.store.days(), [day])
+        records = self.store.read(day)
+        self.assertEqual(len(records), len(updates))
+        self.assertEqual(os.path.getsize(self.store.day_path(day)), len(updates) * TICK_DTYPE.itemsize)
+        ts, snapshot, fields = updates[0]
+        first = records[0]
+        self.assertEqual(int(first["ts"]), ts)
+        self.assertEqual(self.store.symbols[first["symbol"]], fields["symbol"])
+        self.assertAlmostEqual(first["markPrice"], float(fields["markPrice"]))
+
+    def test_append_after_a_torn_record_stays_aligned(self):
+        updates = event_updates(load_events([DEFAULT_DATA]))
+        day = day_of(updates[0][0])
+        self.store.append_updates(updates[:10])
+        with open(self.store.day_path(day), "ab") as f:
+            f.write(b"\0" * (TICK_DTYPE.itemsize // 2))  # a crash mid-write
+        with self.assertLogs(level="WARNING"):
+            self.store.append_updates(updates[10:20])
+        records = self.store.read(day)
+        self.assertEqual(os.path.getsize(self.store.day_path(day)), 20 * TICK_DTYPE.itemsize)
+        self.assertEqual(records["ts"].tolist(), [int(ts) for ts, _, _ in updates[:20]])
+        self.assertEqual([self.store.symbols[i] for i in records["symbol"]],
+                         [fields["symbol"] for _, _, fields in updates[:20]])
+
+    def test_symbol_dictionary_persists(self):
+        tickers, ts = load_recorded_tickers()
+        self.store.append_updates([(ts, True, t) for t in tickers[:3]])
+        reopened = TickStore(self.root)
+        self.assertEqual(reopened.symbols, [t["symbol"] for t in tickers[:3]])
+        self.assertEqual(reopened.symbol_id(tickers[1]["symbol"]), 1)
+        self.assertEqual(reopened.symbol_id(tickers[3]["symbol"]), 3)
+
+    def test_time_slice_is_a_view_and_filters_select(self):
+        tickers, _ = load_recorded_tickers()
+        base = 1745000000000
+        for i in range(3):
+            self.store.append_updates([(base + i * 1000, True, t) for t in tickers])
+        day = day_of(base)
+        records = self.store.read(day, start_ms=base + 1000, end_ms=base + 2000)
+        self.assertEqual(len(records), len(tickers))
+        self.assertIsInstance(records, np.memmap)
+        expiry = tickers[0]["symbol"].split("-")[1]
+        calls = self.store.read(day, expiry=expiry, strikes=(80000, 90000), is_call=True)
+        self.assertTrue(len(calls) > 0)
+        for record in calls:
+            symbol = self.store.symbols[record["symbol"]]
+            self.assertTrue(symbol.startswith(f"BTC-{expiry}-") and parse_symbol(symbol).is_call, symbol)
+            self.assertTrue(80000 <= record["strike"] <= 90000)
+
+    def test_partial_tail_is_ignored(self):
+        tickers, ts = load_recorded_tickers()
+        self.store.append_updates([(ts, True, t) for t in tickers[:2]])
+        path = self.store.day_path(day_of(ts))
+        with open(path, "ab") as f:
+            f.write(b"\0" * (TICK_DTYPE.itemsize // 2))
+        self.assertEqual(len(map_records(path)), 2)
+
+    def test_format_mismatch_raises(self):
+        with open(os.path.join(self.root, FORMAT_FILE), "w") as f:
+            json.dump({"dtype": [["ts", "<i4"]]}, f)
+        with self.assertRaises(ValueError):
+            TickStore(self.root)
+
+    def test_recorder_keeps_timestamps_non_decreasing(self):
+        tickers, ts = load_recorded_tickers()
+        recorder = TickRecorder(self.store, flush_size=1000)
+        recorder.record_tickers(tickers[:2], ts)
+        recorder.record_message({"topic": "tickers.X", "type": "delta", "ts": ts - 500,
+                                 "data": {"symbol": tickers[0]["symbol"], "markPrice": "1"}})
+        self.assertEqual(self.store.days(), [])
+        recorder.close()
+        records = self.store.read(day_of(ts))
+        self.assertEqual(records["ts"].tolist(), [ts, ts, ts])
+        self.assertEqual(records["snapshot"].tolist(), [1, 1, 0])
+        self.assertTrue(np.isnan(records[2]["bid1Price"]))
+
+
+    def test_recorder_writes_on_its_own_thread(self):
+        tickers, ts = load_recorded_tickers()
+        recorder = TickRecorder(self.store, flush_size=2)
+        writing, release = threading.Event(), threading.Event()
+        append_updates = self.store.append_updates
+
+        def slow_append(updates):
+            writing.set()
+            release.wait(5)
+            append_updates(updates)
+
+        with mock.patch.object(self.store, "append_updates", side_effect=slow_append):
+            recorder.record_tickers(tickers[:2], ts)  # a full batch: handed off, not written here
+            self.assertTrue(writing.wait(5))
+            recorder.record_tickers(tickers[2:4], ts)  # does not wait for the first batch
+            self.assertFalse(recorder.flush(timeout=0.05))
+            release.set()
+            self.assertTrue(recorder.flush(timeout=5))
+        recorder.close()
+        self.assertEqual(recorder.written, 4)
+        self.assertEqual(len(self.store.read(day_of(ts))), 4)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,293 @@
+"""
+Compact binary tick store for option chain history.
+
+Each UTC day is one append-only file (YYYYMMDD.ticks) of fixed-size
+TICK_DTYPE records: one record per ticker update, carrying the instrument's
+expiry, strike and type, and the ticker fields the strategy reads (NaN where
+an update did not carry a field). Symbols are stored as ids into a
+dictionary shared by all days (symbols.txt, one symbol per line, append-only).
+
+A full chain snapshot costs ~100 bytes per option, against several KB per
+option in the pretty-printed REST dumps in api_responses/. Readers
+memory-map the day files: slicing by time range is a zero-copy view, and
+filtering by expiry, strike or option type is one vectorized mask.
+
+    store = TickStore("ticks")
+    feed = OptionTickerFeed.from_rest(client, expiry="25APR25", recorder=TickRecorder(store)).start()
+    ...
+    records = store.read("20250418", start_ms=..., end_ms=..., expiry="25APR25", strikes=(80000, 90000))
+
+Convert existing recordings (stream .jsonl or REST dumps) into a store:
+
+    python tickstore.py --root ticks --import api_responses/bybit_option_ticker_stream_sample.jsonl
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import threading
+
+import numpy as np
+
+from instruments import parse_symbol
+from market_data_feed import STREAM_TO_REST_FIELDS
+from option_chain import TICKER_FIELDS, parse_expiry
+from recordings import load_events
+
+# Ticker fields kept per record (REST names), in record order
+TICK_FIELDS = tuple(TICKER_FIELDS.values())
+TICK_DTYPE = np.dtype([("ts", "<i8"), ("expiry", "<M8[D]"), ("strike", "<f8")]
+                      + [(field, "<f8") for field in TICK_FIELDS]
+                      + [("symbol", "<u4"), ("snapshot", "u1"), ("is_call", "u1")])
+DAY_SUFFIX = ".ticks"
+SYMBOLS_FILE = "symbols.txt"
+FORMAT_FILE = "format.json"
+RECORDER_FLUSH_SIZE = 1000
+
+_CLOSE = object()
+
+
+def message_updates(message):
+    """[(ts_ms, snapshot, fields)] for a ticker stream message, fields under REST names"""
+    if not message.get("topic", "").startswith("tickers."):
+        return []
+    data = message.get("data")
+    snapshot = message.get("type") == "snapshot"
+    return [(message["ts"], snapshot, {STREAM_TO_REST_FIELDS.get(k, k): v for k, v in update.items()})
+            for update in (data if isinstance(data, list) else [data])]
+
+
+def ticker_updates(tickers, ts):
+    """[(ts_ms, snapshot, fields)] for a REST tickers list taken at ts"""
+    return [(ts, True, ticker) for ticker in tickers]
+
+
+def event_updates(events):
+    """Updates for replay events as returned by recordings.load_events()"""
+    updates = []
+    for t, kind, payload in events:
+        if kind == "tickers":
+            updates.extend(ticker_updates(payload, round(t * 1000)))
+        else:
+            updates.extend(message_updates(payload))
+    return updates
+
+
+def encode_updates(updates, symbol_id):
+    """TICK_DTYPE records for [(ts_ms, snapshot, fields)], with symbol_id(symbol) -> dictionary id"""
+    rows = []
+    for ts, snapshot, fields in updates:
+        instrument = parse_symbol(fields["symbol"])
+        rows.append((ts, instrument.expiry, instrument.strike)
+                    + tuple(float(fields[f] or 0) if f in fields else np.nan for f in TICK_FIELDS)
+                    + (symbol_id(fields["symbol"]), snapshot, instrument.is_call))
+    return np.array(rows, dtype=TICK_DTYPE)
+
+
+def map_records(path):
+    """Memory-map a file of TICK_DTYPE records (a .ticks day file, or an .npy array). A partial last record is ignored."""
+    if path.endswith(".npy"):
+        return np.load(path, mmap_mode="r")
+    count = os.path.getsize(path) // TICK_DTYPE.itemsize
+    if count == 0:
+        return np.empty(0, dtype=TICK_DTYPE)
+    return np.memmap(path, dtype=TICK_DTYPE, mode="r", shape=(count,))
+
+
+def day_of(ts_ms):
+    """UTC day (YYYYMMDD) of epoch milliseconds, as used for day file names"""
+    return str(np.datetime64(int(ts_ms), "ms").astype("datetime64[D]")).replace("-", "")
+
+
+class TickStore:
+    """Per-day append-only tick files under root, with a shared symbol dictionary"""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._check_format()
+        self._lock = threading.Lock()
+        self.symbols = []
+        self._ids = {}
+        path = os.path.join(root, SYMBOLS_FILE)
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        self._ids[line.strip()] = len(self.symbols)
+                        self.symbols.append(line.strip())
+
+    def _check_format(self):
+        path = os.path.join(self.root, FORMAT_FILE)
+        descr = json.loads(json.dumps(TICK_DTYPE.descr))
+        if not os.path.exists(path):
+            with open(path, "w") as f:
+                json.dump({"dtype": descr}, f)
+        else:
+            with open(path) as f:
+                if json.load(f)["dtype"] != descr:
+                    raise ValueError(f"Tick store at {self.root} uses a different record format")
+
+    def symbol_id(self, symbol):
+        """Dictionary id of a symbol, adding it to the dictionary file if new"""
+        symbol_id = self._ids.get(symbol)
+        if symbol_id is None:
+            with self._lock:
+                symbol_id = self._ids.get(symbol)
+                if symbol_id is None:
+                    with open(os.path.join(self.root, SYMBOLS_FILE), "a") as f:
+                        f.write(symbol + "\n")
+                    symbol_id = self._ids[symbol] = len(self.symbols)
+                    self.symbols.append(symbol)
+        return symbol_id
+
+    def day_path(self, day):
+        return os.path.join(self.root, f"{day}{DAY_SUFFIX}")
+
+    def days(self):
+        return sorted(name[:-len(DAY_SUFFIX)] for name in os.listdir(self.root) if name.endswith(DAY_SUFFIX))
+
+    def append(self, records):
+        """Append records to their days' files. Within a day, ts should be non-decreasing.
+
+        A torn record at the end of a file (a write cut short by a crash) is
+        dropped first, so the new records start on a record boundary.
+        """
+        if len(records) == 0:
+            return
+        days = records["ts"].astype("datetime64[ms]").astype("datetime64[D]")
+        for day in np.unique(days):
+            with open(self.day_path(str(day).replace("-", "")), "ab") as f:
+                size = f.seek(0, os.SEEK_END)
+                torn = size % TICK_DTYPE.itemsize
+                if torn:
+                    logging.warning(f"Dropping {torn} bytes of a torn record at the end of {f.name}")
+                    f.truncate(size - torn)
+                f.write(records[days == day].tobytes())
+
+    def append_updates(self, updates):
+        self.append(encode_updates(updates, self.symbol_id))
+
+    def read(self, day, start_ms=None, end_ms=None, expiry=None, strikes=None, is_call=None):
+        """Records of one day in [start_ms, end_ms).
+
+        The time range is a view of the memory-mapped file; expiry (e.g.
+        25APR25), strikes ((low, high), inclusive) and is_call filters select
+        rows into a new array.
+        """
+        path = self.day_path(day)
+        records = map_records(path) if os.path.exists(path) else np.empty(0, dtype=TICK_DTYPE)
+        ts = records["ts"]
+        lo = int(np.searchsorted(ts, start_ms, "left")) if start_ms is not None else 0
+        hi = int(np.searchsorted(ts, end_ms, "left")) if end_ms is not None else len(records)
+        records = records[lo:hi]
+        if expiry is None and strikes is None and is_call is None:
+            return records
+        mask = np.ones(len(records), dtype=bool)
+        if expiry is not None:
+            mask &= records["expiry"] == parse_expiry(expiry)
+        if strikes is not None:
+            mask &= (records["strike"] >= strikes[0]) & (records["strike"] <= strikes[1])
+        if is_call is not None:
+            mask &= records["is_call"] == is_call
+        return records[mask]
+
+
+class TickRecorder:
+    """Buffers ticker updates from a feed and appends them to a TickStore from a writer thread.
+
+    Recording only buffers: every flush_size updates the batch is handed to
+    the writer thread, which encodes and appends it, so the feed's event loop
+    never waits on file I/O (as with journal.TradeJournal). Timestamps are kept
+    non-decreasing, so day files stay binary-searchable by time even if the
+    exchange's ts of consecutive messages go backwards.
+    """
+
+    def __init__(self, store, flush_size=RECORDER_FLUSH_SIZE):
+        self.store = store
+        self.flush_size = flush_size
+        self.written = 0
+        self._buffer = []
+        self._last_ts = 0
+        self._lock = threading.Lock()
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+
+    def _add(self, updates):
+        with self._lock:
+            for ts, snapshot, fields in updates:
+                self._last_ts = max(int(ts), self._last_ts)
+                self._buffer.append((self._last_ts, snapshot, fields))
+            if len(self._buffer) >= self.flush_size:
+                self._hand_off()
+
+    def record_message(self, message):
+        self._add(message_updates(message))
+
+    def record_tickers(self, tickers, ts):
+        self._add(ticker_updates(tickers, ts))
+
+    def _hand_off(self):
+        """Queue the buffered updates for the writer thread (call with the lock held)"""
+        if not self._buffer:
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="tick-recorder", daemon=True)
+            self._thread.start()
+        updates, self._buffer = self._buffer, []
+        self._queue.put(updates)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if isinstance(item, list):
+                try:
+                    self.store.append_updates(item)
+                    self.written += len(item)
+                except Exception:  # keep recording later batches
+                    logging.exception(f"Failed to write {len(item)} ticks to {self.store.root}")
+            elif isinstance(item, threading.Event):
+                item.set()
+            elif item is _CLOSE:
+                return
+
+    def flush(self, timeout=None):
+        """Block until every update recorded so far is written. Returns False on timeout."""
+        with self._lock:
+            self._hand_off()
+            if self._thread is None:
+                return True
+            done = threading.Event()
+            self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=None):
+        """Write out everything buffered and stop the writer thread"""
+        self.flush(timeout)
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_CLOSE)
+            thread.join(timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import recordings into a tick store and summarize it')
+    parser.add_argument('--root', required=True, help='Tick store directory')
+    parser.add_argument('--import', dest='paths', nargs='*', default=[], help='Stream recordings (.jsonl) and/or REST dumps')
+    args = parser.parse_args()
+
+    store = TickStore(args.root)
+    if args.paths:
+        store.append_updates(event_updates(load_events(args.paths)))
+    for day in store.days():
+        records = store.read(day)
+        expiries = sorted({str(e) for e in np.unique(records["expiry"])})
+        print(f"{day}: {len(records)} records, {os.path.getsize(store.day_path(day))} bytes, expiries {expiries}")
+    print(f"{len(store.symbols)} symbols")
+
+
+if __name__ == "__main__":
+    main()